@@ -16,6 +16,23 @@ from typing import Dict, List, Tuple
 import webbrowser
 import os
 import sys
+import threading
+import time
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from cranleighFC_availability import AvailabilityCalendar, affected_dates
+from cranleighFC_config import AllocatorConfig, load_allocator_config
+from cranleighFC_profiling import (
+    PhaseClock,
+    merge_solver_statistics,
+    new_run_report,
+    profiled,
+    record_phase,
+    record_presolved_objective,
+    record_solver_statistics
+)
 
 # ✅ Print environment info at startup
 print(f"Python: {sys.executable}")
@@ -28,131 +45,94 @@ except ImportError:
     print(f"✗ openpyxl NOT available in this environment\n")
     print(f"Install with: {sys.executable} -m pip install openpyxl\n")
 
+# =====================================
+# ⚙️ Configuration (config/allocator.json, venues.json, clubs.json)
+# =====================================
+# Validated and compiled once at startup - edit the JSON, not this file
+CONFIG = load_allocator_config()
+
 # =====================================
 # 🏟️ Define Pitches
 # =====================================
-pitches = {
-    'P1 11v11 (Bruce McKenzie)': {'format': '11v11', 'lights': False, 'location': 'snoxhall', 'priority': 1},
-    'P2 11v11': {'format': '11v11', 'lights': False, 'location': 'snoxhall', 'priority': 1},
-    'P3 11v11 (Middle)': {'format': '11v11', 'lights': False, 'size': 'small', 'location': 'snoxhall', 'priority': 1},
-    'P4 9v9': {'format': '9v9', 'lights': False, 'location': 'snoxhall', 'priority': 1},
-    'P5 7v7': {'format': '7v7', 'lights': False, 'location': 'snoxhall', 'priority': 1},
-    'P6 11v11 (Seniors)': {'format': '11v11', 'lights': True, 'location': 'snoxhall', 'priority': 1},
-    'P7 9v9': {'format': '9v9', 'lights': False, 'location': 'snoxhall', 'priority': 1},
-    'P8 7v7': {'format': '7v7', 'lights': False, 'location': 'snoxhall', 'priority': 1},
-    'P9 7v7': {'format': '7v7', 'lights': False, 'location': 'snoxhall', 'priority': 1},
-    'CCC1 5v5': {'format': '5v5', 'lights': False, 'location': 'ccc', 'priority': 1},
-    'CCC2 5v5': {'format': '5v5', 'lights': False, 'location': 'ccc', 'priority': 1},
-    'CCC3 7v7': {'format': '7v7', 'lights': False, 'location': 'ccc', 'priority': 1},
-    'CCC4 7v7': {'format': '7v7', 'lights': False, 'location': 'ccc', 'priority': 1},
-    # ✅ NEW: Glebelands 3G pitches (secondary - use after main pitches)
-    'G1 11v11 (Glebelands 3G)': {'format': '11v11', 'lights': True, 'location': 'glebelands', 'priority': 2},
-    'G2 9v9 (Glebelands 3G)': {'format': '9v9', 'lights': True, 'location': 'glebelands', 'priority': 2}
-}
+# cup_pitch: preferred for cup ties | seniors_only: reserved for Seniors/Womens
+# priority 2 = overflow venue (penalised, exempt from back-to-back rule)
+pitches = CONFIG.pitch_catalogue()
 
 # =====================================
 # 🧑 Team and Age Group Setup
 # =====================================
-valid_teams = {    
-    'Cranleigh': 'Seniors',
-    'Cranleigh Blues': 'U17',
-    'Cranleigh Development': 'Seniors',
-    'Cranleigh Dons U14': 'U14',
-    'Cranleigh (First)': 'Seniors',
-    'Cranleigh Harriers U13': 'U13',
-    'Cranleigh Hawks U12': 'U12',
-    'Cranleigh Kangaroos U7': 'U7',
-    'Cranleigh Koalas U7': 'U7',
-    'Cranleigh Kookaburras U7': 'U7',
-    'Cranleigh Masters': 'Seniors',
-    'Cranleigh Reserves': 'Seniors',
-    'Cranleigh U10 Cobras': 'U10',
-    'Cranleigh U10 Cyclones': 'U10',
-    'Cranleigh U10 Tigers': 'U10',
-    'Cranleigh U10 Vipers': 'U10',
-    'Cranleigh U10 Wolves': 'U10',
-    'Cranleigh U11': 'U11',
-    'Cranleigh U11 Crushers': 'U11',
-    'Cranleigh U11 Jaguars': 'U11',
-    'Cranleigh U11 Leopards': 'U11',
-    'Cranleigh U11 Panthers': 'U11',
-    'Cranleigh U11 Tigers Girls': 'U11',
-    'Cranleigh U12M Harriers': 'U12',
-    'Cranleigh U13 Cobras': 'U13',
-    'Cranleigh U13 Cosmos Blue': 'U13G',  # ✅ Changed to U13G for girls format
-    'Cranleigh U13 Cosmos White': 'U13G',  # ✅ Changed to U13G for girls format
-    'Cranleigh U13 Jaguars': 'U13',
-    'Cranleigh U14 Atletico': 'U14',
-    'Cranleigh U14 Girls': 'U14',
-    'Cranleigh U14M Albion': 'U14',
-    'Cranleigh U15 Cobras': 'U15',
-    'Cranleigh U15 Cranes': 'U15',
-    'Cranleigh U16 Sharks': 'U16',
-    'Cranleigh U16M Tigers': 'U16',
-    'Cranleigh U17 County': 'U17',
-    'Cranleigh U8 Barracudas': 'U8',
-    'Cranleigh U8 Carnage': 'U8',
-    'Cranleigh U8 Rays': 'U8',
-    'Cranleigh U8 Sharks': 'U8',
-    'Cranleigh U9 Bears': 'U9',
-    'Cranleigh U9 Coyotes': 'U9',
-    'Cranleigh U9 Cuckoos': 'U9',
-    'Cranleigh U9 Eagles': 'U9',
-    'Cranleigh U9 Lions': 'U9',
-    'Cranleigh U9 Raptors': 'U9',
-    'Cranleigh Veterans': 'Seniors',
-    'Cranleigh Womens': 'Womens'
-}
-
-age_group_formats = {
-    'U7': '5v5', 'U8': '5v5',
-    'U9': '7v7', 'U10': '7v7',
-    'U11': '9v9', 'U12': '9v9',
-    'U13': '11v11', 
-    'U13G': '9v9',  # ✅ NEW: U13 Girls play 9v9 format
-    'U14': '11v11',
-    'U15': '11v11', 'U16': '11v11',
-    'U17': '11v11', 'U18': '11v11',
-    'Seniors': '11v11',
-    'Womens': '11v11'
-}
-
-age_priority = {
-    'U7': 1, 'U8': 2, 'U9': 3, 'U10': 4, 'U11': 5, 'U12': 6,
-    'U13': 7, 
-    'U13G': 7,  # ✅ NEW: Same priority as U13 boys
-    'U14': 8, 'U15': 9, 'U16': 10, 'U17': 11, 'U18': 12,
-    'Seniors': 13, 'Womens': 13
-}
+# Plain dict copies for display and existing callers - the solver uses CONFIG
+valid_teams = dict(CONFIG.teams)
+age_group_formats = dict(CONFIG.age_group_formats)
+age_priority = dict(CONFIG.age_priority)
 
 # ✅ P3 Middle pitch priority - younger 11v11 teams preferred
 # Higher number = higher priority for P3
-p3_middle_priority = {
-    'U13': 3,  # Highest priority for smaller pitch
-    'U14': 2,  # Second priority
-    'U15': 1,  # Lower priority
-    'U16': 0,  # No priority (can use if needed)
-    'U17': 0,
-    'Seniors': 0,
-    'Womens': 0
-}
+p3_middle_priority = dict(CONFIG.p3_middle_priority)
 
 # ✅ Senior team priority for P6 allocation
-senior_team_priority = {
-    'Cranleigh (First)': 4,
-    'Cranleigh Reserves': 3,
-    'Cranleigh Development': 2,
-    'Cranleigh Veterans': 1,
-    'Cranleigh Masters': 1,
-    'Cranleigh': 1,
-    'Cranleigh Womens': 3
-}
+senior_team_priority = dict(CONFIG.senior_priority)
 
 # =====================================
 # 📅 Load Fixtures and Validate
 # =====================================
-def load_and_validate_fixtures(filepath: str) -> Tuple[Dict, Dict]:
-    """Load fixtures with validation - returns fixtures dict and slots by date"""
+@profiled('load_and_validate_fixtures')
+def load_and_validate_fixtures(filepath: str, teams: Dict = None, report: Dict = None,
+                               config: AllocatorConfig = None,
+                               calendar: AvailabilityCalendar = None) -> Tuple[Dict, Dict]:
+    """Load fixtures with validation - returns fixtures dict and slots by date
+    teams: optional team -> age group mapping (defaults to the config's teams)
+    report: optional run report (cranleighFC_profiling) to record phase timings
+    config: optional AllocatorConfig (e.g. other venues/clubs) - defaults to CONFIG
+    calendar: optional AvailabilityCalendar - closed slots are dropped here"""
+    clock = PhaseClock(report)
+    fixtures_df = read_fixture_table(filepath)
+    clock.lap('load')
+    
+    # ✅ NEW: Resolve duplicate fixtures (prioritize Cup over League)
+    fixtures_df, removed_duplicates = resolve_duplicate_fixtures(fixtures_df)
+    clock.lap('dedup')
+    
+    result=fixtures_df.head(10)
+    print(result)
+    print(f"\n📋 CSV contains {len(fixtures_df)} fixture records after duplicate resolution")
+    
+    # ✅ NEW: Report Cup fixtures
+    cup_count = fixtures_df['is_cup'].sum()
+    if cup_count > 0:
+        print(f"🏆 Found {cup_count} Cup fixtures (priority for 09:30 kickoff)")
+    
+    fixtures = build_fixtures(fixtures_df, teams, config)
+    print(f"✅ Processing {len(fixtures)} unique fixtures")
+    clock.lap('fixture_build')
+    
+    # Generate available slots BY DATE
+    slot_dates = sorted(fixtures_df['date'].unique())
+    slots_by_date = generate_slots(slot_dates, config)
+    total_slots = sum(len(slots) for slots in slots_by_date.values())
+    
+    # ✅ Drop closed pitches / slots outside booked windows before the model sees them
+    if calendar is not None:
+        slots_by_date = calendar.prune_slots(slots_by_date)
+        open_slots = sum(len(slots) for slots in slots_by_date.values())
+        if open_slots < total_slots:
+            print(f'🚧 Availability calendar closed {total_slots - open_slots} slot(s)')
+        total_slots = open_slots
+    clock.lap('slot_generation')
+    
+    print(f'✅ Generated {total_slots} slots across {len(slot_dates)} dates')
+    
+    # Show fixtures per date breakdown
+    print(f'\n📅 Fixtures per date:')
+    date_counts = fixtures_df.groupby('date').size().sort_index()
+    for date, count in date_counts.items():
+        print(f"  {date}: {count} fixtures")
+    clock.lap('reporting')
+    
+    return fixtures, slots_by_date, removed_duplicates
+
+def read_fixture_table(filepath: str) -> pd.DataFrame:
+    """Read the FA Full-Time CSV and normalise columns, times and cup flags"""
     fixtures_df = pd.read_csv(filepath)
 
     # Rename new columns to the expected names used by the allocator
@@ -186,23 +166,20 @@ def load_and_validate_fixtures(filepath: str) -> Tuple[Dict, Dict]:
     
     fixtures_df['is_cup'] = fixtures_df['prefix'].apply(is_cup_fixture)
     
-    # ✅ NEW: Resolve duplicate fixtures (prioritize Cup over League)
-    fixtures_df, removed_duplicates = resolve_duplicate_fixtures(fixtures_df)
-    
-    result=fixtures_df.head(10)
-    print(result)
-    print(f"\n📋 CSV contains {len(fixtures_df)} fixture records after duplicate resolution")
-    
-    # ✅ NEW: Report Cup fixtures
-    cup_count = fixtures_df['is_cup'].sum()
-    if cup_count > 0:
-        print(f"🏆 Found {cup_count} Cup fixtures (priority for 09:30 kickoff)")
+    return fixtures_df
+
+def build_fixtures(fixtures_df: pd.DataFrame, teams: Dict = None, config: AllocatorConfig = None) -> Dict:
+    """Validate de-duplicated fixture rows and build the fixtures dict
+    teams: optional team -> age group override (e.g. synthetic clubs); teams
+    not in the config may use every venue"""
+    config = CONFIG if config is None else config
+    teams = config.teams if teams is None else teams
 
     # Validation
     errors = []
     for idx, row in fixtures_df.iterrows():
         team = row['team_name']
-        if team not in valid_teams:
+        if team not in teams:
             errors.append(f"Row {idx}: Unknown team '{team}'")
         if pd.isna(row['date']) or pd.isna(row['time']):
             errors.append(f"Row {idx}: Missing date/time for {team}")
@@ -218,7 +195,7 @@ def load_and_validate_fixtures(filepath: str) -> Tuple[Dict, Dict]:
     
     for idx, row in fixtures_df.iterrows():
         team = row['team_name']
-        age = valid_teams[team]
+        age = teams[team]
         fixture_date = row['date']
         is_cup = row['is_cup']
         
@@ -226,52 +203,49 @@ def load_and_validate_fixtures(filepath: str) -> Tuple[Dict, Dict]:
         fixture_id = f"{team}_{fixture_date}"
         
         # Get senior team priority (0 for non-seniors)
-        team_priority = senior_team_priority.get(team, 0)
+        team_priority = config.senior_priority.get(team, 0)
+        
+        # Venues the team's club may use (None = every venue)
+        venues = config.team_venues.get(team)
+        is_senior = age in config.senior_age_groups
+        pref_pitch = next((pitch for pitch, info in config.pitches.items()
+                           if info.get('seniors_only') and (venues is None or info['location'] in venues)),
+                          None) if is_senior else None
         
         # ✅ NEW: For Cup fixtures, preferred time is 09:30
-        preferred_time = '09:30' if is_cup else row['time']
+        preferred_time = config.cup_kickoff if is_cup else row['time']
         
         fixtures[fixture_id] = {
             'team_name': team,
             'fixture_date': fixture_date,
             'preferred_time': preferred_time,  # ✅ Cup fixtures prefer 09:30
             'original_time': row['time'],       # ✅ Keep original for reference
-            'format_req': age_group_formats[age],
+            'format_req': config.age_group_formats[age],
             'age_group': age,
-            'priority': age_priority[age],
-            'pref_pitch': 'P6 11v11 (Seniors)' if age in ['Seniors', 'Womens'] else None,
+            'priority': config.age_priority[age],
+            'pref_pitch': pref_pitch,
             'senior_priority': team_priority,
-            'is_cup': is_cup  # ✅ NEW: Flag cup fixtures
+            'is_cup': is_cup,  # ✅ NEW: Flag cup fixtures
+            'venues': list(venues) if venues is not None else None
         }
     
-    print(f"✅ Processing {len(fixtures)} unique fixtures")
-    
-    # Generate available slots BY DATE
-    slot_dates = sorted(fixtures_df['date'].unique())
+    return fixtures
+
+def generate_slots(slot_dates: List[str], config: AllocatorConfig = None) -> Dict:
+    """Every (date, time, pitch) slot for the given dates, keyed by date
+    (kickoff times per pitch format come from the config)"""
+    config = CONFIG if config is None else config
+    pitch_times = [(pitch, config.kickoff_times[info['format']]) for pitch, info in config.pitches.items()]
     slots_by_date = {}
     
     for date in slot_dates:
         date_slots = []
-        for pitch, info in pitches.items():
-            fmt = info['format']
-            if fmt == '11v11':
-                times = ['09:30', '11:00', '14:00']
-            elif fmt in ['9v9', '7v7', '5v5']:
-                times = ['09:30', '11:00']
+        for pitch, times in pitch_times:
             for t in times:
                 date_slots.append((date, t, pitch))
         slots_by_date[date] = date_slots
     
-    total_slots = sum(len(slots) for slots in slots_by_date.values())
-    print(f'✅ Generated {total_slots} slots across {len(slot_dates)} dates')
-    
-    # Show fixtures per date breakdown
-    print(f'\n📅 Fixtures per date:')
-    date_counts = fixtures_df.groupby('date').size().sort_index()
-    for date, count in date_counts.items():
-        print(f"  {date}: {count} fixtures")
-    
-    return fixtures, slots_by_date, removed_duplicates
+    return slots_by_date
 
 def resolve_duplicate_fixtures(fixtures_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
@@ -334,17 +308,478 @@ def resolve_duplicate_fixtures(fixtures_df: pd.DataFrame) -> Tuple[pd.DataFrame,
 
     return fixtures_df, removed_duplicates
 
+# =====================================
+# ⚖️ Slot Rules and Weights
+# =====================================
+def slot_block_reason(fdata: Dict, time: str, pitch: str, config: AllocatorConfig = None):
+    """Return why a fixture can't use a slot, or None if the slot is valid"""
+    config = CONFIG if config is None else config
+    pitch_info = config.pitches[pitch]
+    is_senior = fdata['age_group'] in config.senior_age_groups
+    if fdata.get('venues') is not None and pitch_info['location'] not in fdata['venues']:
+        return f"Venue not available to club"
+    if fdata['format_req'] != pitch_info['format']:
+        return f"Format mismatch (needs {fdata['format_req']})"
+    if is_senior and time != config.senior_kickoff:
+        return f"Seniors must play at {config.senior_kickoff}"
+    if not is_senior and time == config.senior_kickoff:
+        return f"Youth can't play at {config.senior_kickoff}"
+    
+    # Hard constraint - only seniors/womens can use P6 (seniors_only pitches)
+    if pitch_info.get('seniors_only') and not is_senior:
+        return f"Non-seniors can't use {pitch}"
+    
+    return None
+
+def _table_weight(config: AllocatorConfig, age: int, pitch: int, time: str, f: Dict) -> int:
+    weights = config.weights
+    # Age priority, Glebelands (overflow) penalty and P3 middle pitch bonus
+    weight = config.base_weight[age][pitch]
+    
+    # ✅ Cup fixtures: strong bonus for 09:30 kickoff and for the best pitches
+    if f.get('is_cup', False):
+        weight += config.cup_pitch_bonus[age][pitch]
+        if time == config.cup_kickoff:
+            weight += weights['cup_kickoff_bonus']
+    
+    # Strong bonus for senior teams getting P6 based on their priority
+    if config.senior_pitch[pitch] and f['senior_priority'] > 0:
+        weight += f['senior_priority'] * weights['senior_pitch_bonus']
+    
+    # Bonus for preferred time (including Cup 09:30 preference)
+    if time == f['preferred_time']:
+        weight += weights['preferred_time_bonus']
+    
+    return weight
+
+def slot_weight(f: Dict, time: str, pitch: str, config: AllocatorConfig = None) -> int:
+    """Objective weight for placing fixture f in a (time, pitch) slot"""
+    config = CONFIG if config is None else config
+    return _table_weight(config, config.age_index[f['age_group']], config.pitch_index[pitch], time, f)
+
+def slot_options(f: Dict, slots: List[Tuple], config: AllocatorConfig = None) -> List[Tuple]:
+    """
+    Valid (date, time, pitch, weight) options for fixture f among slots.
+    Same rules as slot_block_reason, but via the config's precompiled
+    per-age-group tables - this is the model builder's inner loop.
+    """
+    config = CONFIG if config is None else config
+    age = config.age_index[f['age_group']]
+    allowed_pitches = config.allowed_pitches[age]
+    allowed_kickoffs = config.allowed_kickoffs[age]
+    venues = f.get('venues')
+    options = []
+    for date, time, pitch in slots:
+        idx = config.pitch_index[pitch]
+        if idx not in allowed_pitches or time not in allowed_kickoffs:
+            continue
+        if venues is not None and config.pitches[pitch]['location'] not in venues:
+            continue
+        options.append((date, time, pitch, _table_weight(config, age, idx, time, f)))
+    return options
+
+def is_overflow_pitch(pitch_info: Dict) -> bool:
+    """Overflow venues (Glebelands 3G) are a secondary choice"""
+    return pitch_info.get('priority', 1) > 1
+
+# =====================================
+# ✂️ Split Pitches
+# =====================================
+def pitch_layout(pitch: str, config: AllocatorConfig = None) -> Tuple[str, str]:
+    """(physical pitch, layout) - a split child is its parent in that layout's
+    format; any other pitch is itself, used whole (layout None)"""
+    config = CONFIG if config is None else config
+    return config.split_parent.get(pitch, (pitch, None))
+
+def layout_clash(layouts_used: Dict, date: str, time: str, pitch: str, config: AllocatorConfig = None) -> bool:
+    """Would the slot mark its parent out differently from what's already
+    placed at that kickoff? layouts_used: {(date, time, parent): layout}"""
+    config = CONFIG if config is None else config
+    parent, layout = pitch_layout(pitch, config)
+    if parent not in config.splits:
+        return False
+    return layouts_used.get((date, time, parent), layout) != layout
+
+def add_split_constraints(model: cp_model.CpModel, vars_by_slot: Dict, config: AllocatorConfig = None) -> int:
+    """
+    At each kickoff a split pitch is used whole or in one layout: one choice
+    literal per layout in use and a single shared-capacity constraint per
+    layout (its fixtures <= its child count x choice), instead of excluding
+    every parent/child slot pair. Returns the number of kickoffs constrained.
+    """
+    config = CONFIG if config is None else config
+    if not config.splits:
+        return 0
+    kickoffs = {}   # (date, time, parent) -> {layout: [var]}
+    for (date, time, pitch), slot_vars in vars_by_slot.items():
+        parent, layout = pitch_layout(pitch, config)
+        if parent in config.splits:
+            kickoffs.setdefault((date, time, parent), {}).setdefault(layout, []).extend(slot_vars)
+
+    constrained = 0
+    for (date, time, parent), layouts in kickoffs.items():
+        if len(layouts) < 2:
+            continue
+        choices = []
+        for layout, layout_vars in layouts.items():
+            capacity = 1 if layout is None else len(config.splits[parent][layout])
+            choice = model.NewBoolVar(f'layout_{date}_{time}_{parent}_{layout or "whole"}')
+            model.Add(sum(layout_vars) <= capacity * choice)
+            choices.append(choice)
+        model.AddAtMostOne(choices)
+        constrained += 1
+    return constrained
+
+# =====================================
+# 🚻 Site Resources
+# =====================================
+def resources_fit(used: Dict, date: str, time: str, pitch: str, config: AllocatorConfig = None) -> bool:
+    """Would a fixture on the slot stay within its venue's changing rooms,
+    parking etc.? used: {(date, venue, resource, kickoff): units held}"""
+    config = CONFIG if config is None else config
+    return all(used.get((date,) + key, 0) + demand <= capacity
+               for key, demand, capacity in config.resource_loads.get((pitch, time), ()))
+
+def take_resources(used: Dict, date: str, time: str, pitch: str, config: AllocatorConfig = None,
+                   count: int = 1):
+    """Record a fixture's resource load on the slot (count=-1 releases it)"""
+    config = CONFIG if config is None else config
+    for key, demand, _ in config.resource_loads.get((pitch, time), ()):
+        used[(date,) + key] = used.get((date,) + key, 0) + count * demand
+
+def resource_terms(vars_by_slot: Dict, config: AllocatorConfig = None) -> Dict:
+    """
+    Cumulative resource load per site and kickoff:
+    {(date, venue, resource, kickoff): ([(demand, var)], capacity)}. A
+    match overlapping later kickoffs loads each of them, so fixed kickoffs
+    make a linear sum per kickoff an exact cumulative constraint. Limits
+    that can't bind (every slot full still fits) are left out.
+    """
+    config = CONFIG if config is None else config
+    if not config.resource_loads:
+        return {}
+    terms = {}
+    peak = {}   # Load with every slot filled
+    for (date, time, pitch), slot_vars in vars_by_slot.items():
+        for key, demand, capacity in config.resource_loads.get((pitch, time), ()):
+            key = (date,) + key
+            entry = terms.setdefault(key, ([], capacity))
+            entry[0].extend((demand, var) for var in slot_vars)
+            peak[key] = peak.get(key, 0) + demand
+    return {key: entry for key, entry in terms.items() if peak[key] > entry[1]}
+
+def add_resource_constraints(model: cp_model.CpModel, vars_by_slot: Dict, config: AllocatorConfig = None) -> int:
+    """One linear limit per binding (date, venue, resource, kickoff); returns how many"""
+    terms = resource_terms(vars_by_slot, config)
+    for load, capacity in terms.values():
+        model.Add(cp_model.LinearExpr.WeightedSum([var for _, var in load],
+                                                  [demand for demand, _ in load]) <= capacity)
+    return len(terms)
+
+# =====================================
+# 🔗 Linked Teams (shared coaches, siblings)
+# =====================================
+def _kickoff_minutes(time: str) -> int:
+    hours, minutes = time.split(':')
+    return int(hours) * 60 + int(minutes)
+
+def kickoff_span(time: str, fmt: str, config: AllocatorConfig = None) -> Tuple[int, int]:
+    """[start, end) minutes a fixture of this format occupies its people"""
+    config = CONFIG if config is None else config
+    start = _kickoff_minutes(time)
+    return start, start + max(1, config.match_minutes.get(fmt, 0))
+
+def link_clash(placed: Dict, f: Dict, time: str, config: AllocatorConfig = None) -> bool:
+    """Would the fixture at `time` overlap a linked team's kickoff that day?
+    placed: {(team, date): (time, format)}"""
+    config = CONFIG if config is None else config
+    linked = config.linked_teams.get(f['team_name'])
+    if not linked:
+        return False
+    start, end = kickoff_span(time, f['format_req'], config)
+    for team in linked:
+        other = placed.get((team, f['fixture_date']))
+        if other is not None:
+            other_start, other_end = kickoff_span(*other, config)
+            if start < other_end and other_start < end:
+                return True
+    return False
+
+def link_terms(fixtures: Dict, vars_by_fixture_time: Dict, config: AllocatorConfig = None) -> Dict:
+    """
+    No-overlap groups for linked teams: {(date, kickoff, fixture_ids):
+    (people, [var])} - at most one of the vars may be set. Built from a
+    team -> date -> fixture index, so each link only touches its own teams'
+    fixtures; kickoffs are fixed, so one group per kickoff a linked fixture
+    could be playing through covers every overlap. Groups shared by several
+    people are built once.
+    vars_by_fixture_time: {fixture_id: {time: [var]}}
+    """
+    config = CONFIG if config is None else config
+    if not config.links:
+        return {}
+    fixtures_by_team = {}   # team -> {date: fixture_id}
+    for fixture_id, f in fixtures.items():
+        if f['team_name'] in config.linked_teams and fixture_id in vars_by_fixture_time:
+            fixtures_by_team.setdefault(f['team_name'], {})[f['fixture_date']] = fixture_id
+
+    terms = {}
+    for person, teams in config.links.items():
+        by_date = {}
+        for team in teams:
+            for date, fixture_id in fixtures_by_team.get(team, {}).items():
+                by_date.setdefault(date, []).append(fixture_id)
+        for date, fixture_ids in by_date.items():
+            if len(fixture_ids) < 2:
+                continue
+            spans = [(fixture_id, kickoff_span(time, fixtures[fixture_id]['format_req'], config), time_vars)
+                     for fixture_id in fixture_ids
+                     for time, time_vars in vars_by_fixture_time[fixture_id].items()]
+            for time in {time for fixture_id in fixture_ids for time in vars_by_fixture_time[fixture_id]}:
+                point = _kickoff_minutes(time)
+                playing = [(fixture_id, time_vars) for fixture_id, (start, end), time_vars in spans
+                           if start <= point < end]
+                playing_ids = frozenset(fixture_id for fixture_id, _ in playing)
+                if len(playing_ids) < 2:
+                    continue
+                key = (date, time, playing_ids)
+                if key not in terms:
+                    terms[key] = ([], [var for _, time_vars in playing for var in time_vars])
+                terms[key][0].append(person)
+
+    # A group inside a larger group at the same kickoff is implied by it
+    by_kickoff = {}
+    for date, time, playing_ids in terms:
+        by_kickoff.setdefault((date, time), []).append(playing_ids)
+    for (date, time), groups in by_kickoff.items():
+        groups.sort(key=len, reverse=True)
+        for i, group in enumerate(groups):
+            container = next((larger for larger in groups[:i] if group < larger), None)
+            if container is not None and (date, time, container) in terms:
+                people = terms.pop((date, time, group))[0]
+                terms[(date, time, container)][0].extend(p for p in people if p not in terms[(date, time, container)][0])
+    return terms
+
+def add_link_constraints(model: cp_model.CpModel, fixtures: Dict, vars_by_fixture_time: Dict,
+                         config: AllocatorConfig = None) -> int:
+    """One at-most-one per linked no-overlap group; returns how many"""
+    terms = link_terms(fixtures, vars_by_fixture_time, config)
+    for _, group_vars in terms.values():
+        model.AddAtMostOne(group_vars)
+    return len(terms)
+
+ALLOCATION_WEIGHT = CONFIG.weights['allocation']               # Per allocated fixture - dominates everything else
+BACK_TO_BACK_PENALTY = CONFIG.weights['back_to_back_penalty']  # Per main pitch used at both 09:30 and 11:00
+STABILITY_BONUS = 25  # Re-plans: per fixture kept in its current slot - breaks ties without overriding preferences
+
+def allocation_record(fixture_id: str, f: Dict, date: str, time: str, pitch: str) -> Dict:
+    """One row of the allocation DataFrame"""
+    return {
+        'fixture_id': fixture_id,
+        'team': f['team_name'],
+        'date': date,
+        'time': time,
+        'pitch': pitch,
+        'age_group': f['age_group'],
+        'priority': f['priority'],
+        'matched_pref_time': time == f['preferred_time'],
+        'matched_pref_pitch': pitch == f['pref_pitch'] if f['pref_pitch'] else False,
+        'is_cup': f.get('is_cup', False)
+    }
+
+# =====================================
+# 📐 Pre-solve Capacity Bounds
+# =====================================
+TRIVIAL_DATE_FIXTURES = 3  # Dates this small are enumerated exactly - no CP-SAT search
+
+def capacity_bounds(fixtures: Dict, slots_by_date: Dict, config: AllocatorConfig = None) -> pd.DataFrame:
+    """
+    Counting bounds per date and format: seniors only fit the senior
+    kickoff, youth the other kickoffs and never a seniors-only pitch, and no
+    pitch takes more than max_games_per_pitch_per_day. `overflow` is how
+    many fixtures can't be allocated whatever the solver does.
+    """
+    config = CONFIG if config is None else config
+    max_games = config.max_games_per_pitch_per_day
+    demand = {}
+    for f in fixtures.values():
+        counts = demand.setdefault((f['fixture_date'], f['format_req']), [0, 0])
+        counts[0 if f['age_group'] in config.senior_age_groups else 1] += 1
+
+    kickoffs = {}  # (date, format) -> {pitch: [senior kickoffs, youth kickoffs]}
+    for date, slots in slots_by_date.items():
+        for _, time, pitch in slots:
+            pitch_info = config.pitches[pitch]
+            counts = kickoffs.setdefault((date, pitch_info['format']), {}).setdefault(pitch, [0, 0])
+            if time == config.senior_kickoff:
+                counts[0] += 1
+            elif not pitch_info.get('seniors_only'):
+                counts[1] += 1
+
+    rows = []
+    for (date, fmt), (seniors, youth) in sorted(demand.items()):
+        pitch_kickoffs = kickoffs.get((date, fmt), {}).values()
+        senior_capacity = sum(min(max_games, s) for s, _ in pitch_kickoffs)
+        youth_capacity = sum(min(max_games, y) for _, y in pitch_kickoffs)
+        capacity = min(senior_capacity + youth_capacity, sum(min(max_games, s + y) for s, y in pitch_kickoffs))
+        fits = min(min(seniors, senior_capacity) + min(youth, youth_capacity), capacity)
+        rows.append({
+            'date': date, 'format': fmt, 'fixtures': seniors + youth,
+            'seniors': seniors, 'youth': youth,
+            'senior_capacity': senior_capacity, 'youth_capacity': youth_capacity,
+            'capacity': capacity, 'overflow': seniors + youth - fits
+        })
+    return pd.DataFrame(rows, columns=['date', 'format', 'fixtures', 'seniors', 'youth', 'senior_capacity',
+                                       'youth_capacity', 'capacity', 'overflow'])
+
+def print_capacity_overflows(bounds: pd.DataFrame):
+    overflows = bounds[bounds['overflow'] > 0]
+    if len(overflows) == 0:
+        return
+    print(f"\n📐 {int(overflows['overflow'].sum())} fixture(s) exceed capacity whatever the allocation:")
+    for row in overflows.itertuples():
+        print(f"  - {row.date} {row.format}: {row.fixtures} fixtures "
+              f"({row.seniors} senior, {row.youth} youth) for {row.capacity} places "
+              f"({row.senior_capacity} senior, {row.youth_capacity} youth) - {row.overflow} won't fit")
+
+def solve_small_date(options_by_fixture: Dict, config: AllocatorConfig = None,
+                     fixtures: Dict = None) -> Tuple[Dict, int]:
+    """
+    Exact allocation of one date's few fixtures by enumeration - the same
+    objective as the CP-SAT model (allocation weight, slot weights and the
+    back-to-back penalty) without starting a search.
+    options_by_fixture: {fixture_id: [(date, time, pitch, weight)]}
+    fixtures: the fixture data - needed to keep linked teams apart
+    Returns ({fixture_id: (date, time, pitch)}, objective)
+    """
+    config = CONFIG if config is None else config
+    weights = config.weights
+    max_games = config.max_games_per_pitch_per_day
+    first_kickoff, second_kickoff = config.back_to_back_kickoffs
+    fixture_ids = list(options_by_fixture)
+    best = [{}, 0]
+
+    def value(chosen):
+        total = 0
+        used = set()
+        for date, time, pitch, weight in chosen.values():
+            total += weights['allocation'] + weight
+            used.add((time, pitch))
+        for time, pitch in used:
+            if (time == first_kickoff and (second_kickoff, pitch) in used
+                    and not config.pitch_overflow[config.pitch_index[pitch]]):
+                total -= weights['back_to_back_penalty']
+        return total
+
+    resources_used = {}
+    teams_placed = {}   # (team, date) -> (time, format) for linked team checks
+
+    def place(i, chosen, slots_used, pitch_games, layouts_used):
+        if i == len(fixture_ids):
+            total = value(chosen)
+            if total > best[1]:
+                best[0], best[1] = dict(chosen), total
+            return
+        fixture_id = fixture_ids[i]
+        for option in options_by_fixture[fixture_id]:
+            date, time, pitch, _ = option
+            if (time, pitch) in slots_used or pitch_games.get(pitch, 0) >= max_games:
+                continue
+            if layout_clash(layouts_used, date, time, pitch, config):
+                continue
+            if not resources_fit(resources_used, date, time, pitch, config):
+                continue
+            f = fixtures[fixture_id] if fixtures is not None else None
+            if f is not None and link_clash(teams_placed, f, time, config):
+                continue
+            parent, layout = pitch_layout(pitch, config)
+            first_on_parent = (date, time, parent) not in layouts_used
+            chosen[fixture_id] = option
+            slots_used.add((time, pitch))
+            pitch_games[pitch] = pitch_games.get(pitch, 0) + 1
+            layouts_used[(date, time, parent)] = layout
+            take_resources(resources_used, date, time, pitch, config)
+            if f is not None:
+                teams_placed[(f['team_name'], date)] = (time, f['format_req'])
+            place(i + 1, chosen, slots_used, pitch_games, layouts_used)
+            if f is not None:
+                del teams_placed[(f['team_name'], date)]
+            take_resources(resources_used, date, time, pitch, config, count=-1)
+            if first_on_parent:
+                del layouts_used[(date, time, parent)]
+            pitch_games[pitch] -= 1
+            slots_used.discard((time, pitch))
+            del chosen[fixture_id]
+        place(i + 1, chosen, slots_used, pitch_games, layouts_used)   # Or leave it unallocated
+
+    place(0, {}, set(), {}, {})
+    return {fixture_id: option[:3] for fixture_id, option in best[0].items()}, best[1]
+
+def filter_fixtures_by_date(fixtures: Dict, slots_by_date: Dict,
+                            start_date: str = None, end_date: str = None) -> Tuple[Dict, Dict]:
+    """Restrict fixtures and slots to an inclusive YYYY-MM-DD date range"""
+    def in_range(date):
+        return (start_date is None or date >= start_date) and (end_date is None or date <= end_date)
+    
+    fixtures = {fid: f for fid, f in fixtures.items() if in_range(f['fixture_date'])}
+    slots_by_date = {date: slots for date, slots in slots_by_date.items() if in_range(date)}
+    return fixtures, slots_by_date
+
 # =====================================
 # ⚙️ Build and Solve Model
 # =====================================
-def solve_allocation(fixtures: Dict, slots_by_date: Dict, timeout: int = 30):
-    """Build and solve the CP-SAT model"""
+@profiled('solve_allocation')
+def solve_allocation(fixtures: Dict, slots_by_date: Dict, timeout: int = 30,
+                     num_workers: int = 8, stop_event: threading.Event = None,
+                     random_seed: int = None, report: Dict = None,
+                     config: AllocatorConfig = None, verbose: bool = True,
+                     calendar: AvailabilityCalendar = None, incumbent: Dict = None,
+                     solver_params: Dict = None):
+    """Build and solve the CP-SAT model
+    stop_event: optional threading.Event - setting it stops the search early
+    (the best solution found so far is still returned)
+    report: optional run report (cranleighFC_profiling) - receives phase
+    timings and CP-SAT statistics
+    config: optional AllocatorConfig (defaults to CONFIG)
+    verbose: False skips the allocation analysis printout (batch/sub-solves)
+    calendar: optional AvailabilityCalendar - closed slots get no variables,
+    penalised pitches/dates lose weight
+    incumbent: optional {fixture_id: (time, pitch)} current placements - kept
+    where nothing better is available (STABILITY_BONUS) and used as a hint
+    solver_params: optional extra CP-SAT parameters (a portfolio strategy)
+    Dates with at most TRIVIAL_DATE_FIXTURES fixtures are enumerated exactly
+    (solve_small_date) and left out of the model; with nothing left to
+    search, no CP-SAT solver is started"""
+    config = CONFIG if config is None else config
+    all_slots_by_date = slots_by_date
+    if calendar is not None:
+        slots_by_date = calendar.prune_slots(slots_by_date)
+    catalogue = config.pitches
+    weights = config.weights
+    clock = PhaseClock(report)
     model = cp_model.CpModel()
     fixture_slot_vars = {}
     
+    # ✅ Indexes built alongside the variables - no rescans of fixture_slot_vars
+    vars_by_fixture = {}      # fixture_id -> [var]
+    vars_by_slot = {}         # (date, time, pitch) -> [var]
+    vars_by_pitch_day = {}    # (date, pitch) -> [var]
+    vars_by_fixture_time = {} # fixture_id -> {time: [var]}
+    slot_weights = []         # (weight, var) objective terms
+    
     # Track reasons why fixtures can't be allocated
     no_slots_teams = []
     constraint_blocked = {}
+    option_counts = {}        # fixture_id -> number of valid slots
+    
+    # ✅ Counting bounds before any model: definite overflows are reported
+    # now, and dates with only a few fixtures skip the search altogether
+    print_capacity_overflows(capacity_bounds(fixtures, slots_by_date, config))
+    fixtures_per_date = {}
+    for fdata in fixtures.values():
+        fixtures_per_date[fdata['fixture_date']] = fixtures_per_date.get(fdata['fixture_date'], 0) + 1
+    small_dates = {date: {} for date, count in fixtures_per_date.items() if count <= TRIVIAL_DATE_FIXTURES}
+    clock.lap('capacity_bounds')
     
     # Create variables - ONLY for slots on the fixture's scheduled date
     for fixture_id, fdata in fixtures.items():
@@ -353,38 +788,50 @@ def solve_allocation(fixtures: Dict, slots_by_date: Dict, timeout: int = 30):
         if fixture_date not in slots_by_date:
             no_slots_teams.append((fixture_id, fixture_date, "Date not in schedule"))
             continue
-            
+        
         available_slots = slots_by_date[fixture_date]
-        fixture_valid_slots = 0
-        blocked_reasons = []
+        options = slot_options(fdata, available_slots, config)
+        option_counts[fixture_id] = len(options)
         
-        for (date, time, pitch) in available_slots:
-            # Track why slots are rejected
-            if fdata['format_req'] != pitches[pitch]['format']:
-                blocked_reasons.append(f"Format mismatch (needs {fdata['format_req']})")
-                continue
-            if fdata['age_group'] in ['Seniors', 'Womens'] and time != '14:00':
-                blocked_reasons.append(f"Seniors must play at 14:00")
-                continue
-            if fdata['age_group'] not in ['Seniors', 'Womens'] and time == '14:00':
-                blocked_reasons.append(f"Youth can't play at 14:00")
-                continue
-            
-            # Hard constraint - only seniors/womens can use P6
-            if pitch == 'P6 11v11 (Seniors)' and fdata['age_group'] not in ['Seniors', 'Womens']:
-                blocked_reasons.append(f"Non-seniors can't use P6")
-                continue
-            
+        for (date, time, pitch, weight) in options:
             # This slot is valid!
+            if calendar is not None:
+                weight -= calendar.penalty(pitch, date)
+            if incumbent is not None and incumbent.get(fixture_id) == (time, pitch):
+                weight += STABILITY_BONUS
+            if fixture_date in small_dates:
+                small_dates[fixture_date].setdefault(fixture_id, []).append((date, time, pitch, weight))
+                continue
             var = model.NewBoolVar(f'{fixture_id}_{date}_{time}_{pitch}')
             fixture_slot_vars[(fixture_id, date, time, pitch)] = var
-            fixture_valid_slots += 1
+            vars_by_fixture.setdefault(fixture_id, []).append(var)
+            vars_by_slot.setdefault((date, time, pitch), []).append(var)
+            vars_by_pitch_day.setdefault((date, pitch), []).append(var)
+            vars_by_fixture_time.setdefault(fixture_id, {}).setdefault(time, []).append(var)
+            slot_weights.append((weight, var))
+            if incumbent is not None and fixture_id in incumbent:
+                model.AddHint(var, incumbent[fixture_id] == (time, pitch))
         
-        # Track fixtures with no valid slots
-        if fixture_valid_slots == 0:
-            unique_reasons = list(set(blocked_reasons))[:3]
+        # Track fixtures with no valid slots (reasons only needed here)
+        if not options:
+            blocked_reasons = [slot_block_reason(fdata, time, pitch, config)
+                               or (calendar and calendar.closure_reason(pitch, fixture_date, time))
+                               for (_, time, pitch) in all_slots_by_date[fixture_date]]
+            unique_reasons = list(set(reason for reason in blocked_reasons if reason))[:3]
             constraint_blocked[fixture_id] = (fixture_date, unique_reasons)
     
+    # Few-fixture dates: exact enumeration instead of search
+    presolved = {}
+    presolved_objective = 0
+    for options_by_fixture in small_dates.values():
+        if options_by_fixture:
+            placements, objective = solve_small_date(options_by_fixture, config, fixtures)
+            presolved.update(placements)
+            presolved_objective += objective
+    if small_dates:
+        print(f'\n📐 {len(small_dates)} date(s) with ≤{TRIVIAL_DATE_FIXTURES} fixtures allocated '
+              f'without search ({len(presolved)} fixture(s))')
+    
     print(f'\nCreated {len(fixture_slot_vars)} decision variables')
     
     # Report fixtures that can't be allocated
@@ -400,130 +847,119 @@ def solve_allocation(fixtures: Dict, slots_by_date: Dict, timeout: int = 30):
             for reason in reasons[:2]:
                 print(f"    → {reason}")
     
+    clock.lap('variable_creation')
+    
     # ✅ SOFT Constraint: Each fixture assigned AT MOST once (not exactly once)
     # This allows the solver to find a solution even if some fixtures can't be allocated
     allocation_vars = {}  # Track if each fixture is allocated
     
-    for fixture_id in fixtures.keys():
-        fixture_vars = [v for (fid, _, _, _), v in fixture_slot_vars.items() if fid == fixture_id]
-        if fixture_vars:
-            # Create indicator variable: is this fixture allocated?
-            allocated = model.NewBoolVar(f'allocated_{fixture_id}')
-            model.Add(sum(fixture_vars) == 1).OnlyEnforceIf(allocated)
-            model.Add(sum(fixture_vars) == 0).OnlyEnforceIf(allocated.Not())
-            allocation_vars[fixture_id] = allocated
+    for fixture_id, fixture_vars in vars_by_fixture.items():
+        # Indicator variable: is this fixture allocated? (one linear equality)
+        allocated = model.NewBoolVar(f'allocated_{fixture_id}')
+        model.Add(sum(fixture_vars) == allocated)
+        allocation_vars[fixture_id] = allocated
     
     # Track fixtures with no valid slots at all
-    impossible_fixtures = set(fixtures.keys()) - set(allocation_vars.keys())
+    impossible_fixtures = {fixture_id for fixture_id in fixtures if not option_counts.get(fixture_id)}
     
     # Constraint: One fixture per exact time slot (date+time+pitch)
-    unique_slots = set((d, t, p) for (_, d, t, p) in fixture_slot_vars.keys())
-    for date, time, pitch in unique_slots:
-        vars_slot = [v for (_, d, t, p), v in fixture_slot_vars.items() 
-                    if d == date and t == time and p == pitch]
-        if vars_slot:
-            model.Add(sum(vars_slot) <= 1)
+    for vars_slot in vars_by_slot.values():
+        if len(vars_slot) > 1:
+            model.AddAtMostOne(vars_slot)
+    
+    # ✅ Split pitches: whole or one layout per kickoff (shared capacity, no pairwise exclusions)
+    add_split_constraints(model, vars_by_slot, config)
+    
+    # ✅ Changing rooms, parking etc.: cumulative load per site and kickoff
+    resource_limits = add_resource_constraints(model, vars_by_slot, config)
+    if resource_limits:
+        print(f'\n🚻 {resource_limits} site resource limit(s) could bind')
+    
+    # ✅ Shared coaches and siblings: linked teams' kickoffs can't overlap
+    link_groups = add_link_constraints(model, fixtures, vars_by_fixture_time, config)
+    if link_groups:
+        print(f'\n🔗 {link_groups} linked-team no-overlap group(s)')
     
     # Constraint: Max 2 games per pitch per day
-    for date in set(d for (_, d, _, _) in fixture_slot_vars.keys()):
-        for pitch in pitches.keys():
-            vars_day = [v for (fid, d, _, p), v in fixture_slot_vars.items() 
-                       if d == date and p == pitch]
-            if vars_day:
-                model.Add(sum(vars_day) <= 2)
+    max_games = config.max_games_per_pitch_per_day
+    for vars_day in vars_by_pitch_day.values():
+        if len(vars_day) > max_games:
+            model.Add(sum(vars_day) <= max_games)
     
     # ✅ Avoid back-to-back matches on same pitch (any day)
     # Penalize consecutive 09:30 + 11:00 slots on same pitch
     # Glebelands pitches exempt as they're designed for overflow
+    first_kickoff, second_kickoff = config.back_to_back_kickoffs
     backtoback_penalty_vars = []
-    for date in set(d for (_, d, _, _) in fixture_slot_vars.keys()):
-        for pitch, pitch_info in pitches.items():
-            # Skip Glebelands pitches - they can handle back-to-back as overflow
-            if pitch_info.get('location') == 'glebelands':
-                continue
-                
-            # Check for back-to-back slots (09:30 + 11:00) on main pitches
-            slot_0930 = [(fid, var) for (fid, d, t, p), var in fixture_slot_vars.items() 
-                        if d == date and p == pitch and t == '09:30']
-            slot_1100 = [(fid, var) for (fid, d, t, p), var in fixture_slot_vars.items() 
-                        if d == date and p == pitch and t == '11:00']
-            
-            if slot_0930 and slot_1100:
-                # Create penalty variable: 1 if both slots used on same pitch
-                penalty = model.NewBoolVar(f'backtoback_penalty_{date}_{pitch}')
-                
-                # Penalty is 1 only if both 09:30 AND 11:00 slots are used
-                vars_0930 = [v for _, v in slot_0930]
-                vars_1100 = [v for _, v in slot_1100]
-                
-                # both_used = 1 if (09:30 slot used) AND (11:00 slot used)
-                model.Add(sum(vars_0930) + sum(vars_1100) == 2).OnlyEnforceIf(penalty)
-                model.Add(sum(vars_0930) + sum(vars_1100) <= 1).OnlyEnforceIf(penalty.Not())
-                
-                backtoback_penalty_vars.append(penalty)
-    
-    # Objective: Maximize number of allocated fixtures + weighted satisfaction
-    objective_terms = []
-    
-    # Primary goal: maximize number of fixtures allocated
-    for fixture_id, allocated_var in allocation_vars.items():
-        objective_terms.append(allocated_var * 10000)  # Very high weight for allocation
-    
-    # ✅ Penalize back-to-back matches on same pitch (any day)
-    for penalty_var in backtoback_penalty_vars:
-        objective_terms.append(penalty_var * -500)  # Subtract 500 points for back-to-back
-    
-    # Secondary goal: optimize quality of allocations
-    for (fixture_id, date, time, pitch), var in fixture_slot_vars.items():
-        f = fixtures[fixture_id]
-        weight = f['priority'] * 10  # Reduced weight (secondary to allocation)
-        
-        # ✅ Penalize Glebelands pitches to make them secondary choice
-        pitch_info = pitches[pitch]
-        if pitch_info.get('location') == 'glebelands':
-            weight -= 300  # Strong penalty - only use as overflow
-        
-        # ✅ NEW: Cup fixtures get strong bonus for 09:30 kickoff
-        if f.get('is_cup', False) and time == '09:30':
-            weight += 500  # Very strong preference for 09:30
-        
-        # ✅ NEW: Cup fixtures get pitch priority (prefer best pitches)
-        if f.get('is_cup', False):
-            # Prefer main 11v11 pitches for cup games
-            if f['format_req'] == '11v11' and pitch in ['P1 11v11 (Bruce McKenzie)', 'P2 11v11', 'P6 11v11 (Seniors)']:
-                weight += 200  # Strong preference for premier pitches
-            # Prefer main format-appropriate pitches for other cup games
-            elif pitch in ['P4 9v9', 'P7 9v9'] and f['format_req'] == '9v9':
-                weight += 150
-            elif pitch in ['P5 7v7', 'P8 7v7', 'P9 7v7', 'CCC3 7v7', 'CCC4 7v7'] and f['format_req'] == '7v7':
-                weight += 150
-            elif pitch in ['CCC1 5v5', 'CCC2 5v5'] and f['format_req'] == '5v5':
-                weight += 150
-        
-        # Strong bonus for U13/U14 getting P3 Middle pitch
-        if pitch == 'P3 11v11 (Middle)' and f['age_group'] in p3_middle_priority:
-            priority_bonus = p3_middle_priority[f['age_group']]
-            weight += priority_bonus * 75  # U13 gets +225, U14 gets +150, U15 gets +75
-        
-        # Strong bonus for senior teams getting P6 based on their priority
-        if pitch == 'P6 11v11 (Seniors)' and f['senior_priority'] > 0:
-            weight += f['senior_priority'] * 50
+    for (date, pitch) in vars_by_pitch_day:
+        # Skip Glebelands pitches - they can handle back-to-back as overflow
+        if config.pitch_overflow[config.pitch_index[pitch]]:
+            continue
         
-        # Bonus for preferred time (including Cup 09:30 preference)
-        if time == f['preferred_time']:
-            weight += 50
+        # Check for back-to-back slots (09:30 + 11:00) on main pitches
+        vars_0930 = vars_by_slot.get((date, first_kickoff, pitch))
+        vars_1100 = vars_by_slot.get((date, second_kickoff, pitch))
         
-        objective_terms.append(weight * var)
+        if vars_0930 and vars_1100:
+            # Penalty must be 1 if both slots are used; the objective keeps it
+            # at 0 otherwise (each slot holds at most one fixture)
+            penalty = model.NewBoolVar(f'backtoback_penalty_{date}_{pitch}')
+            model.Add(sum(vars_0930) + sum(vars_1100) - 1 <= penalty)
+            backtoback_penalty_vars.append(penalty)
     
-    model.Maximize(sum(objective_terms))
+    # Objective: Maximize number of allocated fixtures + weighted satisfaction
+    # Primary goal: maximize number of fixtures allocated (very high weight),
+    # ✅ penalize back-to-back matches on same pitch (any day),
+    # secondary goal: optimize quality of allocations
+    model.Maximize(
+        cp_model.LinearExpr.WeightedSum(list(allocation_vars.values()),
+                                        [weights['allocation']] * len(allocation_vars))
+        - cp_model.LinearExpr.WeightedSum(backtoback_penalty_vars,
+                                          [weights['back_to_back_penalty']] * len(backtoback_penalty_vars))
+        + cp_model.LinearExpr.WeightedSum([var for _, var in slot_weights],
+                                          [weight for weight, _ in slot_weights])
+    )
+    clock.lap('constraint_build')
     
     # Solve
     solver = cp_model.CpSolver()
     solver.parameters.max_time_in_seconds = timeout
-    solver.parameters.num_search_workers = 8
+    solver.parameters.num_search_workers = num_workers
+    if random_seed is not None:
+        solver.parameters.random_seed = random_seed
+    for name, value in (solver_params or {}).items():
+        setattr(solver.parameters, name, value)
+    
+    if stop_event is not None and stop_event.is_set():
+        print('\n⏹️ Solve cancelled before search started')
+        clock.lap('solve')
+        return None
     
-    print(f'\n🔍 Solving (timeout: {timeout}s)...')
-    status = solver.Solve(model)
+    if fixture_slot_vars:
+        # ✅ Background jobs can cancel a running search via stop_event
+        search_finished = threading.Event()
+        if stop_event is not None:
+            def stop_when_requested():
+                while not search_finished.is_set():
+                    if stop_event.wait(0.1):
+                        solver.StopSearch()
+                        return
+            threading.Thread(target=stop_when_requested, daemon=True).start()
+        
+        print(f'\n🔍 Solving (timeout: {timeout}s, workers: {num_workers})...')
+        try:
+            status = solver.Solve(model)
+        finally:
+            search_finished.set()
+        clock.lap('solve')
+        record_solver_statistics(report, solver, model, status)
+        wall_time = solver.WallTime()
+    else:
+        # Every date was presolved (or has no valid slots) - nothing to search
+        status = cp_model.OPTIMAL
+        wall_time = 0.0
+        clock.lap('solve')
+    record_presolved_objective(report, presolved_objective)
     
     # Report results
     status_map = {
@@ -535,9 +971,10 @@ def solve_allocation(fixtures: Dict, slots_by_date: Dict, timeout: int = 30):
     }
     
     print(f'\nStatus: {status_map.get(status, "UNKNOWN")}')
-    print(f'Wall time: {solver.WallTime():.2f}s')
+    print(f'Wall time: {wall_time:.2f}s')
     if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-        print(f'Objective value: {solver.ObjectiveValue()}')
+        searched_objective = solver.ObjectiveValue() if fixture_slot_vars else 0
+        print(f'Objective value: {searched_objective + presolved_objective}')
     
     if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
         # Extract solution
@@ -547,24 +984,18 @@ def solve_allocation(fixtures: Dict, slots_by_date: Dict, timeout: int = 30):
         for (fixture_id, date, time, pitch), var in fixture_slot_vars.items():
             if solver.Value(var) == 1:
                 allocated_fixture_ids.add(fixture_id)
-                f = fixtures[fixture_id]
-                matched_time = time == f['preferred_time']
-                matched_pitch = pitch == f['pref_pitch'] if f['pref_pitch'] else False
-                
-                allocations.append({
-                    'fixture_id': fixture_id,
-                    'team': f['team_name'],
-                    'date': date,
-                    'time': time,
-                    'pitch': pitch,
-                    'age_group': f['age_group'],
-                    'priority': f['priority'],
-                    'matched_pref_time': matched_time,
-                    'matched_pref_pitch': matched_pitch,
-                    'is_cup': f.get('is_cup', False)
-                })
+                allocations.append(allocation_record(fixture_id, fixtures[fixture_id], date, time, pitch))
+        for fixture_id, (date, time, pitch) in presolved.items():
+            allocated_fixture_ids.add(fixture_id)
+            allocations.append(allocation_record(fixture_id, fixtures[fixture_id], date, time, pitch))
         
         df = pd.DataFrame(allocations) if allocations else pd.DataFrame()
+        clock.lap('extraction')
+        
+        if not verbose:
+            df = df.sort_values(['date', 'time', 'pitch']) if len(df) > 0 else None
+            clock.lap('reporting')
+            return df
         
         # ✅ ANALYZE UNALLOCATED FIXTURES
         unallocated_fixtures = set(fixtures.keys()) - allocated_fixture_ids
@@ -593,14 +1024,11 @@ def solve_allocation(fixtures: Dict, slots_by_date: Dict, timeout: int = 30):
                     })
                 else:
                     # Had valid slots but wasn't allocated - capacity issue
-                    # Count how many slots were available
-                    available_for_fixture = [v for (fid, _, _, _), v in fixture_slot_vars.items() if fid == fixture_id]
-                    
                     reason_categories['capacity'].append({
                         'fixture_id': fixture_id,
                         'team': fdata['team_name'],
                         'date': fixture_date,
-                        'reason': f'All {len(available_for_fixture)} compatible slots occupied'
+                        'reason': f'All {option_counts[fixture_id]} compatible slots occupied'
                     })
             
             # Print categorized results
@@ -640,7 +1068,7 @@ def solve_allocation(fixtures: Dict, slots_by_date: Dict, timeout: int = 30):
             if len(seniors_on_p6) > 0:
                 p6_by_team = seniors_on_p6.groupby('team').size().reset_index(name='fixtures')
                 for _, row in p6_by_team.iterrows():
-                    priority = senior_team_priority.get(row['team'], 0)
+                    priority = config.senior_priority.get(row['team'], 0)
                     print(f"  - {row['team']}: {row['fixtures']} fixture(s) [priority: {priority}]")
             else:
                 print(f"  - No senior fixtures on P6")
@@ -650,7 +1078,7 @@ def solve_allocation(fixtures: Dict, slots_by_date: Dict, timeout: int = 30):
                 print(f'\n🎯 P3 11v11 (Middle) - Small Pitch Allocations:')
                 p3_by_age = fixtures_on_p3.groupby('age_group').size().reset_index(name='fixtures')
                 for _, row in p3_by_age.iterrows():
-                    priority = p3_middle_priority.get(row['age_group'], 0)
+                    priority = config.p3_middle_priority.get(row['age_group'], 0)
                     priority_label = f"priority: {priority}" if priority > 0 else "no priority"
                     print(f"  - {row['age_group']}: {row['fixtures']} fixture(s) [{priority_label}]")
                 
@@ -710,8 +1138,8 @@ def solve_allocation(fixtures: Dict, slots_by_date: Dict, timeout: int = 30):
                         teams = pitch_fixtures.sort_values('time')['team'].tolist()
                         
                         # Check if it's a Glebelands pitch
-                        pitch_info = pitches.get(pitch, {})
-                        is_glebelands = pitch_info.get('location') == 'glebelands'
+                        pitch_info = catalogue.get(pitch, {})
+                        is_glebelands = is_overflow_pitch(pitch_info)
                         
                         if is_glebelands:
                             print(f"  ℹ️ {date} - {pitch}: Back-to-back (Glebelands overflow)")
@@ -726,7 +1154,7 @@ def solve_allocation(fixtures: Dict, slots_by_date: Dict, timeout: int = 30):
                 print(f"  ✓ No back-to-back matches (optimized spreading)")
             else:
                 main_pitch_backtoback = len([p for p in df['pitch'].unique() 
-                                            if pitches.get(p, {}).get('location') != 'glebelands'])
+                                            if not is_overflow_pitch(catalogue.get(p, {}))])
                 print(f"  Total: {total_back_to_back} pitch(es) with back-to-back")
                 print(f"  (System minimizes back-to-back but may occur if capacity is tight)")
             
@@ -756,18 +1184,434 @@ def solve_allocation(fixtures: Dict, slots_by_date: Dict, timeout: int = 30):
             if len(conflicts) > 0:
                 print(f'\n⚠️ WARNING: {len(conflicts)} slot conflicts detected!')
             
-            return df.sort_values(['date', 'time', 'pitch'])
+            df = df.sort_values(['date', 'time', 'pitch'])
+            clock.lap('reporting')
+            return df
         else:
             print('\n❌ No fixtures could be allocated')
+            clock.lap('reporting')
             return None
     
     return None
 
+# =====================================
+# 🧩 Decomposed Parallel Solve
+# =====================================
+def partition_subproblems(fixtures: Dict, slots_by_date: Dict,
+                          config: AllocatorConfig = None) -> List[Tuple[Dict, Dict]]:
+    """
+    Split an allocation into independent (fixtures, slots_by_date) parts.
+    Every constraint and objective term involves a single date, so dates
+    never interact, and venues only interact through clubs that share them
+    or linked teams playing at both: each part is one date x one connected
+    group of venues. Fixtures
+    with no usable venue on their date are left out (they stay unallocated).
+    """
+    config = CONFIG if config is None else config
+    catalogue = config.pitches
+    by_date = {}
+    for fixture_id, f in fixtures.items():
+        by_date.setdefault(f['fixture_date'], {})[fixture_id] = f
+    
+    subproblems = []
+    for date in sorted(by_date):
+        slots = slots_by_date.get(date, [])
+        parent = {catalogue[pitch]['location']: catalogue[pitch]['location'] for (_, _, pitch) in slots}
+        
+        def find(venue):
+            while parent[venue] != venue:
+                parent[venue] = parent[parent[venue]]
+                venue = parent[venue]
+            return venue
+        
+        def usable_venues(f):
+            venues = parent.keys() if f.get('venues') is None else f['venues']
+            return [venue for venue in venues if venue in parent]
+        
+        # Union the venues each club can use - shared venues link clubs
+        for f in by_date[date].values():
+            venues = usable_venues(f)
+            for venue in venues[1:]:
+                parent[find(venue)] = find(venues[0])
+        # ...and so do linked teams (shared coaches, siblings) playing that day
+        fixture_of_team = {f['team_name']: f for f in by_date[date].values()}
+        for teams in config.links.values():
+            venues = [venue for team in teams if team in fixture_of_team
+                      for venue in usable_venues(fixture_of_team[team])]
+            for venue in venues[1:]:
+                parent[find(venue)] = find(venues[0])
+        
+        groups = {}
+        for fixture_id, f in by_date[date].items():
+            venues = usable_venues(f)
+            if venues:
+                groups.setdefault(find(venues[0]), {})[fixture_id] = f
+        
+        for root, group_fixtures in groups.items():
+            group_slots = [slot for slot in slots if find(catalogue[slot[2]]['location']) == root]
+            subproblems.append((group_fixtures, {date: group_slots}))
+    
+    return subproblems
+
+def _solve_subproblem(fixtures: Dict, slots_by_date: Dict, config: AllocatorConfig,
+                      timeout: int, num_workers: int, random_seed: int,
+                      calendar: AvailabilityCalendar = None, incumbent: Dict = None):
+    """Process pool task: solve one part quietly, returning (result, run report)"""
+    report = new_run_report()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        result = solve_allocation(fixtures, slots_by_date, timeout=timeout, num_workers=num_workers,
+                                  random_seed=random_seed, report=report,
+                                  config=config, verbose=False, calendar=calendar,
+                                  incumbent=incumbent)
+    return result, report
+
+def solve_allocation_parallel(fixtures: Dict, slots_by_date: Dict, timeout: int = 30,
+                              num_workers: int = 8, max_processes: int = None,
+                              stop_event: threading.Event = None, random_seed: int = None,
+                              report: Dict = None, config: AllocatorConfig = None,
+                              calendar: AvailabilityCalendar = None, incumbent: Dict = None):
+    """
+    Exact allocation by decomposition: solve each independent date x venue
+    group (partition_subproblems) with CP-SAT in a process pool and combine.
+    Gives the same objective as solve_allocation, as the model is separable.
+    num_workers CP-SAT workers are shared between the concurrent processes;
+    timeout applies to each part. Report phases are summed across parts.
+    """
+    config = CONFIG if config is None else config
+    clock = PhaseClock(report)
+    if calendar is not None:
+        slots_by_date = calendar.prune_slots(slots_by_date)
+    subproblems = partition_subproblems(fixtures, slots_by_date, config)
+    # ✅ Parts small enough to enumerate (solve_small_date) never reach the pool
+    small = [part for part in subproblems if len(part[0]) <= TRIVIAL_DATE_FIXTURES]
+    searched = [part for part in subproblems if len(part[0]) > TRIVIAL_DATE_FIXTURES]
+    processes = max(1, min(max_processes or os.cpu_count() or 1, len(searched)))
+    workers_each = max(1, num_workers // processes)
+    clock.lap('partition')
+    
+    print(f'\n🧩 Solving {len(subproblems)} independent subproblem(s): {len(small)} small enough '
+          f'to enumerate, {len(searched)} on {processes} process(es), {workers_each} worker(s) each...')
+    
+    outcomes = []
+    for sub_fixtures, sub_slots in small:
+        if stop_event is not None and stop_event.is_set():
+            break
+        outcomes.append(_solve_subproblem(sub_fixtures, sub_slots, config, timeout,
+                                          workers_each, random_seed, calendar, incumbent))
+    if processes == 1:
+        for sub_fixtures, sub_slots in searched:
+            if stop_event is not None and stop_event.is_set():
+                break
+            outcomes.append(_solve_subproblem(sub_fixtures, sub_slots, config, timeout,
+                                              workers_each, random_seed, calendar, incumbent))
+    else:
+        # spawn: safe alongside the app's and service's worker threads
+        with ProcessPoolExecutor(max_workers=processes,
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [pool.submit(_solve_subproblem, sub_fixtures, sub_slots, config, timeout,
+                                   workers_each, random_seed, calendar, incumbent)
+                       for sub_fixtures, sub_slots in searched]
+            for future in as_completed(futures):
+                if stop_event is not None and stop_event.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                outcomes.append(future.result())
+    clock.lap('subproblems')
+    
+    for _, sub_report in outcomes:
+        for phase, seconds in sub_report['phases'].items():
+            record_phase(report, phase, seconds)
+    if report is not None:
+        report['solver'] = merge_solver_statistics([sub_report['solver'] for _, sub_report in outcomes])
+    
+    frames = [result for result, _ in outcomes if result is not None and len(result) > 0]
+    stopped = stop_event is not None and stop_event.is_set()
+    print(f'{"⏹️ Stopped" if stopped else "✅ Solved"} {len(outcomes)}/{len(subproblems)} subproblem(s): '
+          f'{sum(len(frame) for frame in frames)}/{len(fixtures)} fixtures allocated')
+    
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True).sort_values(['date', 'time', 'pitch'])
+
+# =====================================
+# 🎲 Solver Portfolio
+# =====================================
+# Named CP-SAT parameter sets - runs cycle through them with different seeds
+PORTFOLIO_STRATEGIES = {
+    'default': {},
+    'lp': {'linearization_level': 2},                  # Full LP relaxation - tighter bounds
+    'core': {'optimize_with_core': True},              # Bound from unsatisfiable cores
+    'quick_restart': {'search_branching': cp_model.PORTFOLIO_WITH_QUICK_RESTART_SEARCH},
+}
+PORTFOLIO_RUNS = 4
+
+def _solve_portfolio_run(fixtures: Dict, slots_by_date: Dict, config: AllocatorConfig,
+                         deadline: float, num_workers: int, seed: int, strategy: str,
+                         stop_event, calendar: AvailabilityCalendar = None, incumbent: Dict = None):
+    """Process pool task: one seed/strategy run quietly until the shared
+    wall-clock deadline, returning (result, run report)"""
+    report = new_run_report()
+    remaining = deadline - time.time()
+    if remaining <= 0 or stop_event.is_set():
+        return None, report
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        result = solve_allocation(fixtures, slots_by_date, timeout=remaining, num_workers=num_workers,
+                                  stop_event=stop_event, random_seed=seed, report=report,
+                                  config=config, verbose=False, calendar=calendar,
+                                  incumbent=incumbent, solver_params=PORTFOLIO_STRATEGIES[strategy])
+    return result, report
+
+def solve_allocation_portfolio(fixtures: Dict, slots_by_date: Dict, timeout: int = 30,
+                               num_workers: int = 8, runs: int = PORTFOLIO_RUNS,
+                               strategies: List[str] = None, max_processes: int = None,
+                               stop_event: threading.Event = None, random_seed: int = None,
+                               report: Dict = None, config: AllocatorConfig = None,
+                               calendar: AvailabilityCalendar = None, incumbent: Dict = None):
+    """
+    Solve the same model `runs` times with different seeds (random_seed,
+    random_seed + 1, ...) and strategies (PORTFOLIO_STRATEGIES, cycled) in
+    a process pool under one shared deadline of `timeout` seconds, and keep
+    the best allocation. The first run to prove optimality stops the rest.
+    num_workers CP-SAT workers are shared between the concurrent processes.
+    report['solver'] is the winning run's, with every run in 'portfolio'.
+    """
+    config = CONFIG if config is None else config
+    clock = PhaseClock(report)
+    strategies = strategies or list(PORTFOLIO_STRATEGIES)
+    unknown = [strategy for strategy in strategies if strategy not in PORTFOLIO_STRATEGIES]
+    if unknown:
+        raise ValueError(f"Unknown portfolio strategies: {', '.join(unknown)}")
+    base_seed = 0 if random_seed is None else random_seed
+    plan = [(base_seed + i, strategies[i % len(strategies)]) for i in range(max(1, runs))]
+    processes = max(1, min(max_processes or os.cpu_count() or 1, len(plan)))
+    workers_each = max(1, num_workers // processes)
+    deadline = time.time() + timeout
+    
+    print(f'\n🎲 Portfolio: {len(plan)} run(s) on {processes} process(es), {workers_each} worker(s) each, '
+          f'{timeout}s shared deadline...')
+    
+    outcomes = []   # (seed, strategy, result, run report)
+    if processes == 1:
+        # One at a time - later runs only use what's left of the deadline
+        stop = threading.Event()
+        for seed, strategy in plan:
+            if stop_event is not None and stop_event.is_set():
+                break
+            result, run_report = _solve_portfolio_run(fixtures, slots_by_date, config, deadline,
+                                                      workers_each, seed, strategy, stop_event or stop,
+                                                      calendar, incumbent)
+            outcomes.append((seed, strategy, result, run_report))
+            if run_report['solver'].get('status') == 'OPTIMAL':
+                break
+    else:
+        context = multiprocessing.get_context('spawn')
+        with context.Manager() as manager, ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+            stop = manager.Event()   # Shared by every run - set on proven optimality or cancel
+            finished = threading.Event()
+            if stop_event is not None:
+                def forward_cancel():
+                    while not finished.is_set():
+                        if stop_event.wait(0.1):
+                            stop.set()
+                            return
+                threading.Thread(target=forward_cancel, daemon=True).start()
+            futures = {pool.submit(_solve_portfolio_run, fixtures, slots_by_date, config, deadline,
+                                   workers_each, seed, strategy, stop, calendar, incumbent): (seed, strategy)
+                       for seed, strategy in plan}
+            try:
+                for future in as_completed(futures):
+                    result, run_report = future.result()
+                    outcomes.append(futures[future] + (result, run_report))
+                    if run_report['solver'].get('status') == 'OPTIMAL':
+                        stop.set()
+            finally:
+                finished.set()
+    clock.lap('portfolio')
+    
+    def score(outcome):
+        stats = outcome[3]['solver']
+        objective = stats.get('objective')
+        return (objective is not None, objective or 0, stats.get('status') == 'OPTIMAL')
+    
+    runs_summary = [{'seed': seed, 'strategy': strategy,
+                     'status': run_report['solver'].get('status', 'NOT_STARTED'),
+                     'objective': run_report['solver'].get('objective'),
+                     'wall_time': run_report['solver'].get('wall_time')}
+                    for seed, strategy, _, run_report in outcomes]
+    best = max(outcomes, key=score, default=None)
+    if best is None or best[3]['solver'].get('objective') is None:
+        print('\n❌ No portfolio run found an allocation')
+        if report is not None:
+            report['solver'] = {'status': 'UNKNOWN', 'portfolio': runs_summary}
+        return None
+    
+    seed, strategy, result, best_report = best
+    for phase, seconds in best_report['phases'].items():
+        record_phase(report, phase, seconds)
+    if report is not None:
+        report['solver'] = dict(best_report['solver'], seed=seed, strategy=strategy,
+                                portfolio=runs_summary)
+    print(f"✅ Best of {len(outcomes)} run(s): seed {seed} ({strategy}), "
+          f"{best_report['solver']['status']}, objective {best_report['solver']['objective']}")
+    return result
+
+def replan_allocation(fixtures: Dict, slots_by_date: Dict, previous: pd.DataFrame,
+                      calendar: AvailabilityCalendar, dates: List[str] = None,
+                      timeout: int = 30, num_workers: int = 8, max_processes: int = None,
+                      random_seed: int = None, report: Dict = None,
+                      config: AllocatorConfig = None) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Re-solve only the dates a calendar change affects, keeping every other
+    date's allocation. Closing or penalising slots an allocation doesn't use
+    can't improve on it, so by default only dates where `previous` uses a
+    closed or penalised slot are re-solved; pass dates= as well where
+    pitches reopened or windows grew.
+    Returns the combined allocation and the re-solved dates.
+    """
+    clock = PhaseClock(report)
+    replan_dates = sorted(affected_dates(previous, calendar) | set(dates or []))
+    clock.lap('replan_check')
+    if not replan_dates:
+        print('\n✅ Availability change affects no allocated slots - nothing to re-solve')
+        return previous, []
+
+    print(f'\n🔁 Re-solving {len(replan_dates)} affected date(s): {", ".join(replan_dates)}')
+    sub_slots = {date: slots_by_date[date] for date in replan_dates if date in slots_by_date}
+    sub_fixtures = {fid: f for fid, f in fixtures.items() if f['fixture_date'] in sub_slots}
+    # Keep fixtures where they are unless the change gives a reason to move them
+    incumbent = {}
+    if previous is not None and len(previous) > 0:
+        moved = previous[previous['date'].isin(replan_dates)]
+        incumbent = dict(zip(moved['fixture_id'], zip(moved['time'], moved['pitch'])))
+    result = solve_allocation_parallel(sub_fixtures, sub_slots, timeout=timeout,
+                                       num_workers=num_workers, max_processes=max_processes,
+                                       random_seed=random_seed, report=report,
+                                       config=config, calendar=calendar, incumbent=incumbent)
+
+    kept = previous if previous is not None else pd.DataFrame()
+    if len(kept) > 0:
+        kept = kept[~kept['date'].isin(replan_dates)]
+    frames = [frame for frame in (kept, result) if frame is not None and len(frame) > 0]
+    if not frames:
+        return None, replan_dates
+    combined = pd.concat(frames, ignore_index=True).sort_values(['date', 'time', 'pitch'])
+    return combined, replan_dates
+
+def solve_allocation_greedy(fixtures: Dict, slots_by_date: Dict, report: Dict = None,
+                            config: AllocatorConfig = None, calendar: AvailabilityCalendar = None):
+    """
+    Fast heuristic allocation without the solver. Fixtures with the fewest
+    valid slots go first; each takes its best remaining slot by slot_weight,
+    respecting one fixture per slot, max 2 per pitch per day, one layout
+    per split pitch kickoff, site resource limits and no overlapping kickoffs
+    for linked teams, and avoiding back-to-back main pitch use where possible.
+    """
+    config = CONFIG if config is None else config
+    first_kickoff, second_kickoff = config.back_to_back_kickoffs
+    clock = PhaseClock(report)
+    if calendar is not None:
+        slots_by_date = calendar.prune_slots(slots_by_date)
+    candidates = {}
+    for fixture_id, fdata in fixtures.items():
+        candidates[fixture_id] = [
+            (time, pitch, weight - (calendar.penalty(pitch, date) if calendar is not None else 0))
+            for (date, time, pitch, weight) in slot_options(fdata, slots_by_date.get(fdata['fixture_date'], []), config)
+        ]
+    
+    order = sorted(
+        fixtures.keys(),
+        key=lambda fid: (len(candidates[fid]), not fixtures[fid]['is_cup'],
+                         -fixtures[fid]['senior_priority'], -fixtures[fid]['priority'], fid)
+    )
+    
+    used_slots = set()
+    pitch_day_times = {}
+    layouts_used = {}   # (date, time, parent) -> layout of a split pitch
+    resources_used = {} # (date, venue, resource, kickoff) -> units held
+    teams_placed = {}   # (team, date) -> (time, format) for linked team checks
+    allocations = []
+    
+    for fixture_id in order:
+        f = fixtures[fixture_id]
+        date = f['fixture_date']
+        best = None
+        
+        for time, pitch, score in candidates[fixture_id]:
+            times_used = pitch_day_times.get((date, pitch), set())
+            if (date, time, pitch) in used_slots or len(times_used) >= config.max_games_per_pitch_per_day:
+                continue
+            if layout_clash(layouts_used, date, time, pitch, config):
+                continue
+            if not resources_fit(resources_used, date, time, pitch, config):
+                continue
+            if link_clash(teams_placed, f, time, config):
+                continue
+            if (not config.pitch_overflow[config.pitch_index[pitch]]
+                    and {time} | times_used >= {first_kickoff, second_kickoff}):
+                score -= config.weights['back_to_back_penalty']
+            if best is None or score > best[0]:
+                best = (score, time, pitch)
+        
+        if best is None:
+            continue
+        _, time, pitch = best
+        used_slots.add((date, time, pitch))
+        pitch_day_times.setdefault((date, pitch), set()).add(time)
+        parent, layout = pitch_layout(pitch, config)
+        layouts_used[(date, time, parent)] = layout
+        take_resources(resources_used, date, time, pitch, config)
+        teams_placed[(f['team_name'], date)] = (time, f['format_req'])
+        allocations.append(allocation_record(fixture_id, f, date, time, pitch))
+    clock.lap('solve')
+    
+    print(f'\n⚡ Greedy allocation: {len(allocations)}/{len(fixtures)} fixtures allocated')
+    
+    if not allocations:
+        clock.lap('reporting')
+        return None
+    result = pd.DataFrame(allocations).sort_values(['date', 'time', 'pitch'])
+    clock.lap('reporting')
+    return result
+
+def summarise_allocation(result: pd.DataFrame, fixtures: Dict, config: AllocatorConfig = None) -> Dict:
+    """Headline quality metrics for an allocation (None = nothing allocated)
+    glebelands_usage counts fixtures on overflow venue pitches; back_to_back
+    and cup_at_0930 use the configured back-to-back and cup kickoffs"""
+    config = CONFIG if config is None else config
+    catalogue = config.pitches
+    summary = {
+        'fixtures': len(fixtures),
+        'allocated': 0,
+        'unallocated': len(fixtures),
+        'time_matches': 0,
+        'back_to_back': 0,
+        'glebelands_usage': 0,
+        'cup_at_0930': 0
+    }
+    if result is None or len(result) == 0:
+        return summary
+    
+    is_glebelands = result['pitch'].map(lambda p: is_overflow_pitch(catalogue.get(p, {})))
+    main_times = result[~is_glebelands].groupby(['date', 'pitch'])['time'].agg(set)
+    
+    summary.update({
+        'allocated': int(len(result)),
+        'unallocated': int(len(fixtures) - len(result)),
+        'time_matches': int(result['matched_pref_time'].sum()),
+        'back_to_back': int(sum(1 for times in main_times if set(config.back_to_back_kickoffs) <= times)),
+        'glebelands_usage': int(is_glebelands.sum()),
+        'cup_at_0930': int((result['is_cup'] & (result['time'] == config.cup_kickoff)).sum())
+    })
+    return summary
+
 # =====================================
 # 📊 Visualization Functions
 # =====================================
-def generate_excel_schedule(df: pd.DataFrame, fixtures: Dict, output_file: str):
-    """Generate an Excel workbook with formatted schedules"""
+@profiled('excel_schedule')
+def generate_excel_schedule(df: pd.DataFrame, fixtures: Dict, output_file):
+    """Generate an Excel workbook with formatted schedules
+    output_file may be a path or a writable binary buffer (e.g. io.BytesIO)"""
     
     # ✅ Diagnostic: Check Python environment and openpyxl
     import sys
@@ -873,7 +1717,7 @@ def generate_excel_schedule(df: pd.DataFrame, fixtures: Dict, output_file: str):
         ws.column_dimensions['D'].width = 20
         
         # Get all pitches (show all, even if empty)
-        all_pitches = list(pitches.keys())
+        all_pitches = list(pitches.keys()) + sorted(set(df['pitch']) - set(pitches))
         
         # Fill in data
         for row_idx, pitch in enumerate(all_pitches, 4):
@@ -979,6 +1823,14 @@ def generate_excel_schedule(df: pd.DataFrame, fixtures: Dict, output_file: str):
 
 def generate_html_schedule(df: pd.DataFrame, fixtures: Dict, output_file: str):
     """Generate an interactive HTML schedule visualization"""
+    html = render_html_schedule(df, fixtures)
+    
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+@profiled('html_schedule')
+def render_html_schedule(df: pd.DataFrame, fixtures: Dict) -> str:
+    """Render the interactive HTML schedule as a string"""
     
     # Color scheme by age group
     age_colors = {
@@ -1305,8 +2157,7 @@ def generate_html_schedule(df: pd.DataFrame, fixtures: Dict, output_file: str):
 </html>
 """
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html)
+    return html
 
 # =====================================
 # 🚀 Main Execution
@@ -1321,20 +2172,25 @@ if __name__ == '__main__':
         print(type(removed_duplicates))
       
         if result is not None:
-            # Export CSV
+            # ✅ Build CSV, HTML and Excel concurrently via the export pipeline
+            from cranleighFC_exports import submit_exports
             output_file = 'pitch_allocations_fixed.csv'
-            result.to_csv(output_file, index=False)
+            html_file = 'pitch_allocations_schedule.html'
+            excel_file = 'pitch_allocations_schedule.xlsx'
+            exports = submit_exports(result, fixtures, ['csv', 'html', 'xlsx'])
+            
+            with open(output_file, 'wb') as f:
+                f.write(exports['csv'].result())
             print(f'\n✅ Exported to {output_file}')
             
-            # ✅ Generate HTML visualization
-            html_file = 'pitch_allocations_schedule.html'
-            generate_html_schedule(result, fixtures, html_file)
+            with open(html_file, 'wb') as f:
+                f.write(exports['html'].result())
             print(f'✅ Generated interactive schedule: {html_file}')
             
-            # ✅ Generate Excel workbook
-            excel_file = 'pitch_allocations_schedule.xlsx'
             try:
-                generate_excel_schedule(result, fixtures, excel_file)
+                excel_bytes = exports['xlsx'].result()
+                with open(excel_file, 'wb') as f:
+                    f.write(excel_bytes)
                 print(f'✅ Generated Excel workbook: {excel_file}')
             except Exception as e:
                 print(f'⚠️ Excel generation failed: {e}')
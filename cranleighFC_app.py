@@ -1,19 +1,33 @@
 import streamlit as st
 import pandas as pd
-import io
-from datetime import datetime, timedelta
+from datetime import datetime
+import hashlib
+import uuid
 import os
-import requests
+import time
 
 # Import your existing modules
 from CranleighFC_Pitch_Allocation_PROD import (
-    load_and_validate_fixtures,
-    solve_allocation,
-    generate_excel_schedule,
-    generate_html_schedule,
+    CONFIG,
+    generate_slots,
     pitches,
+    summarise_allocation,
     valid_teams
 )
+from cranleighFC_explain import explain_unallocated, explanations_frame
+from cranleighFC_exports import EXPORT_FORMATS, allocation_hash, export_allocation, export_timings
+from cranleighFC_jobs import (
+    CANCELLED, DONE, FAILED, QUEUED, RUNNING,
+    JobRunner, default_solver_workers, solve_fixture_file
+)
+from cranleighFC_grid import paginated_grid
+from cranleighFC_profiling import phases_frame
+from cranleighFC_store import AllocationStore, season_bounds
+from cranleighFC_weather import (
+    DEFAULT_LATITUDE, DEFAULT_LONGITUDE,
+    WeatherService, allocation_changes, assess_playing_conditions, fixture_weather,
+    get_weather_code_description, replan_for_weather
+)
 
 # Page configuration
 st.set_page_config(
@@ -72,76 +86,149 @@ st.markdown("""
 # WEATHER FUNCTIONS
 # ----------------------------------------
 
-@st.cache_data(ttl=3600)  # Cache for 1 hour
-def get_weather_forecast(latitude=51.14209, longitude=-0.48374, days=7):
+@st.cache_resource(show_spinner=False)
+def get_weather_service():
+    """One forecast cache and HTTP connection pool shared by every session"""
+    return WeatherService()
+
+def get_weather_forecast(latitude=DEFAULT_LATITUDE, longitude=DEFAULT_LONGITUDE, days=7):
     """
-    Fetch weather forecast from Open-Meteo API
-    Default coordinates are for Cranleigh, England
+    Forecast from Open-Meteo via the shared weather service - served from
+    its cache and refreshed in the background, so the page never waits on
+    a slow API for more than a couple of seconds
     """
-    try:
-        url = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "hourly": "temperature_2m,precipitation,precipitation_probability,weather_code,wind_speed_10m",
-            "daily": "weather_code,temperature_2m_max,temperature_2m_min,precipitation_sum,precipitation_probability_max,wind_speed_10m_max",
-            "timezone": "Europe/London",
-            "forecast_days": days
-        }
-        
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        st.error(f"Weather API error: {str(e)}")
-        return None
+    return get_weather_service().forecast(latitude, longitude, days)
 
-def get_weather_code_description(code):
-    """Convert weather code to description"""
-    weather_codes = {
-        0: ("Clear sky", "☀️"),
-        1: ("Mainly clear", "🌤️"),
-        2: ("Partly cloudy", "⛅"),
-        3: ("Overcast", "☁️"),
-        45: ("Foggy", "🌫️"),
-        48: ("Foggy", "🌫️"),
-        51: ("Light drizzle", "🌦️"),
-        53: ("Moderate drizzle", "🌦️"),
-        55: ("Heavy drizzle", "🌧️"),
-        61: ("Light rain", "🌧️"),
-        63: ("Moderate rain", "🌧️"),
-        65: ("Heavy rain", "⛈️"),
-        71: ("Light snow", "🌨️"),
-        73: ("Moderate snow", "🌨️"),
-        75: ("Heavy snow", "❄️"),
-        80: ("Light showers", "🌦️"),
-        81: ("Moderate showers", "🌧️"),
-        82: ("Heavy showers", "⛈️"),
-        95: ("Thunderstorm", "⛈️"),
+# ----------------------------------------
+# CACHED DATA LAYER
+# ----------------------------------------
+# Everything derived from the fixture file is keyed by the file's content
+# hash, so widget interactions rerun the page from cache instead of
+# re-reading, re-validating or re-solving.
+
+DEFAULT_FILE = "cranleigh_home_fixtures.csv"
+EXPORT_ORDER = ['csv', 'xlsx', 'html']
+EXPORT_PREFIXES = {'csv': 'pitch_alloc', 'xlsx': 'pitch_schedule', 'html': 'pitch_schedule'}
+
+def file_digest(path):
+    """SHA-256 of a file's contents and the allocator config fingerprint -
+    the cache key for everything read from it (a config edit invalidates it)"""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(CONFIG.fingerprint.encode('utf-8') + f.read()).hexdigest()
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def load_fixture_table(digest, path):
+    """Read the raw fixture CSV once per file content"""
+    return pd.read_csv(path)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def fixture_grid_table(digest, path):
+    """Fixture CSV with each team's age group, for the fixture grid filters"""
+    df = load_fixture_table(digest, path)
+    return df.assign(age_group=df['home_team_clean'].map(valid_teams))
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def summarise_fixture_table(digest, path):
+    """Headline metrics and validation messages for the fixture CSV"""
+    df = load_fixture_table(digest, path)
+
+    metrics = {
+        'Total Fixtures': len(df),
+        'Cup Fixtures': int(df['prefix'].str.contains('cup', case=False, na=False).sum()),
+        'Match Days': df['match_date'].nunique(),
+        'Teams': df['home_team_clean'].nunique()
     }
-    return weather_codes.get(code, ("Unknown", "🌡️"))
 
-def assess_playing_conditions(temp, precip_prob, wind_speed, weather_code):
-    """Assess if conditions are suitable for football"""
-    issues = []
-    
-    if precip_prob > 70:
-        issues.append("High rain probability")
-    if wind_speed > 35:
-        issues.append("High winds")
-    if temp < 2:
-        issues.append("Near freezing")
-    if weather_code in [71, 73, 75]:
-        issues.append("Snow expected")
-    if weather_code == 95:
-        issues.append("Thunderstorm risk")
-    
-    if not issues:
-        return "✅ Good", "weather-good"
-    elif len(issues) == 1:
-        return f"⚠️ Caution: {issues[0]}", "weather-card"
-    else:
-        return f"❌ Poor: {', '.join(issues)}", "weather-severe"
+    errors = []
+
+    required_cols = ['match_date', 'match_time', 'home_team_clean']
+    missing = [c for c in required_cols if c not in df.columns]
+    if missing:
+        errors.append("Missing columns: " + ", ".join(missing))
+
+    unknown_teams = [
+        t for t in df['home_team_clean'].unique()
+        if t not in valid_teams
+    ]
+    if unknown_teams:
+        errors.append("Unknown teams: " + ", ".join(unknown_teams[:5]))
+
+    return metrics, errors
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def upcoming_fixture_weather(digest, path, weather_data, today, _hourly=None):
+    """Fixtures in the next 7 days joined to the daily and kickoff forecast
+    _hourly: the weather service's hourly frame for weather_data, built once per fetch"""
+    return fixture_weather(load_fixture_table(digest, path), weather_data, today, hourly=_hourly)
+
+SOLVE_JOBS = 2  # Concurrent solves across ALL sessions; further clicks queue
+
+@st.cache_resource(show_spinner=False)
+def get_job_runner():
+    """One bounded solve pool shared by every session on this server"""
+    return JobRunner(max_workers=SOLVE_JOBS)
+
+def session_id() -> str:
+    """Stable ID for this browser session - its subscription to shared jobs"""
+    if 'session_id' not in st.session_state:
+        st.session_state['session_id'] = uuid.uuid4().hex
+    return st.session_state['session_id']
+
+@st.cache_resource(show_spinner=False)
+def get_store():
+    """Allocation history store shared by every session"""
+    return AllocationStore()
+
+def record_allocation(allocation_key):
+    """Store this session's finished allocation once (repeat saves return the same run)"""
+    result, fixtures, _, _ = current_allocation()
+    run_id = get_store().save_run(result, fixtures, source=DEFAULT_FILE,
+                                  config=CONFIG.short_fingerprint,
+                                  metrics=summarise_allocation(result, fixtures),
+                                  report=current_run_report(), allocation_hash=allocation_key)
+    st.session_state['stored_run'] = (allocation_key, run_id)
+    return run_id
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_export(allocation_key, fmt, _result, _fixtures):
+    """Export bytes for one allocation and format, built on first download"""
+    return export_allocation(_result, _fixtures, [fmt])[fmt]
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def unallocated_explanations(allocation_key, _result, _fixtures):
+    """Why each unallocated fixture missed out (bounded CP-SAT conflict search)"""
+    slot_dates = sorted({f['fixture_date'] for f in _fixtures.values()})
+    return explanations_frame(explain_unallocated(_fixtures, generate_slots(slot_dates), _result))
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def allocation_breakdowns(allocation_key, _result):
+    """Grouped counts for the analytics charts"""
+    return {
+        'date': _result.groupby("date").size(),
+        'pitch': _result.groupby("pitch").size(),
+        'age_group': _result.groupby("age_group").size(),
+        'time': _result.groupby("time").size()
+    }
+
+def current_allocation():
+    """(result, fixtures, removed_duplicates, key) for this session's finished job"""
+    job_id = st.session_state.get('allocation_job')
+    runner = get_job_runner()
+    status = runner.status(job_id) if job_id else None
+    if status is None or status['state'] != DONE:
+        return None, None, None, None
+    result, fixtures, removed_duplicates, _ = runner.result(job_id)
+    allocation_key = allocation_hash(result) if result is not None else None
+    return result, fixtures, removed_duplicates, allocation_key
+
+def current_run_report():
+    """Phase timings and solver statistics for this session's finished job"""
+    job_id = st.session_state.get('allocation_job')
+    runner = get_job_runner()
+    status = runner.status(job_id) if job_id else None
+    if status is None or status['state'] != DONE:
+        return None
+    return runner.result(job_id)[3]
 
 # ----------------------------------------
 # HEADER & WEATHER WIDGET
@@ -157,15 +244,27 @@ with st.sidebar:
     
     # Location settings
     with st.expander("📍 Location Settings"):
-        lat = st.number_input("Latitude", value=51.14209, format="%.5f", help="Cranleigh, England")
-        lon = st.number_input("Longitude", value=-0.48374, format="%.5f")
+        lat = st.number_input("Latitude", value=DEFAULT_LATITUDE, format="%.5f", help="Cranleigh, England")
+        lon = st.number_input("Longitude", value=DEFAULT_LONGITUDE, format="%.5f")
         forecast_days = st.slider("Forecast Days", 1, 7, 7)
     
     if st.button("🔄 Refresh Weather", width='stretch'):
-        st.cache_data.clear()
+        # Revalidate this location only - the current forecast stays on
+        # screen until the new one lands; other caches stay warm
+        get_weather_service().invalidate(lat, lon, forecast_days)
     
     # Fetch weather
     weather_data = get_weather_forecast(lat, lon, forecast_days)
+    weather_status = get_weather_service().status(lat, lon, forecast_days)
+    
+    if weather_data is None:
+        if weather_status['refreshing']:
+            st.info("⏳ Fetching forecast… it will appear on the next refresh.")
+        else:
+            st.error(f"Weather API error: {weather_status['error']}")
+    elif weather_status['age'] is not None:
+        refreshing = " – refreshing…" if weather_status['refreshing'] else ""
+        st.caption(f"Updated {weather_status['age'] / 60:.0f} min ago{refreshing}")
     
     if weather_data:
         daily = weather_data.get('daily', {})
@@ -217,8 +316,6 @@ with st.sidebar:
 # LOAD DEFAULT FIXTURES AUTOMATICALLY
 # ----------------------------------------
 
-DEFAULT_FILE = "cranleigh_home_fixtures.csv"
-
 if not os.path.exists(DEFAULT_FILE):
     st.error(
         f"❌ **'{DEFAULT_FILE}' not found.**\n\n"
@@ -227,16 +324,22 @@ if not os.path.exists(DEFAULT_FILE):
     st.stop()
 
 try:
-    df = pd.read_csv(DEFAULT_FILE)
+    fixture_digest = file_digest(DEFAULT_FILE)
+    df = load_fixture_table(fixture_digest, DEFAULT_FILE)
 
     st.markdown("## Loaded Published Home Fixtures on FA Full-Time")
     st.info(f"Loaded automatically from `{DEFAULT_FILE}`")
-    st.dataframe(df.head(10), width='stretch')
 
 except Exception as e:
     st.error(f"❌ Failed to read `{DEFAULT_FILE}`: {str(e)}")
     st.stop()
 
+# Full fixture list - filtered and paged on the server
+paginated_grid(
+    fixture_grid_table(fixture_digest, DEFAULT_FILE), "fixtures",
+    filters={"Date": 'match_date', "Team": 'home_team_clean', "Age group": 'age_group'}
+)
+
 
 # ----------------------------------------
 # BASIC STATISTICS & VALIDATION
@@ -244,31 +347,11 @@ except Exception as e:
 
 st.markdown("### Fixture Summary")
 
-col1, col2, col3, col4 = st.columns(4)
-with col1:
-    st.metric("Total Fixtures", len(df))
-with col2:
-    cup_count = df['prefix'].str.contains('cup', case=False, na=False).sum()
-    st.metric("Cup Fixtures", cup_count)
-with col3:
-    st.metric("Match Days", df['match_date'].nunique())
-with col4:
-    st.metric("Teams", df['home_team_clean'].nunique())
-
-# Validation checks
-errors = []
-
-required_cols = ['match_date', 'match_time', 'home_team_clean']
-missing = [c for c in required_cols if c not in df.columns]
-if missing:
-    errors.append("Missing columns: " + ", ".join(missing))
-
-unknown_teams = [
-    t for t in df['home_team_clean'].unique()
-    if t not in valid_teams
-]
-if unknown_teams:
-    errors.append("Unknown teams: " + ", ".join(unknown_teams[:5]))
+fixture_metrics, errors = summarise_fixture_table(fixture_digest, DEFAULT_FILE)
+
+for col, (label, value) in zip(st.columns(4), fixture_metrics.items()):
+    with col:
+        st.metric(label, value)
 
 if errors:
     st.markdown('<div class="warning-box">', unsafe_allow_html=True)
@@ -287,66 +370,43 @@ else:
 # WEATHER-AWARE FIXTURE ANALYSIS
 # ----------------------------------------
 
-if weather_data and 'match_date' in df.columns:
+@st.fragment
+def fixture_weather_section(digest, weather_data, hourly):
     st.markdown("## 🌦️ Weather Impact on Upcoming Fixtures")
-    
-    # Parse fixture dates
-    df['parsed_date'] = pd.to_datetime(df['match_date'], errors='coerce')
-    
-    # Get next 7 days of fixtures
-    today = datetime.now().date()
-    next_week = today + timedelta(days=7)
-    
-    upcoming = df[
-        (df['parsed_date'].dt.date >= today) & 
-        (df['parsed_date'].dt.date <= next_week)
-    ].copy()
-    
-    if len(upcoming) > 0:
-        st.info(f"Found {len(upcoming)} fixtures in the next 7 days")
-        
-        # Match weather data to fixtures
-        daily = weather_data.get('daily', {})
-        weather_lookup = {}
-        
-        for i, date_str in enumerate(daily.get('time', [])):
-            date_obj = datetime.fromisoformat(date_str).date()
-            weather_lookup[date_obj] = {
-                'code': daily['weather_code'][i],
-                'temp_max': daily['temperature_2m_max'][i],
-                'temp_min': daily['temperature_2m_min'][i],
-                'precip_prob': daily['precipitation_probability_max'][i],
-                'wind': daily['wind_speed_10m_max'][i]
+
+    upcoming_count, table = upcoming_fixture_weather(
+        digest, DEFAULT_FILE, weather_data, datetime.now().date(), hourly
+    )
+
+    if upcoming_count > 0:
+        st.info(f"Found {upcoming_count} fixtures in the next 7 days")
+
+        # One table for every fixture - no widgets per row
+        st.dataframe(
+            table,
+            hide_index=True,
+            width='stretch',
+            column_config={
+                'team': "Team",
+                'day': "Date",
+                'kickoff': "Kickoff",
+                'weather': "Weather",
+                'temp_min': st.column_config.NumberColumn("Min °C", format="%.0f"),
+                'temp_max': st.column_config.NumberColumn("Max °C", format="%.0f"),
+                'precip_prob': st.column_config.NumberColumn("Rain %", format="%d%%"),
+                'wind': st.column_config.NumberColumn("Wind km/h", format="%.0f"),
+                'kickoff_temp': st.column_config.NumberColumn("Kickoff °C", format="%.0f"),
+                'kickoff_rain': st.column_config.NumberColumn("Kickoff rain %", format="%d%%"),
+                'condition': "Conditions"
             }
-        
-        # Show fixtures with weather
-        for _, fixture in upcoming.iterrows():
-            fixture_date = fixture['parsed_date'].date()
-            
-            if fixture_date in weather_lookup:
-                w = weather_lookup[fixture_date]
-                desc, emoji = get_weather_code_description(w['code'])
-                condition, css_class = assess_playing_conditions(
-                    w['temp_min'], w['precip_prob'], w['wind'], w['code']
-                )
-                
-                col1, col2, col3 = st.columns([2, 2, 1])
-                
-                with col1:
-                    st.markdown(f"**{fixture['home_team_clean']}**")
-                    st.markdown(f"{fixture_date.strftime('%A, %d %B')}")
-                
-                with col2:
-                    st.markdown(f"{emoji} {desc}")
-                    st.markdown(f"🌡️ {w['temp_min']:.0f}-{w['temp_max']:.0f}°C | 💧 {w['precip_prob']}% | 💨 {w['wind']:.0f} km/h")
-                
-                with col3:
-                    st.markdown(condition)
-                
-                st.markdown("---")
+        )
     else:
         st.info("No fixtures scheduled in the next 7 days")
 
+if weather_data and 'match_date' in df.columns:
+    fixture_weather_section(fixture_digest, weather_data,
+                            get_weather_service().hourly(lat, lon, forecast_days))
+
 
 # ----------------------------------------
 # ALLOCATION CONTROLS
@@ -371,62 +431,112 @@ with col2:
 # ----------------------------------------
 
 if allocate_button:
-    with st.spinner("Allocating pitches… this may take 30–60 seconds...."):
+    # Solves run in the shared background pool, so the page stays usable.
+    # Identical requests (same file content + timeout) share one job; each
+    # session subscribes, so one session's Cancel doesn't stop the others.
+    st.session_state.pop('allocation_cancelled', None)
+    st.session_state['allocation_job'] = get_job_runner().submit(
+        solve_fixture_file, DEFAULT_FILE,
+        timeout=int(timeout),
+        num_workers=default_solver_workers(SOLVE_JOBS),
+        key=f"{fixture_digest}:{int(timeout)}",
+        label=f"{DEFAULT_FILE} ({int(timeout)}s)",
+        subscriber=session_id()
+    )
 
-        try:
-          fixtures, slots_by_date, removed_duplicates = load_and_validate_fixtures(DEFAULT_FILE)
-          result = solve_allocation(fixtures, slots_by_date, timeout=timeout)
+@st.fragment(run_every=1.0)
+def allocation_job_monitor(job_id):
+    """Polls a queued/running job; reruns the whole page once it finishes"""
+    status = get_job_runner().status(job_id)
 
-          if result is None or len(result) == 0:
-              st.error("❌ Allocation failed – no feasible solution found.")
-              st.stop()
+    if status is None or status['state'] not in (QUEUED, RUNNING):
+        st.rerun(scope="app")
 
-          st.session_state['allocation_result'] = result
-          st.session_state['fixtures'] = fixtures
-          st.session_state['removed_duplicates'] = removed_duplicates
-            
-        except Exception as e:
-            st.error(f"❌ Allocation error: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            st.stop()
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        if status['state'] == QUEUED:
+            st.info(f"⏳ Queued behind other allocations (position {status['queue_position']}) – "
+                    "you can keep browsing fixtures")
+        else:
+            st.info(f"🔄 Allocating pitches… {status['elapsed']:.0f}s elapsed "
+                    f"(timeout {int(timeout)}s) – you can keep browsing fixtures")
+    with col2:
+        if st.button("⏹️ Cancel", width='stretch'):
+            # Detach this session - the job only stops if no other session waits for it
+            get_job_runner().cancel(job_id, subscriber=session_id())
+            del st.session_state['allocation_job']
+            st.session_state['allocation_cancelled'] = True
+            st.rerun(scope="app")
+
+def allocation_job_status():
+    if st.session_state.get('allocation_cancelled'):
+        st.warning("⏹️ Allocation cancelled")
+        return
+    job_id = st.session_state.get('allocation_job')
+    status = get_job_runner().status(job_id) if job_id else None
+    if status is None:
+        return
+
+    if status['state'] in (QUEUED, RUNNING):
+        allocation_job_monitor(job_id)
+    elif status['state'] == FAILED:
+        st.error(f"❌ Allocation error: {status['error']}")
+    elif status['state'] == CANCELLED:
+        st.warning("⏹️ Allocation cancelled")
+    else:
+        result, _, _, allocation_key = current_allocation()
+        if result is None or len(result) == 0:
+            st.error("❌ Allocation failed – no feasible solution found.")
+        else:
+            if st.session_state.get('stored_run', (None,))[0] != allocation_key:
+                record_allocation(allocation_key)
+            # SUCCESS
+            st.markdown('<div class="success-box">', unsafe_allow_html=True)
+            st.success(f"🎉 Allocation Complete! ({status['elapsed']:.1f}s)")
+            st.markdown('</div>', unsafe_allow_html=True)
+
+allocation_job_status()
 
-    # SUCCESS
-    st.markdown('<div class="success-box">', unsafe_allow_html=True)
-    st.success("🎉 Allocation Complete!")
-    st.markdown('</div>', unsafe_allow_html=True)
 # ----------------------------------------
 # DISPLAY REMOVED DUPLICATES (always visible after run)
 # ----------------------------------------
 
-removed = st.session_state.get("removed_duplicates")
+@st.fragment
+def removed_duplicates_section():
+    _, _, removed, _ = current_allocation()
 
-st.markdown("### 🔁 Duplicate Fixtures Removed")
+    st.markdown("### 🔁 Duplicate Fixtures Removed")
 
-if removed is not None and not removed.empty:
+    if removed is not None and not removed.empty:
 
-    st.warning(f"⚠️ {len(removed)} duplicate fixtures were removed!")
+        st.warning(f"⚠️ {len(removed)} duplicate fixtures were removed!")
 
-    summary = (
-        removed.groupby(['team_name', 'date'])
-        .size()
-        .reset_index(name='Removed Count')
-        .sort_values(['date', 'team_name'])
-    )
-    st.dataframe(summary)
+        summary = (
+            removed.groupby(['team_name', 'date'])
+            .size()
+            .reset_index(name='Removed Count')
+            .sort_values(['date', 'team_name'])
+        )
+        st.dataframe(summary)
 
-    # Checkbox works now because this code always runs
-    if st.checkbox("Show full removed fixture details"):
-        st.dataframe(removed.reset_index(drop=True))
+        # Toggling the checkbox only reruns this fragment
+        if st.checkbox("Show full removed fixture details"):
+            st.dataframe(removed.reset_index(drop=True))
 
-else:
-    st.success("No duplicate fixtures were removed.")
+    else:
+        st.success("No duplicate fixtures were removed.")
 
+removed_duplicates_section()
 
-result = st.session_state.get("allocation_result")
-fixtures = st.session_state.get("fixtures")
 
-if result is not None and not result.empty:
+@st.fragment
+def allocation_results_section():
+    result, fixtures, _, allocation_key = current_allocation()
+    report = current_run_report()
+
+    if result is None or result.empty:
+        return
+
     # Summary metrics
     col1, col2, col3, col4 = st.columns(4)
 
@@ -449,10 +559,11 @@ if result is not None and not result.empty:
     with col4:
         st.metric("Match Days", result['date'].nunique())
 
-    st.markdown("### Allocation Preview")
-    st.dataframe(
-        result[['team', 'date', 'time', 'pitch', 'age_group']].head(20),
-        width='stretch'
+    st.markdown("### Allocation")
+    paginated_grid(
+        result, "allocation",
+        filters={"Date": 'date', "Team": 'team', "Pitch": 'pitch', "Age group": 'age_group'},
+        columns=['team', 'date', 'time', 'pitch', 'age_group', 'is_cup', 'matched_pref_time']
     )
 
 
@@ -462,84 +573,250 @@ if result is not None and not result.empty:
 
     st.markdown("### Download Schedule")
 
-    col1, col2, col3 = st.columns(3)
+    # Files are only built when a download is clicked, then cached
+    stamp = f"{datetime.now():%Y%m%d}"
+
+    for col, fmt in zip(st.columns(3), EXPORT_ORDER):
+        with col:
+            spec = EXPORT_FORMATS[fmt]
+            st.download_button(
+                spec['label'],
+                lambda fmt=fmt: cached_export(allocation_key, fmt, result, fixtures),
+                file_name=f"{EXPORT_PREFIXES[fmt]}_{stamp}.{spec['extension']}",
+                mime=spec['mime'],
+                on_click='ignore',
+                width='stretch'
+            )
+
+    # ----------------------------------------
+    # PERFORMANCE
+    # ----------------------------------------
+
+    with st.expander("⏱️ Performance"):
+        # The job's report is shared by every session - export build times
+        # come from the export cache and are added to a copy
+        if report:
+            report = dict(report, phases=dict(report.get('phases', {}), **export_timings(allocation_key)))
+        performance_panel(report)
+
+
+def performance_panel(report):
+    """Where the run's time went: pandas phases vs. the CP-SAT search"""
+    if not report:
+        st.info("No run report for this allocation.")
+        return
+
+    timings = phases_frame(report)
+    col1, col2 = st.columns([2, 1])
 
-    # CSV
     with col1:
-        csv_buffer = io.StringIO()
-        result.to_csv(csv_buffer, index=False)
-        st.download_button(
-            "📄 Download CSV",
-            csv_buffer.getvalue(),
-            file_name=f"pitch_alloc_{datetime.now():%Y%m%d}.csv",
-            mime="text/csv",
-            width='stretch'
+        st.markdown("**Phase timings**")
+        st.bar_chart(timings.set_index('phase')['seconds'])
+        st.dataframe(
+            timings.assign(share=(timings['share'] * 100).round(1)),
+            hide_index=True,
+            width='stretch',
+            column_config={
+                'seconds': st.column_config.NumberColumn("Seconds", format="%.3f"),
+                'share': st.column_config.NumberColumn("Share", format="%.1f%%")
+            }
         )
+        st.caption("Export timings appear once each file has been downloaded.")
 
-    # Excel
     with col2:
-        excel_file = f"temp_{datetime.now():%Y%m%d%H%M%S}.xlsx"
-        generate_excel_schedule(result, fixtures, excel_file)
+        solver = report.get('solver', {})
+        st.markdown("**CP-SAT search**")
+        if solver:
+            st.metric("Status", solver['status'])
+            st.metric("Variables / Constraints", f"{solver['variables']:,} / {solver['constraints']:,}")
+            st.metric("Branches", f"{solver['branches']:,}")
+            st.metric("Conflicts", f"{solver['conflicts']:,}")
+            st.metric("Search Wall Time", f"{solver['wall_time']:.2f}s")
+            if solver['objective'] is not None:
+                st.metric("Objective / Bound", f"{solver['objective']:,.0f} / {solver['bound']:,.0f}")
+        else:
+            st.info("Solver did not run.")
 
-        with open(excel_file, "rb") as f:
-            st.download_button(
-                "📊 Download Excel",
-                f.read(),
-                file_name=f"pitch_schedule_{datetime.now():%Y%m%d}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                width='stretch'
-            )
+allocation_results_section()
 
-        os.remove(excel_file)
+# ----------------------------------------
+# UNALLOCATED FIXTURES
+# ----------------------------------------
 
-    # HTML
-    with col3:
-        html_file = "temp_schedule.html"
-        generate_html_schedule(result, fixtures, html_file)
+@st.fragment
+def unallocated_section():
+    result, fixtures, _, allocation_key = current_allocation()
+    if result is None or result.empty or len(result) == len(fixtures):
+        return
 
-        with open(html_file, "r", encoding="utf-8") as f:
-            st.download_button(
-                "🌐 Download HTML",
-                f.read(),
-                file_name=f"pitch_schedule_{datetime.now():%Y%m%d}.html",
-                mime="text/html",
-                width='stretch'
+    st.markdown(f"### 🔒 Unallocated Fixtures ({len(fixtures) - len(result)})")
+    with st.spinner("Finding what blocks each fixture…"):
+        explanations = unallocated_explanations(allocation_key, result, fixtures)
+    st.dataframe(
+        explanations,
+        hide_index=True,
+        width='stretch',
+        column_config={
+            'date': st.column_config.TextColumn("Date"),
+            'team': st.column_config.TextColumn("Team"),
+            'category': st.column_config.TextColumn("Cause"),
+            'blocked_by': st.column_config.TextColumn("Blocked by", width='large'),
+            'rules': st.column_config.TextColumn("Rules", width='large'),
+            'summary': st.column_config.TextColumn("Summary", width='medium')
+        }
+    )
+
+unallocated_section()
+
+
+# ----------------------------------------
+# WEATHER RE-PLANNING
+# ----------------------------------------
+
+@st.fragment
+def weather_replan_section(weather_data):
+    result, fixtures, _, allocation_key = current_allocation()
+
+    if result is None or result.empty or not weather_data:
+        return
+
+    st.markdown("### 🌧️ Weather Re-planning")
+    st.caption("Closes grass pitches on days heavy rain, snow or frost is forecast (and discourages "
+               "them when rain is likely), then re-solves only the affected dates.")
+
+    replan = st.session_state.get('weather_replan')
+    if replan is not None and replan['source'] != allocation_key:
+        replan = None
+
+    if st.button("🌧️ Re-plan for Forecast"):
+        slots_by_date = generate_slots(sorted({f['fixture_date'] for f in fixtures.values()}))
+        started = time.perf_counter()
+        with st.spinner("Re-planning affected dates…"):
+            new_result, dates, risks = replan_for_weather(
+                fixtures, slots_by_date, result, weather_data,
+                num_workers=default_solver_workers(SOLVE_JOBS)
             )
+        replan = {
+            'source': allocation_key,
+            'result': new_result,
+            'dates': dates,
+            'risks': risks,
+            'elapsed': time.perf_counter() - started
+        }
+        st.session_state['weather_replan'] = replan
+
+    if replan is None:
+        return
+
+    risky = [risk for risk in replan['risks'] if risk['action']]
+    if risky:
+        st.dataframe(pd.DataFrame(risky), hide_index=True, width='stretch')
+    if not replan['dates']:
+        st.success("✅ The forecast affects no allocated grass pitches - no changes needed.")
+        return
+
+    new_result = replan['result']
+    changes = allocation_changes(result, new_result)
+    st.info(f"🔁 Re-solved {len(replan['dates'])} date(s) in {replan['elapsed']:.1f}s: "
+            f"{len(changes)} fixture(s) moved")
+    st.dataframe(changes, hide_index=True, width='stretch')
+
+    if new_result is not None and not new_result.empty:
+        replan_key = allocation_hash(new_result)
+        stamp = f"{datetime.now():%Y%m%d}"
+        for col, fmt in zip(st.columns(3), EXPORT_ORDER):
+            with col:
+                spec = EXPORT_FORMATS[fmt]
+                st.download_button(
+                    spec['label'].replace("Download", "Download Re-planned"),
+                    lambda fmt=fmt: cached_export(replan_key, fmt, new_result, fixtures),
+                    file_name=f"{EXPORT_PREFIXES[fmt]}_weather_{stamp}.{spec['extension']}",
+                    mime=spec['mime'],
+                    on_click='ignore',
+                    width='stretch',
+                    key=f"replan_{fmt}"
+                )
 
-        os.remove(html_file)
+weather_replan_section(weather_data)
 
 
 # ----------------------------------------
 # ANALYTICS TAB
 # ----------------------------------------
 
-st.markdown("---")
-st.markdown("## 📊 Allocation Analytics")
+@st.fragment
+def analytics_section():
+    st.markdown("---")
+    st.markdown("## 📊 Allocation Analytics")
 
-if "allocation_result" in st.session_state:
-    result = st.session_state['allocation_result']
+    result, _, _, allocation_key = current_allocation()
 
-    st.markdown("### Fixtures by Date")
-    st.bar_chart(result.groupby("date").size())
+    if result is not None:
+        breakdowns = allocation_breakdowns(allocation_key, result)
 
-    st.markdown("### Pitch Utilisation")
-    st.bar_chart(result.groupby("pitch").size())
+        st.markdown("### Fixtures by Date")
+        st.bar_chart(breakdowns['date'])
 
-    st.markdown("### Fixtures by Age Group")
-    st.bar_chart(result.groupby("age_group").size())
+        st.markdown("### Pitch Utilisation")
+        st.bar_chart(breakdowns['pitch'])
 
-    st.markdown("### Time Slot Distribution")
-    st.bar_chart(result.groupby("time").size())
+        st.markdown("### Fixtures by Age Group")
+        st.bar_chart(breakdowns['age_group'])
 
-else:
-    st.info("Run an allocation to see analytics.")
+        st.markdown("### Time Slot Distribution")
+        st.bar_chart(breakdowns['time'])
+
+    else:
+        st.info("Run an allocation to see analytics.")
+
+analytics_section()
+
+# ----------------------------------------
+# ALLOCATION HISTORY
+# ----------------------------------------
+
+@st.fragment
+def history_section():
+    st.markdown("---")
+    st.markdown("## 📚 Allocation History")
+
+    store = get_store()
+    runs = store.runs(limit=20)
+    if runs.empty:
+        st.info("Completed allocations are stored here.")
+        return
+
+    run_id = st.selectbox(
+        "Run", runs['run_id'].tolist(),
+        format_func=lambda r: f"#{r} · {runs.set_index('run_id').at[r, 'created_at']}",
+        key="history_run"
+    )
+    # The season the run's fixtures fall in, which for a past run isn't today's
+    last_date = store.date_range(run_id)[1]
+    start, end = season_bounds(datetime.strptime(last_date, "%Y-%m-%d").date() if last_date else None)
+
+    st.markdown(f"### Team Slots {start[:4]}/{end[2:4]} Season")
+    team = st.selectbox("Team", store.teams(run_id), key="history_team")
+    slots = store.team_slots(team, start, end, run_id=run_id)
+    if slots.empty:
+        st.caption(f"No slots for {team} in run #{run_id}.")
+    else:
+        st.dataframe(slots, hide_index=True, width='stretch')
+
+    st.markdown("### Pitch Usage per Month")
+    usage = store.pitch_usage_by_month(run_id, start, end)
+    if not usage.empty:
+        st.dataframe(usage.pivot(index='pitch', columns='month', values='fixtures').fillna(0).astype(int),
+                     width='stretch')
+
+history_section()
 
 
 # Footer
 st.markdown("---")
-st.markdown("""
+st.markdown(f"""
 <div style='text-align: center; color: #666; font-size: 0.9rem;'>
-    <p>Cranleigh FC Pitch Allocator | Version 53 | Built with Streamlit</p>
+    <p>Cranleigh FC Pitch Allocator | Version 53 | Config v{CONFIG.version} ({CONFIG.short_fingerprint}) | Built with Streamlit</p>
     <p>Weather data from Open-Meteo.com</p>
 </div>
 """, unsafe_allow_html=True)
\ No newline at end of file
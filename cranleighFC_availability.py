@@ -0,0 +1,304 @@
+"""
+Cranleigh FC pitch availability calendar
+Pitches close for waterlogging, maintenance or school use, and some can only
+be used inside booked windows (Glebelands 3G). The calendar keeps, per pitch,
+sorted non-overlapping intervals in absolute minutes, so checking a slot is
+a bisect rather than a scan of every closure.
+
+Closures and windows are added in bulk and merged lazily - only the pitches
+that changed are re-merged on the next lookup. prune_slots() drops closed
+slots from slots_by_date before any solver variables are created. Soft
+risks (e.g. a wet forecast) are per pitch and date penalties that the
+solver subtracts from the slot weight instead of closing the pitch.
+
+config/availability.json (optional, pass with --availability):
+    {"closures": [{"venue": "snoxhall", "from": "2025-12-06", "to": "2025-12-07",
+                   "reason": "Waterlogged"},
+                  {"pitches": ["P5 7v7"], "from": "2025-09-01", "to": "2025-12-19",
+                   "weekdays": ["Wed"], "start": "13:00", "end": "17:00",
+                   "reason": "School use"}],
+     "windows":  [{"venue": "glebelands", "from": "2025-09-01", "to": "2026-05-31",
+                   "weekdays": ["Sat", "Sun"], "start": "09:00", "end": "13:00"}]}
+
+Entries name a venue or a list of pitches; "to", "weekdays" and the
+"start"/"end" times are optional (whole days when the times are omitted).
+A kickoff is open only if its pitch is open for the whole match - the
+format's match_minutes in the config.
+A pitch with any windows is closed outside them; other pitches are open
+unless closed.
+"""
+
+import copy
+import json
+from bisect import bisect_right
+from datetime import date as Date, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set, Tuple
+
+from cranleighFC_config import AllocatorConfig
+
+DAY_MINUTES = 24 * 60
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+@lru_cache(maxsize=4096)
+def _day_start(date: str) -> int:
+    """Absolute minute of midnight on a YYYY-MM-DD date"""
+    return Date.fromisoformat(date).toordinal() * DAY_MINUTES
+
+@lru_cache(maxsize=256)
+def _minutes(time: str) -> int:
+    hours, minutes = time.split(':')[:2]
+    return int(hours) * 60 + int(minutes)
+
+def format_minutes(config: AllocatorConfig) -> Dict[str, int]:
+    """
+    Minutes a kickoff holds its pitch, per format: the configured
+    match_minutes, else the format's kickoff spacing (the shortest spacing
+    of any format for one with a single kickoff time)
+    """
+    spacing = {}
+    for fmt, times in config.kickoff_times.items():
+        starts = sorted(_minutes(time) for time in times)
+        gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+        if gaps:
+            spacing[fmt] = min(gaps)
+    fallback = min(spacing.values(), default=1)
+    return {fmt: config.match_minutes.get(fmt, spacing.get(fmt, fallback)) for fmt in config.kickoff_times}
+
+def _merge(intervals: List[Tuple[int, int, str]]) -> Tuple[List[int], List[int], List[str]]:
+    """Sort and merge overlapping [start, end) intervals into parallel lists"""
+    starts, ends, reasons = [], [], []
+    for start, end, reason in sorted(intervals):
+        if ends and start <= ends[-1]:
+            ends[-1] = max(ends[-1], end)
+            if reason and reason not in reasons[-1]:
+                reasons[-1] = f"{reasons[-1]}; {reason}" if reasons[-1] else reason
+        else:
+            starts.append(start)
+            ends.append(end)
+            reasons.append(reason)
+    return starts, ends, reasons
+
+class AvailabilityCalendar:
+    """
+    Pitch x date x time-window availability. Lookups are O(log n) in the
+    number of intervals on that pitch; pitches with no entries cost a dict miss.
+    A slot covers its kickoff plus the pitch format's match length (config).
+    """
+
+    def __init__(self, config: AllocatorConfig):
+        minutes = format_minutes(config)
+        self.slot_minutes: Dict[str, int] = {pitch: minutes[info['format']]
+                                             for pitch, info in config.pitches.items()}
+        self.longest_slot = max(minutes.values(), default=1)   # Pitches the config doesn't list
+        self._closures: Dict[str, List[Tuple[int, int, str]]] = {}
+        self._windows: Dict[str, List[Tuple[int, int, str]]] = {}
+        self._merged: Dict[Tuple[str, str], Tuple[List[int], List[int], List[str]]] = {}
+        self._penalties: Dict[Tuple[str, str], Tuple[int, str]] = {}  # (pitch, date) -> (weight, reason)
+        self.version = 0   # Bumped on every change - include it in cache keys
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._closures.values())
+
+    @staticmethod
+    def _intervals(start_date: str, end_date: str = None, start_time: str = None,
+                   end_time: str = None, weekdays: Iterable[str] = None) -> List[Tuple[int, int]]:
+        """Absolute-minute intervals covered by a date range and daily time window"""
+        end_date = end_date or start_date
+        first, last = Date.fromisoformat(start_date), Date.fromisoformat(end_date)
+        day_from = _minutes(start_time) if start_time else 0
+        day_to = _minutes(end_time) if end_time else DAY_MINUTES
+
+        # Whole days every day: one interval for the whole range
+        if not weekdays and day_from == 0 and day_to == DAY_MINUTES:
+            return [(first.toordinal() * DAY_MINUTES, (last.toordinal() + 1) * DAY_MINUTES)]
+
+        allowed = {WEEKDAYS.index(day) for day in weekdays} if weekdays else None
+        intervals = []
+        day = first
+        while day <= last:
+            if allowed is None or day.weekday() in allowed:
+                midnight = day.toordinal() * DAY_MINUTES
+                intervals.append((midnight + day_from, midnight + day_to))
+            day += timedelta(days=1)
+        return intervals
+
+    def _add(self, table: Dict, kind: str, pitches: Iterable[str], intervals: List[Tuple[int, int]],
+             reason: str):
+        for pitch in pitches:
+            table.setdefault(pitch, []).extend((start, end, reason) for start, end in intervals)
+            self._merged.pop((kind, pitch), None)
+        self.version += 1
+
+    def close(self, pitches: Iterable[str], start_date: str, end_date: str = None,
+              start_time: str = None, end_time: str = None, weekdays: Iterable[str] = None,
+              reason: str = 'Closed'):
+        """Close pitches for a date range (whole days unless a daily time window is given)"""
+        self._add(self._closures, 'closures', pitches,
+                  self._intervals(start_date, end_date, start_time, end_time, weekdays), reason)
+
+    def add_window(self, pitches: Iterable[str], start_date: str, end_date: str = None,
+                   start_time: str = None, end_time: str = None, weekdays: Iterable[str] = None):
+        """Book a window - a pitch with windows is only open inside them"""
+        self._add(self._windows, 'windows', pitches,
+                  self._intervals(start_date, end_date, start_time, end_time, weekdays), '')
+
+    def close_many(self, closures: Iterable[Dict]):
+        """Apply many closures at once (dicts with close()'s keyword arguments)"""
+        for closure in closures:
+            self.close(**closure)
+
+    def reopen(self, pitches: Iterable[str], reason: str = None):
+        """Drop the pitches' closures (only those with this reason, if given)"""
+        for pitch in pitches:
+            entries = self._closures.get(pitch, [])
+            kept = [entry for entry in entries if reason is not None and entry[2] != reason]
+            if len(kept) != len(entries):
+                self._closures[pitch] = kept
+                self._merged.pop(('closures', pitch), None)
+        self.version += 1
+
+    def penalise(self, pitches: Iterable[str], date: str, weight: int, reason: str = 'Risk'):
+        """Discourage (not forbid) pitches on a date - the largest penalty applies"""
+        for pitch in pitches:
+            if weight > self._penalties.get((pitch, date), (0, ''))[0]:
+                self._penalties[(pitch, date)] = (weight, reason)
+        self.version += 1
+
+    def penalty(self, pitch: str, date: str) -> int:
+        """Objective weight to subtract for using the pitch on the date"""
+        return self._penalties.get((pitch, date), (0, ''))[0]
+
+    def penalties(self) -> Dict[Tuple[str, str], Tuple[int, str]]:
+        return dict(self._penalties)
+
+    def copy(self) -> 'AvailabilityCalendar':
+        """Independent copy - e.g. to layer forecast closures on a base calendar"""
+        return copy.deepcopy(self)
+
+    def _lookup(self, kind: str, pitch: str):
+        merged = self._merged.get((kind, pitch))
+        if merged is None:
+            table = self._closures if kind == 'closures' else self._windows
+            merged = self._merged[(kind, pitch)] = _merge(table.get(pitch, []))
+        return merged
+
+    def closure_reason(self, pitch: str, date: str, time: str):
+        """Why a slot is unavailable, or None if it is open"""
+        start = _day_start(date) + _minutes(time)
+        end = start + self.slot_minutes.get(pitch, self.longest_slot)
+
+        if self._closures.get(pitch):
+            starts, ends, reasons = self._lookup('closures', pitch)
+            i = bisect_right(ends, start)     # First closure ending after the kickoff
+            if i < len(starts) and starts[i] < end:
+                return reasons[i]
+
+        if self._windows.get(pitch):
+            starts, ends, _ = self._lookup('windows', pitch)
+            i = bisect_right(starts, start) - 1
+            if i < 0 or ends[i] < end:
+                return 'Outside booked window'
+        return None
+
+    def is_open(self, pitch: str, date: str, time: str) -> bool:
+        return self.closure_reason(pitch, date, time) is None
+
+    def prune_slots(self, slots_by_date: Dict) -> Dict:
+        """slots_by_date without closed slots (dates with no open slots keep an empty list)"""
+        restricted = {pitch for pitch, entries in self._closures.items() if entries}
+        restricted |= {pitch for pitch, entries in self._windows.items() if entries}
+        if not restricted:
+            return slots_by_date
+        return {
+            date: [slot for slot in slots
+                   if slot[2] not in restricted or self.is_open(slot[2], slot[0], slot[1])]
+            for date, slots in slots_by_date.items()
+        }
+
+    def closed_slots(self, slots_by_date: Dict) -> List[Tuple[str, str, str, str]]:
+        """(date, time, pitch, reason) for every closed slot"""
+        closed = []
+        for slots in slots_by_date.values():
+            for date, time, pitch in slots:
+                reason = self.closure_reason(pitch, date, time)
+                if reason:
+                    closed.append((date, time, pitch, reason))
+        return closed
+
+# =====================================
+# 📂 Reading Calendars
+# =====================================
+def _entry_pitches(entry: Dict, config: AllocatorConfig, where: str, errors: List[str]) -> List[str]:
+    if 'venue' in entry:
+        pitches = [pitch for pitch, info in config.pitches.items() if info['location'] == entry['venue']]
+        if not pitches:
+            errors.append(f"{where}: unknown venue '{entry['venue']}'")
+        return pitches
+    pitches = entry.get('pitches', [])
+    if not pitches:
+        errors.append(f"{where}: needs a 'venue' or 'pitches'")
+    errors.extend(f"{where}: unknown pitch '{pitch}'" for pitch in pitches if pitch not in config.pitches)
+    # A split pitch's layouts go with it
+    children = [child for pitch in pitches for layout in config.splits.get(pitch, {}).values() for child in layout]
+    return [pitch for pitch in pitches if pitch in config.pitches] + children
+
+def _entry_range(entry: Dict, where: str, errors: List[str]) -> Dict:
+    spec = {
+        'start_date': entry.get('from'),
+        'end_date': entry.get('to'),
+        'start_time': entry.get('start'),
+        'end_time': entry.get('end'),
+        'weekdays': entry.get('weekdays')
+    }
+    try:
+        first = Date.fromisoformat(spec['start_date'])
+        if spec['end_date'] and Date.fromisoformat(spec['end_date']) < first:
+            errors.append(f"{where}: 'to' is before 'from'")
+    except (TypeError, ValueError):
+        errors.append(f"{where}: 'from'/'to' must be YYYY-MM-DD dates")
+    try:
+        if (spec['start_time'] and spec['end_time']
+                and _minutes(spec['end_time']) <= _minutes(spec['start_time'])):
+            errors.append(f"{where}: 'end' must be after 'start'")
+    except ValueError:
+        errors.append(f"{where}: 'start'/'end' must be HH:MM times")
+    errors.extend(f"{where}: unknown weekday '{day}'" for day in spec['weekdays'] or [] if day not in WEEKDAYS)
+    return spec
+
+def build_calendar(document: Dict, config: AllocatorConfig) -> AvailabilityCalendar:
+    """Validate an availability document and load it into a calendar"""
+    errors = []
+    closures, windows = [], []
+    for kind, entries, target in (('closures', document.get('closures', []), closures),
+                                  ('windows', document.get('windows', []), windows)):
+        for i, entry in enumerate(entries):
+            where = f"{kind}[{i}]"
+            pitches = _entry_pitches(entry, config, where, errors)
+            target.append((pitches, _entry_range(entry, where, errors), entry.get('reason', 'Closed')))
+
+    if errors:
+        print("⚠️ Availability calendar errors found:")
+        for err in errors:
+            print(f"  - {err}")
+        raise ValueError("Fix availability calendar errors before proceeding")
+
+    calendar = AvailabilityCalendar(config)
+    for pitches, spec, reason in closures:
+        calendar.close(pitches, reason=reason, **spec)
+    for pitches, spec, _ in windows:
+        calendar.add_window(pitches, **spec)
+    return calendar
+
+def load_availability(path: str, config: AllocatorConfig) -> AvailabilityCalendar:
+    """Read and validate an availability calendar file"""
+    with open(path, encoding='utf-8') as f:
+        return build_calendar(json.load(f), config)
+
+def affected_dates(result, calendar: AvailabilityCalendar) -> Set[str]:
+    """Dates on which an allocation uses a slot the calendar now closes or
+    penalises - on any other date the allocation is still optimal"""
+    if result is None or len(result) == 0:
+        return set()
+    return {date for date, time, pitch in zip(result['date'], result['time'], result['pitch'])
+            if calendar.penalty(pitch, date) or not calendar.is_open(pitch, date, time)}
@@ -0,0 +1,161 @@
+"""
+Cranleigh FC allocator benchmark suite
+Generates synthetic seasons (cranleighFC_synthetic) and records the time
+spent in each phase - ingestion, deduplication, fixture build, allocation
+(split into model build, search and extraction), each export - together
+with the allocation quality and CP-SAT statistics, so every performance
+change can be measured against the same workloads.
+
+Examples:
+    python cranleighFC_benchmark.py --preset smoke
+    python cranleighFC_benchmark.py --preset standard --output bench.json
+    python cranleighFC_benchmark.py --demand busy --seasons 2 --clubs 3 --engine greedy
+
+One JSON record per case is printed to stdout; a summary table goes to stderr.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+with contextlib.redirect_stdout(sys.stderr):
+    from CranleighFC_Pitch_Allocation_PROD import (
+        build_fixtures,
+        generate_slots,
+        read_fixture_table,
+        resolve_duplicate_fixtures,
+        solve_allocation,
+        solve_allocation_greedy,
+        solve_allocation_parallel,
+        summarise_allocation
+    )
+    from cranleighFC_exports import EXPORT_FORMATS, export_allocation
+    from cranleighFC_profiling import new_run_report, rounded_report
+    from cranleighFC_synthetic import DEMAND_LEVELS, generate_fixtures
+
+PRESETS = {
+    # Quick sanity check - a few seconds
+    'smoke': [
+        {'demand': 'light', 'seasons': 1, 'clubs': 1},
+        {'demand': 'normal', 'seasons': 1, 'clubs': 1},
+    ],
+    # Demand sweep plus moderate growth in seasons and clubs
+    'standard': [
+        {'demand': demand, 'seasons': 1, 'clubs': 1} for demand in DEMAND_LEVELS
+    ] + [
+        {'demand': 'normal', 'seasons': 3, 'clubs': 1},
+        {'demand': 'normal', 'seasons': 1, 'clubs': 3},
+    ],
+    # Full scaling grid up to 10 seasons x 20 clubs - long running
+    'scale': [
+        {'demand': 'normal', 'seasons': seasons, 'clubs': clubs}
+        for seasons in (1, 2, 5, 10) for clubs in (1, 5, 20)
+    ],
+}
+
+def timed(timings: Dict, phase: str, fn, *args, **kwargs):
+    """Call fn, recording its wall time under timings[phase]"""
+    t0 = time.perf_counter()
+    value = fn(*args, **kwargs)
+    timings[phase] = round(time.perf_counter() - t0, 4)
+    return value
+
+def run_case(case: Dict, engine: str = 'exact', timeout: int = 30,
+             formats: List[str] = ('csv', 'xlsx', 'html'), seed: int = 0,
+             workdir: str = None) -> Dict:
+    """Benchmark one synthetic workload and return its record"""
+    fixtures_df, teams = generate_fixtures(case['seasons'], case['clubs'], case['demand'], seed=seed)
+    path = os.path.join(workdir or tempfile.gettempdir(),
+                        f"bench_{case['demand']}_{case['seasons']}s_{case['clubs']}c_{seed}.csv")
+    fixtures_df.to_csv(path, index=False)
+
+    record = dict(case, engine=engine, seed=seed, rows=len(fixtures_df), timings={}, quality=None)
+    timings = record['timings']
+    report = new_run_report()
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        table = timed(timings, 'ingestion', read_fixture_table, path)
+        table, removed = timed(timings, 'dedup', resolve_duplicate_fixtures, table)
+        fixtures = timed(timings, 'fixture_build', build_fixtures, table, teams)
+        slots_by_date = timed(timings, 'slot_generation', generate_slots, sorted(table['date'].unique()))
+
+        if engine == 'greedy':
+            result = timed(timings, 'allocation', solve_allocation_greedy, fixtures, slots_by_date,
+                           report=report)
+        elif engine == 'parallel':
+            result = timed(timings, 'allocation', solve_allocation_parallel, fixtures, slots_by_date,
+                           timeout=timeout, random_seed=seed, report=report)
+        else:
+            result = timed(timings, 'allocation', solve_allocation, fixtures, slots_by_date,
+                           timeout=timeout, random_seed=seed, report=report)
+
+        record['quality'] = timed(timings, 'reporting', summarise_allocation, result, fixtures)
+
+        if result is not None:
+            for fmt in formats:
+                timed(timings, f'export_{fmt}', export_allocation, result, fixtures, [fmt])
+
+    record['removed_duplicates'] = len(removed)
+    record['dates'] = len(slots_by_date)
+    timings['total'] = round(sum(timings.values()), 4)
+    # Inside the allocation phase: model build vs. search vs. extraction
+    record['allocation_phases'] = rounded_report(report)['phases']
+    record['solver'] = report['solver']
+    os.remove(path)
+    return record
+
+def print_summary(records: List[Dict]):
+    print(f"\n{'case':<32}{'rows':>8}{'alloc':>13}{'ingest':>9}{'dedup':>8}{'build':>8}"
+          f"{'solve':>9}{'export':>9}{'total':>9}", file=sys.stderr)
+    for r in records:
+        t = r['timings']
+        name = f"{r['demand']} {r['seasons']}s x {r['clubs']}c ({r['engine']})"
+        export = sum(v for k, v in t.items() if k.startswith('export_'))
+        allocated = f"{r['quality']['allocated']}/{r['quality']['fixtures']}"
+        print(f"{name:<32}{r['rows']:>8}{allocated:>13}{t['ingestion']:>9.2f}{t['dedup']:>8.2f}"
+              f"{t['fixture_build'] + t['slot_generation']:>8.2f}{t['allocation']:>9.2f}"
+              f"{export:>9.2f}{t['total']:>9.2f}", file=sys.stderr)
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Benchmark the pitch allocator on synthetic seasons',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--preset', choices=list(PRESETS), help='Predefined set of cases')
+    parser.add_argument('--demand', choices=list(DEMAND_LEVELS), default='normal')
+    parser.add_argument('--seasons', type=int, default=1)
+    parser.add_argument('--clubs', type=int, default=1)
+    parser.add_argument('--engine', choices=['exact', 'parallel', 'greedy'], default='exact')
+    parser.add_argument('--timeout', type=int, default=30, help='CP-SAT time limit per case')
+    parser.add_argument('--formats', nargs='*', choices=list(EXPORT_FORMATS),
+                        default=list(EXPORT_FORMATS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write all records to this JSON file')
+    args = parser.parse_args(argv)
+
+    cases = PRESETS[args.preset] if args.preset else [
+        {'demand': args.demand, 'seasons': args.seasons, 'clubs': args.clubs}
+    ]
+
+    records = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for case in cases:
+            record = run_case(case, args.engine, args.timeout, args.formats, args.seed, workdir)
+            print(json.dumps(record), flush=True)
+            records.append(record)
+
+    print_summary(records)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(records, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
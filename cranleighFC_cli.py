@@ -0,0 +1,326 @@
+"""
+Cranleigh FC pitch allocation - command line entry point
+Batch runs for cron: several fixture files and/or engines, optionally in
+parallel, with machine-readable timing and quality metrics on stdout.
+
+Examples:
+    python cranleighFC_cli.py cranleigh_home_fixtures.csv
+    python cranleighFC_cli.py a.csv b.csv --engine exact greedy --jobs 4 \\
+        --formats csv xlsx --output-dir out/ --start-date 2025-12-01
+    python cranleighFC_cli.py joint_fixtures.csv --engine parallel --processes 4 \\
+        --venues config/venues.json --clubs config/clubs.json
+    python cranleighFC_cli.py hard_dates.csv --engine portfolio --portfolio-runs 4 --timeout 60
+    python cranleighFC_cli.py --availability config/availability.json
+    python cranleighFC_cli.py --store history.sqlite3
+    python cranleighFC_cli.py --explain 10
+    python cranleighFC_cli.py --scenarios config/scenarios.json --formats
+
+Runs whose inputs share a file name (a/fixtures.csv, b/fixtures.csv) export
+under their parent directory's name. With --scenarios every input and engine
+is also run under the base config and each what-if scenario.
+
+Each run prints one JSON object per line; solver progress goes to stderr
+(or nowhere with --quiet). Exit status is 1 if any run failed.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import re
+import sys
+import time
+import webbrowser
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+# The allocator prints environment info on import - keep stdout for JSON
+with contextlib.redirect_stdout(sys.stderr):
+    from CranleighFC_Pitch_Allocation_PROD import (
+        CONFIG,
+        PORTFOLIO_RUNS,
+        capacity_bounds,
+        filter_fixtures_by_date,
+        generate_slots,
+        load_and_validate_fixtures,
+        solve_allocation,
+        solve_allocation_greedy,
+        solve_allocation_parallel,
+        solve_allocation_portfolio,
+        summarise_allocation
+    )
+    from cranleighFC_availability import build_calendar, load_availability
+    from cranleighFC_config import DEFAULT_CONFIG_FILE, compile_config, load_allocator_config
+    from cranleighFC_explain import EXPLAIN_BUDGET, explain_unallocated
+    from cranleighFC_exports import EXPORT_FORMATS, export_allocation
+    from cranleighFC_profiling import enable_profiling, new_run_report, rounded_report
+    from cranleighFC_scenarios import load_scenarios, prepare_scenarios
+    from cranleighFC_store import AllocationStore
+
+ENGINES = ('exact', 'parallel', 'portfolio', 'greedy')
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description='Cranleigh FC pitch allocation (batch mode)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('inputs', nargs='*', default=['cranleigh_home_fixtures.csv'],
+                        help='Fixture CSV file(s) (default: cranleigh_home_fixtures.csv)')
+    parser.add_argument('-o', '--output-dir', default='.',
+                        help='Directory for exported schedules (default: current directory)')
+    parser.add_argument('--start-date', help='First match date to allocate (YYYY-MM-DD)')
+    parser.add_argument('--end-date', help='Last match date to allocate (YYYY-MM-DD)')
+    parser.add_argument('--engine', nargs='+', choices=ENGINES, default=['exact'],
+                        help='Allocation engine(s); each engine is a separate run. '
+                             'parallel = exact, solved per date x venue group in a process pool; '
+                             'portfolio = exact, several seeds/strategies racing to one deadline')
+    parser.add_argument('--config', help='Allocator config (default: config/allocator.json)')
+    parser.add_argument('--venues', help='Venues config (JSON) - pitches for multi-venue runs')
+    parser.add_argument('--clubs', help='Clubs config (JSON) - teams and venues for multi-club runs')
+    parser.add_argument('--availability',
+                        help='Availability calendar (JSON) - pitch closures and booked windows')
+    parser.add_argument('--scenarios',
+                        help='What-if scenario file (JSON) - also run every input under each '
+                             'scenario\'s config deltas (see cranleighFC_scenarios.py)')
+
+    solver = parser.add_argument_group('solver configuration (exact engine)')
+    solver.add_argument('--timeout', type=int, default=30, help='CP-SAT time limit in seconds')
+    solver.add_argument('--solver-workers', type=int, default=8, help='CP-SAT search workers')
+    solver.add_argument('--seed', type=int, default=None, help='CP-SAT random seed')
+    solver.add_argument('--processes', type=int, default=None,
+                        help='Solve processes for the parallel and portfolio engines (default: CPU count)')
+    solver.add_argument('--portfolio-runs', type=int, default=PORTFOLIO_RUNS,
+                        help=f'Seed/strategy runs for the portfolio engine (default {PORTFOLIO_RUNS})')
+
+    parser.add_argument('--formats', nargs='*', choices=list(EXPORT_FORMATS), default=['csv'],
+                        help='Export formats; pass the flag with no values for metrics only')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Runs to execute in parallel (processes)')
+    parser.add_argument('--metrics-file', help='Also write all run metrics to this JSON file')
+    parser.add_argument('--explain', nargs='?', type=float, const=EXPLAIN_BUDGET, default=None,
+                        metavar='SECONDS',
+                        help='Explain each unallocated fixture (blocking fixtures, pitches and rules) '
+                             f'within a time budget (default {EXPLAIN_BUDGET:g}s)')
+    parser.add_argument('--store', nargs='?', const='', default=None, metavar='DB',
+                        help='Record each run in the allocation history store '
+                             '(default: $CRANLEIGH_STORE or allocations.sqlite3)')
+    parser.add_argument('--profile-dir',
+                        help='Write cProfile and tracemalloc reports per phase under this directory '
+                             '(same as setting CRANLEIGH_PROFILE_DIR)')
+    parser.add_argument('--open', action='store_true',
+                        help='Open the HTML schedule in a browser (single run only)')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='Discard solver progress output instead of sending it to stderr')
+    return parser
+
+def output_stem(input_path: str, engine: str, multiple_engines: bool, scenario: str = None) -> str:
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    if scenario is not None:
+        stem += '_' + (re.sub(r'[^A-Za-z0-9]+', '_', scenario).strip('_').lower() or 'scenario')
+    return f"{stem}_{engine}" if multiple_engines else stem
+
+def assign_output_stems(specs: List[Dict], multiple_engines: bool):
+    """
+    Set each run's export file stem, unique across the batch: inputs with
+    the same file name are told apart by their parent directory, then by
+    their position in the batch.
+    """
+    stems = [output_stem(spec['input'], spec['engine'], multiple_engines,
+                         spec['scenario']['name'] if spec['scenario'] else None)
+             for spec in specs]
+    counts = Counter(stems)
+    for i, spec in enumerate(specs):
+        if counts[stems[i]] > 1:
+            parent = os.path.basename(os.path.dirname(os.path.abspath(spec['input'])))
+            stems[i] = f"{parent}_{stems[i]}"
+    counts = Counter(stems)
+    for i, spec in enumerate(specs):
+        spec['stem'] = f"{stems[i]}_{i + 1}" if counts[stems[i]] > 1 else stems[i]
+
+def run_allocation(spec: Dict) -> Dict:
+    """Run one (input, engine) allocation and return its metrics record"""
+    record = {
+        'input': spec['input'],
+        'engine': spec['engine'],
+        'scenario': spec['scenario']['name'] if spec['scenario'] else None,
+        'status': 'ok',
+        'timings': {},
+        'metrics': None,
+        'outputs': {}
+    }
+    report = new_run_report()
+    log = open(os.devnull, 'w') if spec['quiet'] else sys.stderr
+    started = time.perf_counter()
+
+    try:
+        with contextlib.redirect_stdout(log):
+            t0 = time.perf_counter()
+            config = None
+            calendar = None
+            if spec['scenario']:
+                # Already validated against the base config by prepare_scenarios
+                config = compile_config(spec['scenario']['document'])
+                if any(spec['scenario']['availability'].values()):
+                    calendar = build_calendar(spec['scenario']['availability'], config)
+                    record['closures'] = len(calendar)
+            else:
+                if spec['config'] or spec['venues'] or spec['clubs']:
+                    # Files not given fall back to the ones named in allocator.json
+                    config = load_allocator_config(spec['config'] or DEFAULT_CONFIG_FILE,
+                                                   spec['venues'], spec['clubs'])
+                if spec['availability']:
+                    calendar = load_availability(spec['availability'], config or CONFIG)
+                    record['closures'] = len(calendar)
+            fixtures, slots_by_date, removed_duplicates = load_and_validate_fixtures(
+                spec['input'], report=report, config=config, calendar=calendar
+            )
+            fixtures, slots_by_date = filter_fixtures_by_date(
+                fixtures, slots_by_date, spec['start_date'], spec['end_date']
+            )
+            record['timings']['load'] = time.perf_counter() - t0
+            record['removed_duplicates'] = len(removed_duplicates)
+            # Fixtures no engine can allocate (counting bounds per date and format)
+            record['overflow'] = int(capacity_bounds(fixtures, slots_by_date, config)['overflow'].sum())
+
+            t0 = time.perf_counter()
+            if spec['engine'] == 'greedy':
+                result = solve_allocation_greedy(fixtures, slots_by_date, report=report, config=config)
+            elif spec['engine'] == 'parallel':
+                result = solve_allocation_parallel(fixtures, slots_by_date, timeout=spec['timeout'],
+                                                   num_workers=spec['solver_workers'],
+                                                   max_processes=spec['processes'],
+                                                   random_seed=spec['seed'], report=report,
+                                                   config=config)
+            elif spec['engine'] == 'portfolio':
+                result = solve_allocation_portfolio(fixtures, slots_by_date, timeout=spec['timeout'],
+                                                    num_workers=spec['solver_workers'],
+                                                    runs=spec['portfolio_runs'],
+                                                    max_processes=spec['processes'],
+                                                    random_seed=spec['seed'], report=report,
+                                                    config=config)
+            else:
+                result = solve_allocation(fixtures, slots_by_date, timeout=spec['timeout'],
+                                          num_workers=spec['solver_workers'],
+                                          random_seed=spec['seed'], report=report,
+                                          config=config)
+            record['timings']['solve'] = time.perf_counter() - t0
+            record['metrics'] = summarise_allocation(result, fixtures, config)
+            record['config'] = (config or CONFIG).short_fingerprint
+
+            if spec['explain'] is not None:
+                t0 = time.perf_counter()
+                # Full slot lists - closed slots are explained from the calendar
+                record['unallocated'] = explain_unallocated(
+                    fixtures, generate_slots(sorted(slots_by_date), config), result,
+                    calendar=calendar, time_budget=spec['explain'], config=config
+                )
+                record['timings']['explain'] = time.perf_counter() - t0
+
+            if spec['store'] is not None:
+                store = AllocationStore(spec['store'] or None)
+                record['run_id'] = store.save_run(result, fixtures, source=spec['input'],
+                                                  engine=spec['engine'], config=record['config'],
+                                                  metrics=record['metrics'], report=report)
+
+            if result is not None and spec['formats']:
+                t0 = time.perf_counter()
+                os.makedirs(spec['output_dir'], exist_ok=True)
+                for fmt, data in export_allocation(result, fixtures, spec['formats'],
+                                                   report=report).items():
+                    path = os.path.join(spec['output_dir'],
+                                        f"{spec['stem']}_allocations.{EXPORT_FORMATS[fmt]['extension']}")
+                    with open(path, 'wb') as f:
+                        f.write(data)
+                    record['outputs'][fmt] = path
+                record['timings']['export'] = time.perf_counter() - t0
+    except Exception as e:
+        record['status'] = 'failed'
+        record['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        if spec['quiet']:
+            log.close()
+
+    record['timings']['total'] = time.perf_counter() - started
+    record['timings'] = {phase: round(seconds, 4) for phase, seconds in record['timings'].items()}
+    # Finer breakdown: pandas phases, model build, search and each export
+    record.update(rounded_report(report))
+    return record
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    multiple_engines = len(args.engine) > 1
+    if args.profile_dir:
+        enable_profiling(args.profile_dir)
+
+    scenarios = [None]
+    if args.scenarios:
+        # Validate every scenario before any run - a typo fails the batch up front
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                base_config = None
+                if args.config or args.venues or args.clubs:
+                    base_config = load_allocator_config(args.config or DEFAULT_CONFIG_FILE,
+                                                        args.venues, args.clubs)
+                base_availability = None
+                if args.availability:
+                    with open(args.availability, encoding='utf-8') as f:
+                        base_availability = json.load(f)
+                scenarios = prepare_scenarios(load_scenarios(args.scenarios), base_config,
+                                              base_availability)
+        except (OSError, ValueError) as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+
+    specs = [
+        {
+            'input': input_path,
+            'engine': engine,
+            'scenario': scenario,
+            'output_dir': args.output_dir,
+            'start_date': args.start_date,
+            'end_date': args.end_date,
+            'timeout': args.timeout,
+            'solver_workers': args.solver_workers,
+            'seed': args.seed,
+            'processes': args.processes,
+            'portfolio_runs': args.portfolio_runs,
+            'config': args.config,
+            'venues': args.venues,
+            'clubs': args.clubs,
+            'availability': args.availability,
+            'formats': args.formats,
+            'explain': args.explain,
+            'store': args.store,
+            'quiet': args.quiet
+        }
+        for input_path in args.inputs
+        for engine in args.engine
+        for scenario in scenarios
+    ]
+    assign_output_stems(specs, multiple_engines)
+
+    records = []
+    if args.jobs > 1 and len(specs) > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            for record in pool.map(run_allocation, specs):
+                print(json.dumps(record), flush=True)
+                records.append(record)
+    else:
+        for spec in specs:
+            record = run_allocation(spec)
+            print(json.dumps(record), flush=True)
+            records.append(record)
+
+    if args.metrics_file:
+        with open(args.metrics_file, 'w', encoding='utf-8') as f:
+            json.dump(records, f, indent=2)
+
+    if args.open and len(records) == 1 and 'html' in records[0]['outputs']:
+        webbrowser.open(f"file://{os.path.abspath(records[0]['outputs']['html'])}")
+
+    return 0 if all(r['status'] == 'ok' for r in records) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
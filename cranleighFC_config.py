@@ -0,0 +1,404 @@
+"""
+Cranleigh FC allocator configuration
+Everything the allocator needs to know about the club lives in versioned
+JSON under config/ rather than in code:
+
+    config/allocator.json  rules and objective weights - kickoff times per
+                           format, age group formats and priorities, P3
+                           preferences, senior kickoff, match_minutes, weights
+                           (+ version)
+    config/venues.json     {"venues": {"<id>": {"name": ..., "pitches": {"<pitch>": {...}}}}}
+                           a pitch may list "splits": {"<format>": ["<child>", ...]} -
+                           layouts it can be marked out in instead of whole;
+                           a venue may list "resources": {"<name>": {"capacity": n,
+                           "demand": {"<format>": n}}} - changing rooms, parking
+    config/clubs.json      {"clubs": {"<club>": {"venues": [...], "teams": {...},
+                                                 "senior_priority": {...},
+                                                 "links": {"<person>": ["<team>", ...]}}}}
+                           links: a coach running several teams or a family
+                           with children in several - their kickoffs can't overlap
+
+load_allocator_config() validates the three files once and compiles them
+into an immutable AllocatorConfig: integer-indexed lookup tables for the
+solver's inner loop plus a sha256 fingerprint that callers fold into their
+cache keys. Pitch names must be unique across venues; a team belongs to
+one club. Split layouts compile into child pitches of their own format
+(sharing the parent's venue, surface and priority); at any kickoff a parent
+is used whole or in one layout. Site resources compile into per
+(pitch, kickoff) loads: each fixture holds its format's demand at every
+kickoff its match_minutes overlap, at its pitch's venue.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Tuple
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config')
+DEFAULT_CONFIG_FILE = os.path.join(CONFIG_DIR, 'allocator.json')
+
+SUPPORTED_VERSIONS = (1,)
+
+SURFACES = ('grass', '3g')   # Pitch "surface" (default grass) - weather rules close grass first
+
+REQUIRED_WEIGHTS = [
+    'allocation', 'back_to_back_penalty', 'age_priority', 'overflow_penalty',
+    'cup_kickoff_bonus', 'cup_pitch_11v11_bonus', 'cup_pitch_bonus',
+    'small_pitch_bonus', 'senior_pitch_bonus', 'preferred_time_bonus'
+]
+
+def _frozen(mapping: Dict) -> Mapping:
+    return MappingProxyType(dict(mapping))
+
+@dataclass(frozen=True, eq=False)
+class AllocatorConfig:
+    """
+    Validated, precompiled allocator configuration (see load_allocator_config).
+    Mappings are read-only views; per-pitch and per-age-group tables are
+    tuples indexed by pitch_index / age_index.
+    """
+    version: int
+    fingerprint: str
+    source: str                           # Canonical JSON the config was compiled from
+
+    # Rules
+    pitches: Mapping[str, Mapping]        # pitch -> info ('location' = venue id)
+    teams: Mapping[str, str]              # team -> age group
+    senior_priority: Mapping[str, int]
+    team_venues: Mapping[str, Tuple[str, ...]]
+    club_of: Mapping[str, str]
+    links: Mapping[str, Tuple[str, ...]]  # person -> teams whose kickoffs must not overlap
+    age_group_formats: Mapping[str, str]
+    age_priority: Mapping[str, int]
+    p3_middle_priority: Mapping[str, int]
+    kickoff_times: Mapping[str, Tuple[str, ...]]
+    senior_age_groups: frozenset
+    senior_kickoff: str
+    cup_kickoff: str
+    back_to_back_kickoffs: Tuple[str, str]
+    max_games_per_pitch_per_day: int
+    match_minutes: Mapping[str, int]      # format -> minutes a fixture holds its site from kickoff
+    weights: Mapping[str, int]
+
+    # Precompiled lookups
+    pitch_names: Tuple[str, ...]
+    pitch_index: Mapping[str, int]
+    pitch_overflow: Tuple[bool, ...]
+    age_groups: Tuple[str, ...]
+    age_index: Mapping[str, int]
+    allowed_pitches: Tuple[frozenset, ...]   # [age] -> pitch indices (format + seniors-only rules)
+    allowed_kickoffs: Tuple[frozenset, ...]  # [age] -> kickoff times
+    base_weight: Tuple[Tuple[int, ...], ...]  # [age][pitch] -> priority/overflow/small pitch weight
+    cup_pitch_bonus: Tuple[Tuple[int, ...], ...]  # [age][pitch] -> extra weight for cup ties
+    senior_pitch: Tuple[bool, ...]          # [pitch] -> senior priority bonus applies
+    linked_teams: Mapping[str, frozenset]   # team -> teams sharing a coach/family with it
+    splits: Mapping[str, Mapping[str, Tuple[str, ...]]]  # parent -> {layout format: child pitches}
+    split_parent: Mapping[str, Tuple[str, str]]          # child -> (parent, layout format)
+    site_resources: Mapping[str, Mapping[str, Mapping]]  # venue -> {resource: {capacity, demand}}
+    resource_loads: Mapping[Tuple[str, str], Tuple]      # (pitch, kickoff) -> ((venue, resource, held kickoff), demand, capacity)...
+
+    def __eq__(self, other):
+        return isinstance(other, AllocatorConfig) and other.fingerprint == self.fingerprint
+
+    def __hash__(self):
+        return hash(self.fingerprint)
+
+    def __reduce__(self):
+        # Pickle as source text (process pools) and recompile on the other side
+        return (compile_config, (json.loads(self.source),))
+
+    @property
+    def short_fingerprint(self) -> str:
+        return self.fingerprint[:12]
+
+    def pitch_catalogue(self) -> Dict[str, Dict]:
+        """Mutable copy of the pitches in the legacy dict layout"""
+        return {pitch: dict(info) for pitch, info in self.pitches.items()}
+
+# =====================================
+# 📂 Reading Files
+# =====================================
+def _read_json(path: str) -> Dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def read_config_document(path: str = DEFAULT_CONFIG_FILE, venues_file: str = None,
+                         clubs_file: str = None) -> Dict:
+    """
+    Merge allocator.json with its venues and clubs files into one document.
+    venues_file / clubs_file override the files named in allocator.json.
+    """
+    document = _read_json(path)
+    base = os.path.dirname(os.path.abspath(path))
+    # File names are not part of the fingerprint - only their contents
+    venues_name = document.pop('venues_file', 'venues.json')
+    clubs_name = document.pop('clubs_file', 'clubs.json')
+    venues_file = venues_file or os.path.join(base, venues_name)
+    clubs_file = clubs_file or os.path.join(base, clubs_name)
+    document['venues'] = _read_json(venues_file).get('venues', {})
+    document['clubs'] = _read_json(clubs_file).get('clubs', {})
+    return document
+
+# =====================================
+# ✅ Validation and Compilation
+# =====================================
+def _raise_if_errors(errors: List[str]):
+    if errors:
+        print("⚠️ Configuration errors found:")
+        for err in errors:
+            print(f"  - {err}")
+        raise ValueError("Fix configuration errors before proceeding")
+
+def _compile_venues(venues: Dict, formats: Mapping, errors: List[str]) -> Dict[str, Dict]:
+    catalogue = {}
+    for venue_id, venue in venues.items():
+        if not venue.get('pitches'):
+            errors.append(f"Venue '{venue_id}' has no pitches")
+        for pitch, info in venue.get('pitches', {}).items():
+            if pitch in catalogue:
+                errors.append(f"Pitch '{pitch}' defined at both '{catalogue[pitch]['location']}' and '{venue_id}'")
+                continue
+            if info.get('format') not in formats:
+                errors.append(f"Pitch '{pitch}': format must be one of {', '.join(formats)}")
+            priority = info.get('priority', 1)
+            if not isinstance(priority, int) or priority < 1:
+                errors.append(f"Pitch '{pitch}': priority must be a positive integer")
+            surface = info.get('surface', 'grass')
+            if surface not in SURFACES:
+                errors.append(f"Pitch '{pitch}': surface must be one of {', '.join(SURFACES)}")
+            catalogue[pitch] = dict(info, location=venue_id, priority=priority, surface=surface)
+            _compile_splits(pitch, catalogue, formats, errors)
+    return catalogue
+
+def _compile_splits(pitch: str, catalogue: Dict, formats: Mapping, errors: List[str]):
+    """Add a pitch's split layouts to the catalogue as child pitches"""
+    parent = catalogue[pitch]
+    for fmt, children in parent.get('splits', {}).items():
+        if fmt not in formats:
+            errors.append(f"Pitch '{pitch}': split format must be one of {', '.join(formats)}")
+        if not isinstance(children, list) or not children:
+            errors.append(f"Pitch '{pitch}': split '{fmt}' must list its child pitch names")
+            continue
+        for child in children:
+            if child in catalogue:
+                errors.append(f"Pitch '{pitch}': split pitch '{child}' is already defined")
+                continue
+            catalogue[child] = {
+                'format': fmt,
+                'lights': parent.get('lights', False),
+                'location': parent['location'],
+                'priority': parent['priority'],
+                'surface': parent['surface'],
+                'parent': pitch,
+                'split': fmt
+            }
+
+def _compile_resources(venues: Dict, formats: Mapping, errors: List[str]) -> Dict[str, Dict]:
+    """Shared site resources per venue: {venue: {resource: {capacity, demand}}}"""
+    resources = {}
+    for venue_id, venue in venues.items():
+        for name, spec in venue.get('resources', {}).items():
+            capacity = spec.get('capacity')
+            if not isinstance(capacity, int) or capacity < 0:
+                errors.append(f"Venue '{venue_id}': resource '{name}' needs a non-negative integer capacity")
+            demand = spec.get('demand', {})
+            errors.extend(f"Venue '{venue_id}': resource '{name}' demand for unknown format '{fmt}'"
+                          for fmt in demand if fmt not in formats)
+            errors.extend(f"Venue '{venue_id}': resource '{name}' demand for '{fmt}' must be a non-negative integer"
+                          for fmt, amount in demand.items() if not isinstance(amount, int) or amount < 0)
+            resources.setdefault(venue_id, {})[name] = {'capacity': capacity, 'demand': dict(demand)}
+    return resources
+
+def _minutes(kickoff: str) -> int:
+    hours, minutes = kickoff.split(':')
+    return int(hours) * 60 + int(minutes)
+
+def _compile_resource_loads(catalogue: Dict, resources: Dict, kickoff_times: Mapping,
+                            match_minutes: Mapping) -> Dict[Tuple[str, str], Tuple]:
+    """
+    What a fixture on each (pitch, kickoff) holds of its venue's resources:
+    its format's demand at every kickoff from its own up to (not including)
+    kickoff + match_minutes. Pitches at venues without resources are left out.
+    """
+    all_kickoffs = sorted({t for times in kickoff_times.values() for t in times}, key=_minutes)
+    loads = {}
+    for pitch, info in catalogue.items():
+        venue_resources = resources.get(info['location'])
+        if not venue_resources:
+            continue
+        fmt = info['format']
+        for kickoff in kickoff_times.get(fmt, ()):
+            start = _minutes(kickoff)
+            end = start + max(1, match_minutes.get(fmt, 0))
+            held = [t for t in all_kickoffs if start <= _minutes(t) < end]
+            load = tuple(((info['location'], name, t), spec['demand'][fmt], spec['capacity'])
+                         for name, spec in venue_resources.items() if spec['demand'].get(fmt)
+                         for t in held)
+            if load:
+                loads[(pitch, kickoff)] = load
+    return loads
+
+def _compile_clubs(clubs: Dict, venue_ids: set, age_groups: Mapping, errors: List[str]) -> Dict:
+    model = {'teams': {}, 'senior_priority': {}, 'team_venues': {}, 'club_of': {}, 'links': {}}
+    for club, spec in clubs.items():
+        venues = spec.get('venues', [])
+        if not venues:
+            errors.append(f"Club '{club}' has no venues")
+        errors.extend(f"Club '{club}': unknown venue '{venue}'" for venue in venues if venue not in venue_ids)
+
+        for team, age in spec.get('teams', {}).items():
+            if team in model['club_of']:
+                errors.append(f"Team '{team}' listed for both '{model['club_of'][team]}' and '{club}'")
+                continue
+            if age not in age_groups:
+                errors.append(f"Team '{team}': unknown age group '{age}'")
+            model['teams'][team] = age
+            model['club_of'][team] = club
+            model['team_venues'][team] = tuple(venues)
+
+        for team, priority in spec.get('senior_priority', {}).items():
+            if team not in spec.get('teams', {}):
+                errors.append(f"Club '{club}': senior priority for unknown team '{team}'")
+            model['senior_priority'][team] = priority
+
+        for person, teams in spec.get('links', {}).items():
+            if person in model['links']:
+                errors.append(f"Club '{club}': link '{person}' is already listed for another club")
+                continue
+            if not isinstance(teams, list) or len(set(teams)) < 2:
+                errors.append(f"Club '{club}': link '{person}' must list at least two teams")
+                continue
+            model['links'][person] = tuple(dict.fromkeys(teams))
+    # Links may reach another club's teams, so check them once every club is read
+    errors.extend(f"Link '{person}': unknown team '{team}'"
+                  for person, teams in model['links'].items() for team in teams if team not in model['teams'])
+    return model
+
+def compile_config(document: Dict) -> AllocatorConfig:
+    """Validate a merged config document and compile it into an AllocatorConfig"""
+    errors = []
+    version = document.get('version')
+    if version not in SUPPORTED_VERSIONS:
+        _raise_if_errors([f"Unsupported config version {version!r} "
+                          f"(supported: {', '.join(map(str, SUPPORTED_VERSIONS))})"])
+
+    kickoff_times = {fmt: tuple(times) for fmt, times in document.get('kickoff_times', {}).items()}
+    age_group_formats = document.get('age_group_formats', {})
+    age_priority = document.get('age_priority', {})
+    p3_middle_priority = document.get('p3_middle_priority', {})
+    senior_age_groups = frozenset(document.get('senior_age_groups', []))
+    weights = document.get('weights', {})
+    back_to_back = tuple(document.get('back_to_back_kickoffs', []))
+    match_minutes = document.get('match_minutes', {})
+
+    for age, fmt in age_group_formats.items():
+        if fmt not in kickoff_times:
+            errors.append(f"Age group '{age}': format '{fmt}' has no kickoff times")
+        if not isinstance(age_priority.get(age), int):
+            errors.append(f"Age group '{age}': missing integer age_priority")
+    errors.extend(f"p3_middle_priority: unknown age group '{age}'"
+                  for age in p3_middle_priority if age not in age_group_formats)
+    errors.extend(f"senior_age_groups: unknown age group '{age}'"
+                  for age in senior_age_groups if age not in age_group_formats)
+    errors.extend(f"weights: missing integer '{name}'"
+                  for name in REQUIRED_WEIGHTS if not isinstance(weights.get(name), int))
+    errors.extend(f"match_minutes: unknown format '{fmt}'" for fmt in match_minutes if fmt not in kickoff_times)
+    errors.extend(f"match_minutes: '{fmt}' must be a positive integer"
+                  for fmt, minutes in match_minutes.items() if not isinstance(minutes, int) or minutes < 1)
+    if len(back_to_back) != 2:
+        errors.append("back_to_back_kickoffs must list exactly two kickoff times")
+    if not isinstance(document.get('max_games_per_pitch_per_day'), int):
+        errors.append("max_games_per_pitch_per_day must be an integer")
+    for key in ('senior_kickoff', 'cup_kickoff'):
+        if not isinstance(document.get(key), str):
+            errors.append(f"{key} must be a HH:MM string")
+
+    catalogue = _compile_venues(document.get('venues', {}), kickoff_times, errors)
+    resources = _compile_resources(document.get('venues', {}), kickoff_times, errors)
+    clubs = _compile_clubs(document.get('clubs', {}),
+                           {info['location'] for info in catalogue.values()},
+                           age_group_formats, errors)
+    _raise_if_errors(errors)
+
+    # Precompile integer-indexed tables for the solver
+    pitch_names = tuple(catalogue)
+    age_groups = tuple(age_group_formats)
+    senior_kickoff = document['senior_kickoff']
+    all_kickoffs = frozenset(t for times in kickoff_times.values() for t in times)
+
+    allowed_pitches, allowed_kickoffs, base_weight, cup_pitch_bonus = [], [], [], []
+    for age in age_groups:
+        is_senior = age in senior_age_groups
+        allowed_pitches.append(frozenset(
+            idx for idx, pitch in enumerate(pitch_names)
+            if catalogue[pitch]['format'] == age_group_formats[age]
+            and (is_senior or not catalogue[pitch].get('seniors_only'))
+        ))
+        allowed_kickoffs.append(frozenset({senior_kickoff}) if is_senior
+                                else all_kickoffs - {senior_kickoff})
+        base_weight.append(tuple(
+            age_priority[age] * weights['age_priority']
+            - (weights['overflow_penalty'] if catalogue[pitch]['priority'] > 1 else 0)
+            + (p3_middle_priority.get(age, 0) * weights['small_pitch_bonus']
+               if catalogue[pitch].get('size') == 'small' else 0)
+            for pitch in pitch_names
+        ))
+        cup_bonus = (weights['cup_pitch_11v11_bonus'] if age_group_formats[age] == '11v11'
+                     else weights['cup_pitch_bonus'])
+        cup_pitch_bonus.append(tuple(cup_bonus if catalogue[pitch].get('cup_pitch') else 0
+                                     for pitch in pitch_names))
+
+    linked_teams = {}
+    for teams in clubs['links'].values():
+        for team in teams:
+            linked_teams.setdefault(team, set()).update(other for other in teams if other != team)
+
+    source = json.dumps(document, sort_keys=True, separators=(',', ':'))
+
+    return AllocatorConfig(
+        version=version,
+        fingerprint=hashlib.sha256(source.encode('utf-8')).hexdigest(),
+        source=source,
+        pitches=_frozen({pitch: _frozen(info) for pitch, info in catalogue.items()}),
+        teams=_frozen(clubs['teams']),
+        senior_priority=_frozen(clubs['senior_priority']),
+        team_venues=_frozen(clubs['team_venues']),
+        club_of=_frozen(clubs['club_of']),
+        links=_frozen(clubs['links']),
+        age_group_formats=_frozen(age_group_formats),
+        age_priority=_frozen(age_priority),
+        p3_middle_priority=_frozen(p3_middle_priority),
+        kickoff_times=_frozen(kickoff_times),
+        senior_age_groups=senior_age_groups,
+        senior_kickoff=senior_kickoff,
+        cup_kickoff=document['cup_kickoff'],
+        back_to_back_kickoffs=back_to_back,
+        max_games_per_pitch_per_day=document['max_games_per_pitch_per_day'],
+        match_minutes=_frozen(match_minutes),
+        weights=_frozen(weights),
+        pitch_names=pitch_names,
+        pitch_index=_frozen({pitch: idx for idx, pitch in enumerate(pitch_names)}),
+        pitch_overflow=tuple(catalogue[pitch]['priority'] > 1 for pitch in pitch_names),
+        age_groups=age_groups,
+        age_index=_frozen({age: idx for idx, age in enumerate(age_groups)}),
+        allowed_pitches=tuple(allowed_pitches),
+        allowed_kickoffs=tuple(allowed_kickoffs),
+        base_weight=tuple(base_weight),
+        cup_pitch_bonus=tuple(cup_pitch_bonus),
+        senior_pitch=tuple(bool(catalogue[pitch].get('seniors_only')) for pitch in pitch_names),
+        linked_teams=_frozen({team: frozenset(others) for team, others in linked_teams.items()}),
+        splits=_frozen({pitch: _frozen({fmt: tuple(children) for fmt, children in info['splits'].items()})
+                        for pitch, info in catalogue.items() if info.get('splits')}),
+        split_parent=_frozen({pitch: (info['parent'], info['split'])
+                              for pitch, info in catalogue.items() if 'parent' in info}),
+        site_resources=_frozen({venue: _frozen({name: _frozen(spec) for name, spec in venue_resources.items()})
+                                for venue, venue_resources in resources.items()}),
+        resource_loads=_frozen(_compile_resource_loads(catalogue, resources, kickoff_times, match_minutes))
+    )
+
+def load_allocator_config(path: str = DEFAULT_CONFIG_FILE, venues_file: str = None,
+                          clubs_file: str = None) -> AllocatorConfig:
+    """Read, validate and compile the allocator configuration"""
+    return compile_config(read_config_document(path, venues_file, clubs_file))
@@ -0,0 +1,293 @@
+"""
+Cranleigh FC unallocation explanations
+Why each unallocated fixture missed out, named precisely: the fixtures
+holding the slots it needs, the pitches involved and the rules (kickoff
+windows, the P6 seniors-only restriction, the games-per-pitch cap,
+site resource limits, linked teams' kickoffs, closures) that stop it
+going anywhere else.
+
+Each date with unallocated fixtures gets one small CP-SAT feasibility
+model in which every allocated fixture, pitch cap, site resource limit,
+linked-team group, slot rule and closure is an assumption literal. Forcing the unallocated fixture in makes the
+model infeasible; SufficientAssumptionsForInfeasibility returns a
+conflicting subset, which is shrunk to a minimal one by dropping literals
+one at a time. Every solve shares one deadline, so crowded Saturdays
+degrade to "not explained in time" rather than stalling the caller.
+"""
+
+import time
+from typing import Dict, List, Tuple
+
+import pandas as pd
+from ortools.sat.python import cp_model
+
+from CranleighFC_Pitch_Allocation_PROD import (
+    CONFIG,
+    add_split_constraints,
+    link_terms,
+    resource_terms,
+    slot_block_reason
+)
+from cranleighFC_availability import AvailabilityCalendar
+from cranleighFC_config import AllocatorConfig
+
+EXPLAIN_BUDGET = 5.0        # Seconds for a whole explanation run
+SOLVE_LIMIT = 1.0           # Seconds for any one feasibility check
+
+# Categories
+CAPACITY = 'capacity'       # Compatible slots exist but other fixtures hold them
+RULES = 'rules'             # Rules/closures alone rule out every slot on the date
+NO_DATE = 'no_date'         # No slots at all on the fixture's date
+MISSED = 'missed'           # A slot is free - the solve stopped before proving optimality
+UNEXPLAINED = 'unexplained' # Time budget ran out
+_CORE = 'core'
+
+class _DateModel:
+    """Feasibility model for one date with assumption literals for everything relaxable"""
+
+    def __init__(self, date: str, date_fixtures: Dict, slots: List[Tuple], calendar: AvailabilityCalendar,
+                 targets: List[str], config: AllocatorConfig):
+        self.model = cp_model.CpModel()
+        self.allocated = {}   # fixture_id -> literal "fixture holds a slot"
+        self.terms = {}       # literal index -> ('fixture', fid) / ('cap', pitch) / ('rule', fid, reason) /
+                              # ('closure', pitch, reason) / ('resource', venue, resource, kickoff) /
+                              # ('link', people, kickoff)
+        self.options = {}     # fixture_id -> [(time, pitch, var)] over slots it may use under all rules
+        self.signature = {}   # fixture_id -> its slots, the rules/closures on each and its links
+        rule_lits = {}
+        closure_lits = {}
+        vars_by_slot = {}
+        vars_by_pitch = {}
+        vars_by_fixture_time = {}
+        targets = set(targets)
+
+        for fixture_id, f in date_fixtures.items():
+            fixture_vars = []
+            signature = []
+            for _, kickoff, pitch in slots:
+                pitch_info = config.pitches[pitch]
+                # Format and venue are physical limits, not rules to relax
+                if pitch_info['format'] != f['format_req']:
+                    continue
+                if f.get('venues') is not None and pitch_info['location'] not in f['venues']:
+                    continue
+                reason = slot_block_reason(f, kickoff, pitch, config)
+                closure = calendar.closure_reason(pitch, date, kickoff) if calendar is not None else None
+                # Rule-breaking slots only matter for the fixtures being explained
+                if reason is not None and fixture_id not in targets:
+                    continue
+                var = self.model.NewBoolVar(f'{fixture_id}_{kickoff}_{pitch}')
+                signature.append((kickoff, pitch, reason, closure))
+                if reason is not None:
+                    key = ('rule', fixture_id, reason)
+                    if key not in rule_lits:
+                        rule_lits[key] = self._literal(key)
+                    self.model.AddImplication(rule_lits[key], var.Not())
+                if closure is not None:
+                    key = ('closure', pitch, closure)
+                    if key not in closure_lits:
+                        closure_lits[key] = self._literal(key)
+                    self.model.AddImplication(closure_lits[key], var.Not())
+                if reason is None and closure is None:
+                    self.options.setdefault(fixture_id, []).append((kickoff, pitch, var))
+                fixture_vars.append(var)
+                vars_by_slot.setdefault((date, kickoff, pitch), []).append(var)
+                vars_by_pitch.setdefault(pitch, []).append(var)
+                vars_by_fixture_time.setdefault(fixture_id, {}).setdefault(kickoff, []).append(var)
+            allocated = self._literal(('fixture', fixture_id))
+            self.model.Add(sum(fixture_vars) == allocated)
+            self.allocated[fixture_id] = allocated
+            # Link literals depend on the team, so linked teams never share a conflict
+            linked = f['team_name'] if f['team_name'] in config.linked_teams else None
+            self.signature[fixture_id] = (tuple(signature), linked)
+
+        for slot_vars in vars_by_slot.values():
+            if len(slot_vars) > 1:
+                self.model.AddAtMostOne(slot_vars)
+        add_split_constraints(self.model, vars_by_slot, config)   # Physical - never relaxed
+        self.caps = []
+        max_games = config.max_games_per_pitch_per_day
+        for pitch, pitch_vars in vars_by_pitch.items():
+            if len(pitch_vars) > max_games:
+                cap = self._literal(('cap', pitch))
+                self.model.Add(sum(pitch_vars) <= max_games).OnlyEnforceIf(cap)
+                self.caps.append(cap)
+        for (_, venue, resource, kickoff), (load, capacity) in resource_terms(vars_by_slot, config).items():
+            limit = self._literal(('resource', venue, resource, kickoff))
+            self.model.Add(sum(demand * var for demand, var in load) <= capacity).OnlyEnforceIf(limit)
+            self.caps.append(limit)
+        for (_, kickoff, _), (people, group_vars) in link_terms(date_fixtures, vars_by_fixture_time, config).items():
+            limit = self._literal(('link', ', '.join(people), kickoff))
+            self.model.Add(sum(group_vars) <= 1).OnlyEnforceIf(limit)
+            self.caps.append(limit)
+        self.rules = rule_lits
+        self.closures = list(closure_lits.values())
+
+    def _literal(self, term: Tuple):
+        literal = self.model.NewBoolVar(str(term))
+        self.terms[literal.Index()] = term
+        return literal
+
+    def solve(self, assumptions: List, deadline: float) -> Tuple[int, cp_model.CpSolver]:
+        self.model.ClearAssumptions()
+        self.model.AddAssumptions(assumptions)
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = max(0.01, min(SOLVE_LIMIT, deadline - time.perf_counter()))
+        solver.parameters.num_search_workers = 1   # Cores need the single-worker search
+        solver.parameters.linearization_level = 2  # Full LP relaxation - proves the matching cuts fast
+        return solver.Solve(self.model), solver
+
+    def conflict(self, target: str, kept: List[str], deadline: float):
+        """
+        (status, terms): a minimal set of terms that, with the target forced
+        in, is infeasible - or a free (time, pitch) if the target fits
+        """
+        assumptions = ([self.allocated[fid] for fid in kept] + self.caps + self.closures +
+                       [lit for (kind, fid, _), lit in self.rules.items() if fid == target])
+        status, solver = self.solve([self.allocated[target]] + assumptions, deadline)
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            slot = next(((kickoff, pitch) for kickoff, pitch, var in self.options.get(target, [])
+                         if solver.Value(var)), None)
+            return MISSED, slot
+        if status != cp_model.INFEASIBLE:
+            return UNEXPLAINED, None
+
+        by_index = {lit.Index(): lit for lit in assumptions}
+        core = [by_index[i] for i in solver.SufficientAssumptionsForInfeasibility() if i in by_index]
+        # Deletion pass: drop each literal the conflict survives without
+        for lit in list(core):
+            if time.perf_counter() >= deadline:
+                break
+            trial = [other for other in core if other is not lit]
+            status, _ = self.solve([self.allocated[target]] + trial, deadline)
+            if status == cp_model.INFEASIBLE:
+                core = trial
+        return _CORE, [self.terms[lit.Index()] for lit in core]
+
+def _rule_text(term: Tuple, config: AllocatorConfig) -> str:
+    if term[0] == 'cap':
+        return f"Max {config.max_games_per_pitch_per_day} games per day on {term[1]}"
+    if term[0] == 'closure':
+        return f"{term[1]} closed ({term[2]})"
+    if term[0] == 'resource':
+        _, venue, resource, kickoff = term
+        capacity = config.site_resources[venue][resource]['capacity']
+        return f"{resource.replace('_', ' ').capitalize()} at {venue} full at {kickoff} (capacity {capacity})"
+    if term[0] == 'link':
+        return f"Linked teams ({term[1]}) can't overlap at {term[2]}"
+    return term[2]
+
+def explain_unallocated(fixtures: Dict, slots_by_date: Dict, result: pd.DataFrame,
+                        calendar: AvailabilityCalendar = None, time_budget: float = EXPLAIN_BUDGET,
+                        config: AllocatorConfig = None) -> List[Dict]:
+    """
+    One explanation per unallocated fixture, within time_budget seconds:
+    {fixture_id, team, date, category, blocking_fixtures [{fixture_id, team,
+    time, pitch}], pitches, rules, summary}. slots_by_date is the full
+    (unpruned) slot list - closures come from the calendar.
+    """
+    config = CONFIG if config is None else config
+    deadline = time.perf_counter() + time_budget
+    placed = {} if result is None or result.empty else {
+        row.fixture_id: (row.time, row.pitch) for row in result[['fixture_id', 'time', 'pitch']].itertuples()
+    }
+    unallocated = {fid: f for fid, f in fixtures.items() if fid not in placed}
+
+    targets_by_date = {}
+    for fixture_id, f in unallocated.items():
+        targets_by_date.setdefault(f['fixture_date'], []).append(fixture_id)
+
+    explanations = []
+    for date in sorted(targets_by_date):
+        targets = sorted(targets_by_date[date])
+        if not slots_by_date.get(date):
+            for fixture_id in targets:
+                explanations.append(_explanation(fixture_id, fixtures[fixture_id], NO_DATE,
+                                                 summary="No slots scheduled on this date"))
+            continue
+
+        date_fixtures = {fid: f for fid, f in fixtures.items() if f['fixture_date'] == date}
+        kept = [fid for fid in date_fixtures if fid in placed]
+        model = _DateModel(date, date_fixtures, slots_by_date[date], calendar, targets, config)
+        # Fixtures with the same slots and rules (e.g. two U11 9v9 sides) share one conflict
+        conflicts = {}
+
+        for fixture_id in targets:
+            f = fixtures[fixture_id]
+            if time.perf_counter() >= deadline:
+                explanations.append(_explanation(fixture_id, f, UNEXPLAINED,
+                                                 summary="Not explained within the time budget"))
+                continue
+
+            signature = model.signature[fixture_id]
+            if signature not in conflicts:
+                conflicts[signature] = model.conflict(fixture_id, kept, deadline)
+            outcome, detail = conflicts[signature]
+            if outcome == MISSED:
+                slot_text = f" ({detail[0]} on {detail[1]})" if detail else ""
+                explanations.append(_explanation(
+                    fixture_id, f, MISSED,
+                    summary=f"A slot is free{slot_text} - re-run with a longer timeout"))
+                continue
+            if outcome == UNEXPLAINED:
+                explanations.append(_explanation(fixture_id, f, UNEXPLAINED,
+                                                 summary="Not explained within the time budget"))
+                continue
+
+            blocking = [{'fixture_id': fid, 'team': fixtures[fid]['team_name'],
+                         'time': placed[fid][0], 'pitch': placed[fid][1]}
+                        for kind, fid, *_ in detail if kind == 'fixture' and fid != fixture_id]
+            rules = sorted(_rule_text(term, config) for term in detail if term[0] != 'fixture')
+            pitches = sorted({pitch for _, pitch, _ in model.options.get(fixture_id, [])} |
+                             {term[1] for term in detail if term[0] in ('cap', 'closure')})
+            category = CAPACITY if blocking else RULES
+            summary = _summary(f, detail, blocking, pitches, len(model.options.get(fixture_id, [])), config)
+            explanations.append(_explanation(fixture_id, f, category, blocking, pitches, rules, summary))
+
+    return explanations
+
+def _summary(f: Dict, core: List[Tuple], blocking: List[Dict], pitches: List[str],
+             compatible: int, config: AllocatorConfig) -> str:
+    """One line built from the conflict's terms: linked teams' kickoffs,
+    fixtures holding the slots, or rules alone"""
+    people = sorted({term[1] for term in core if term[0] == 'link'})
+    if not people:
+        if blocking:
+            return f"{len(blocking)} fixture(s) hold the {compatible} compatible slot(s) on {', '.join(pitches)}"
+        return "Every compatible slot is ruled out"
+
+    # A linked team's fixture is in the core for its kickoff, not for holding a slot
+    linked = config.linked_teams.get(f['team_name'], frozenset())
+    partners = sorted({b['team'] for b in blocking if b['team'] in linked})
+    holders = [b for b in blocking if b['team'] not in linked]
+    link_text = f"Linked with {', '.join(partners) or 'another team'} ({'; '.join(people)})"
+    if holders or any(term[0] in ('cap', 'resource') for term in core):
+        held = f"{len(holders)} fixture(s) hold" if holders else "Pitch and site limits rule out"
+        return f"{held} some compatible slots on {', '.join(pitches)}; {link_text} – their kickoff overlaps the rest"
+    return f"{link_text} – their kickoff overlaps every compatible slot"
+
+def _explanation(fixture_id: str, f: Dict, category: str, blocking: List = None,
+                 pitches: List = None, rules: List = None, summary: str = '') -> Dict:
+    return {
+        'fixture_id': fixture_id,
+        'team': f['team_name'],
+        'date': f['fixture_date'],
+        'category': category,
+        'blocking_fixtures': blocking or [],
+        'pitches': pitches or [],
+        'rules': rules or [],
+        'summary': summary
+    }
+
+def explanations_frame(explanations: List[Dict]) -> pd.DataFrame:
+    """Explanations as a display table (one row per unallocated fixture)"""
+    columns = ['date', 'team', 'category', 'blocked_by', 'rules', 'summary']
+    rows = [{
+        'date': e['date'],
+        'team': e['team'],
+        'category': e['category'],
+        'blocked_by': ', '.join(f"{b['team']} ({b['time']}, {b['pitch']})" for b in e['blocking_fixtures']),
+        'rules': '; '.join(e['rules']),
+        'summary': e['summary']
+    } for e in explanations]
+    return pd.DataFrame(rows, columns=columns)
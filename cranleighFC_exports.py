@@ -0,0 +1,148 @@
+"""
+Cranleigh FC export pipeline
+Builds the CSV, Excel and HTML schedules for one allocation concurrently
+and memoises the byte buffers per allocation hash, so a page rerun or a
+second download never rebuilds a file that has already been generated
+"""
+
+import hashlib
+import io
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Tuple
+
+import pandas as pd
+
+from CranleighFC_Pitch_Allocation_PROD import (
+    CONFIG,
+    generate_excel_schedule,
+    render_html_schedule
+)
+
+# =====================================
+# 📦 Export Formats
+# =====================================
+EXPORT_FORMATS = {
+    'csv': {'extension': 'csv', 'mime': 'text/csv', 'label': '📄 Download CSV'},
+    'xlsx': {'extension': 'xlsx',
+             'mime': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+             'label': '📊 Download Excel'},
+    'html': {'extension': 'html', 'mime': 'text/html', 'label': '🌐 Download HTML'},
+}
+
+EXPORT_WORKERS = 3       # One thread per format is enough
+EXPORT_CACHE_SIZE = 32   # Allocations kept in memory (x formats)
+
+_export_pool = None
+_export_cache: "OrderedDict[Tuple[str, str], Future]" = OrderedDict()
+_export_timings: Dict[Tuple[str, str], float] = {}  # Build seconds per cached export
+_export_lock = threading.Lock()
+
+def allocation_hash(df: pd.DataFrame) -> str:
+    """Stable content hash of an allocation DataFrame (and the allocator
+    config, whose pitch list shapes the schedules)"""
+    digest = hashlib.sha256(CONFIG.fingerprint.encode('utf-8'))
+    digest.update('|'.join(map(str, df.columns)).encode('utf-8'))
+    if len(df) > 0:
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+def _build_csv(df: pd.DataFrame, fixtures: Dict) -> bytes:
+    return df.to_csv(index=False).encode('utf-8')
+
+def _build_excel(df: pd.DataFrame, fixtures: Dict) -> bytes:
+    buffer = io.BytesIO()
+    generate_excel_schedule(df, fixtures, buffer)
+    data = buffer.getvalue()
+    if not data:
+        # generate_excel_schedule returns early when openpyxl is missing
+        raise RuntimeError("Excel export unavailable - install openpyxl")
+    return data
+
+def _build_html(df: pd.DataFrame, fixtures: Dict) -> bytes:
+    return render_html_schedule(df, fixtures).encode('utf-8')
+
+_BUILDERS = {
+    'csv': _build_csv,
+    'xlsx': _build_excel,
+    'html': _build_html,
+}
+
+def _timed_build(key: str, fmt: str, df: pd.DataFrame, fixtures: Dict) -> bytes:
+    t0 = time.perf_counter()
+    data = _BUILDERS[fmt](df, fixtures)
+    _export_timings[(key, fmt)] = time.perf_counter() - t0
+    return data
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _export_pool
+    with _export_lock:
+        if _export_pool is None:
+            _export_pool = ThreadPoolExecutor(max_workers=EXPORT_WORKERS,
+                                              thread_name_prefix='export')
+        return _export_pool
+
+def submit_exports(df: pd.DataFrame, fixtures: Dict,
+                   formats: Iterable[str] = ('csv', 'xlsx', 'html')) -> Dict[str, Future]:
+    """
+    Start building the requested formats in the export thread pool.
+    Returns a future per format; formats already built (or in flight) for
+    the same allocation are shared rather than rebuilt.
+    """
+    return _submit(df, fixtures, formats)[1]
+
+def _submit(df: pd.DataFrame, fixtures: Dict, formats: Iterable[str]) -> Tuple[str, Dict[str, Future]]:
+    formats = list(formats)
+    unknown = [fmt for fmt in formats if fmt not in _BUILDERS]
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(unknown)}")
+
+    key = allocation_hash(df)
+    pool = _get_pool()
+    futures = {}
+
+    with _export_lock:
+        for fmt in formats:
+            cached = _export_cache.get((key, fmt))
+            # Failed builds are retried on the next request
+            if cached is not None and not (cached.done() and cached.exception()):
+                _export_cache.move_to_end((key, fmt))
+                futures[fmt] = cached
+                continue
+            future = pool.submit(_timed_build, key, fmt, df, fixtures)
+            _export_cache[(key, fmt)] = future
+            futures[fmt] = future
+
+        while len(_export_cache) > EXPORT_CACHE_SIZE * len(_BUILDERS):
+            evicted, _ = _export_cache.popitem(last=False)
+            _export_timings.pop(evicted, None)
+
+    return key, futures
+
+def export_allocation(df: pd.DataFrame, fixtures: Dict,
+                      formats: Iterable[str] = ('csv', 'xlsx', 'html'),
+                      report: Dict = None) -> Dict[str, bytes]:
+    """Build the requested formats concurrently and return their bytes
+    report: optional run report - receives export_<fmt> build times"""
+    key, futures = _submit(df, fixtures, formats)
+    exports = {fmt: future.result() for fmt, future in futures.items()}
+    if report is not None:
+        for fmt in exports:
+            # Memoised exports keep the time of their original build
+            report.setdefault('phases', {})[f'export_{fmt}'] = _export_timings.get((key, fmt), 0.0)
+    return exports
+
+def export_timings(key: str) -> Dict[str, float]:
+    """Build seconds of each format already exported for an allocation
+    (by allocation_hash), as export_<fmt> run report phases"""
+    with _export_lock:
+        return {f'export_{fmt}': seconds for (cached_key, fmt), seconds in _export_timings.items()
+                if cached_key == key}
+
+def clear_export_cache():
+    """Drop every memoised export"""
+    with _export_lock:
+        _export_cache.clear()
+        _export_timings.clear()
@@ -0,0 +1,109 @@
+"""
+Cranleigh FC data grids
+Paginated, filterable tables for the Streamlit app. Filtering, sorting and
+paging happen on the server: the browser only ever receives the current page,
+rendered by AG Grid (streamlit-aggrid, virtualised rows) or by
+st.dataframe when the component isn't installed. Each grid is a fragment,
+so changing a filter or page reruns just that grid. AG Grid's own column
+sort and filter are off - they would only reorder or hide the current page.
+"""
+
+import math
+from typing import Dict, List, Sequence
+
+import pandas as pd
+import streamlit as st
+
+try:
+    from st_aggrid import AgGrid, GridOptionsBuilder
+    AGGRID_AVAILABLE = True
+except ImportError:
+    AGGRID_AVAILABLE = False
+
+PAGE_SIZES = [25, 50, 100, 250]
+NO_SORT = "(file order)"
+GRID_HEIGHT = 420   # Pixels - AG Grid only draws the rows in view
+
+def filter_frame(df: pd.DataFrame, selections: Dict[str, Sequence]) -> pd.DataFrame:
+    """Rows matching every non-empty {column: allowed values} selection"""
+    mask = pd.Series(True, index=df.index)
+    for column, values in selections.items():
+        if values:
+            mask &= df[column].isin(values)
+    return df if mask.all() else df[mask]
+
+def sort_frame(df: pd.DataFrame, column: str = None, descending: bool = False) -> pd.DataFrame:
+    """Rows ordered by one column (stable, blanks last); unchanged without a column"""
+    if not column:
+        return df
+    return df.sort_values(column, ascending=not descending, kind='stable', na_position='last')
+
+def page_slice(df: pd.DataFrame, page: int, page_size: int) -> pd.DataFrame:
+    """One 1-based page of rows"""
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size]
+
+def _options(df: pd.DataFrame, column: str) -> List:
+    return sorted(df[column].dropna().unique().tolist())
+
+def _render_page(page: pd.DataFrame, key: str):
+    if not AGGRID_AVAILABLE:
+        st.dataframe(page, hide_index=True, width='stretch', height=GRID_HEIGHT)
+        return
+    builder = GridOptionsBuilder.from_dataframe(page)
+    # Sorting and filtering a page in the browser would be misleading - see paginated_grid
+    builder.configure_default_column(sortable=False, resizable=True, filter=False)
+    AgGrid(
+        page,
+        gridOptions=builder.build(),
+        height=GRID_HEIGHT,
+        key=key,
+        show_toolbar=False,
+        show_download_button=False
+    )
+
+@st.fragment
+def paginated_grid(df: pd.DataFrame, key: str, filters: Dict[str, str],
+                   columns: Sequence[str] = None, default_page_size: int = 50):
+    """
+    Filterable, paginated grid for a DataFrame.
+    filters: {label: column} - one multiselect per entry, applied server-side
+    columns: columns to display and sort by (default: all)
+    """
+    if df is None or df.empty:
+        st.info("No rows to show.")
+        return
+
+    filter_columns = st.columns(len(filters)) if filters else []
+    selections = {}
+    for col, (label, column) in zip(filter_columns, filters.items()):
+        with col:
+            selections[column] = st.multiselect(label, _options(df, column), key=f"{key}_{column}")
+
+    filtered = filter_frame(df, selections)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        sort_column = st.selectbox("Sort by", [NO_SORT] + list(columns or df.columns),
+                                   key=f"{key}_sort")
+    with col2:
+        descending = st.selectbox("Order", ["Ascending", "Descending"],
+                                  key=f"{key}_order") == "Descending"
+    filtered = sort_frame(filtered, None if sort_column == NO_SORT else sort_column, descending)
+
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES,
+                                 index=PAGE_SIZES.index(default_page_size), key=f"{key}_page_size")
+    pages = max(1, math.ceil(len(filtered) / page_size))
+    # The page lives in session state so a narrower filter can pull it back in range
+    page_key = f"{key}_page"
+    st.session_state[page_key] = min(st.session_state.get(page_key, 1), pages)
+    with col2:
+        page = st.number_input("Page", min_value=1, max_value=pages, step=1, key=page_key)
+    with col3:
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.caption(f"{len(filtered):,} of {len(df):,} rows · page {page} of {pages}")
+
+    page_rows = page_slice(filtered, page, page_size)
+    _render_page(page_rows[list(columns)] if columns else page_rows, f"{key}_grid")
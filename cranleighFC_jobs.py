@@ -0,0 +1,200 @@
+"""
+Cranleigh FC background job runner
+A bounded worker pool shared across Streamlit sessions: solves are queued,
+can be cancelled and are polled for status instead of blocking the page
+"""
+
+import inspect
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from CranleighFC_Pitch_Allocation_PROD import (
+    load_and_validate_fixtures,
+    solve_allocation
+)
+from cranleighFC_profiling import new_run_report
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+def solve_fixture_file(filepath, timeout: int = 30, num_workers: int = 8,
+                       stop_event: threading.Event = None):
+    """
+    Load, validate and solve one fixture file - the standard solve job.
+    Returns (result, fixtures, removed_duplicates, run_report).
+    """
+    report = new_run_report()
+    fixtures, slots_by_date, removed_duplicates = load_and_validate_fixtures(filepath, report=report)
+    result = solve_allocation(fixtures, slots_by_date, timeout=timeout,
+                              num_workers=num_workers, stop_event=stop_event, report=report)
+    return result, fixtures, removed_duplicates, report
+
+MIN_SOLVER_WORKERS = 4   # Fewer CP-SAT workers rarely prove optimality in time
+MAX_SOLVER_WORKERS = 8
+
+def default_solver_workers(max_jobs: int) -> int:
+    """Split the machine's cores between concurrently running solves"""
+    share = (os.cpu_count() or 1) // max(1, max_jobs)
+    return min(MAX_SOLVER_WORKERS, max(MIN_SOLVER_WORKERS, share))
+
+class JobRunner:
+    """
+    Runs jobs on a bounded thread pool. Jobs beyond max_workers wait in the
+    queue. Jobs submitted with the same key while one is queued, running or
+    finished successfully share that job rather than starting another; each
+    named subscriber (e.g. a Streamlit session) only detaches itself on
+    cancel, and the job stops once nobody is left waiting for it.
+    """
+
+    def __init__(self, max_workers: int = 2, history: int = 50):
+        self.max_workers = max_workers
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='solve-job')
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._by_key: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def submit(self, fn: Callable, *args, key: str = None, label: str = '',
+               subscriber: str = None, **kwargs) -> str:
+        """
+        Queue fn(*args, **kwargs) and return its job ID.
+        If fn accepts a stop_event argument, it is given one so that
+        cancel() can stop it while running.
+        subscriber: who is waiting for the job - see cancel()
+        """
+        with self._lock:
+            if key is not None and key in self._by_key:
+                existing = self._jobs.get(self._by_key[key])
+                # A cancelled job may still be RUNNING until its solver returns - start afresh
+                if (existing is not None and existing['state'] not in (FAILED, CANCELLED)
+                        and not existing['stop_event'].is_set()):
+                    if subscriber is not None:
+                        existing['subscribers'].add(subscriber)
+                    return existing['id']
+
+            job_id = f"job-{next(self._ids)}"
+            job = {
+                'id': job_id,
+                'key': key,
+                'label': label,
+                'state': QUEUED,
+                'submitted': time.time(),
+                'started': None,
+                'finished': None,
+                'error': None,
+                'stop_event': threading.Event(),
+                'subscribers': {subscriber} if subscriber is not None else set(),
+                'future': None
+            }
+            if 'stop_event' in inspect.signature(fn).parameters:
+                kwargs['stop_event'] = job['stop_event']
+
+            self._jobs[job_id] = job
+            if key is not None:
+                self._by_key[key] = job_id
+            job['future'] = self._executor.submit(self._run, job, fn, args, kwargs)
+            self._trim()
+            return job_id
+
+    def _run(self, job: Dict, fn: Callable, args, kwargs):
+        with self._lock:
+            if job['stop_event'].is_set():
+                job['state'] = CANCELLED
+                job['finished'] = time.time()
+                return None
+            job['state'] = RUNNING
+            job['started'] = time.time()
+        try:
+            value = fn(*args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                job['state'] = FAILED
+                job['error'] = f"{type(e).__name__}: {e}"
+                job['finished'] = time.time()
+            raise
+        with self._lock:
+            job['state'] = CANCELLED if job['stop_event'].is_set() else DONE
+            job['finished'] = time.time()
+        return value
+
+    def _trim(self):
+        """Forget the oldest finished jobs beyond the history limit"""
+        finished = [jid for jid, job in self._jobs.items() if job['state'] in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            job = self._jobs.pop(job_id)
+            if job['key'] is not None and self._by_key.get(job['key']) == job_id:
+                del self._by_key[job['key']]
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """Snapshot of a job's state, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            queued = [jid for jid, j in self._jobs.items() if j['state'] == QUEUED]
+            now = time.time()
+            return {
+                'id': job['id'],
+                'label': job['label'],
+                'state': job['state'],
+                'queue_position': queued.index(job_id) + 1 if job_id in queued else 0,
+                'waiting': (job['started'] or job['finished'] or now) - job['submitted'],
+                'elapsed': ((job['finished'] or now) - job['started']) if job['started'] else 0.0,
+                'subscribers': len(job['subscribers']),
+                'error': job['error']
+            }
+
+    def result(self, job_id: str, timeout: float = None):
+        """Return the job's value (waits if not finished)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(f"Unknown job '{job_id}'")
+        return job['future'].result(timeout=timeout)
+
+    def cancel(self, job_id: str, subscriber: str = None) -> bool:
+        """
+        Cancel a queued job, or ask a running one to stop. With a subscriber,
+        only that subscriber is detached - the job carries on while anyone
+        else still waits for it. Returns True if the subscriber was detached
+        or the job was asked to stop.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['state'] in FINISHED_STATES:
+                return False
+            if subscriber is not None:
+                job['subscribers'].discard(subscriber)
+                if job['subscribers']:
+                    return True
+            job['stop_event'].set()
+            if job['future'].cancel():
+                job['state'] = CANCELLED
+                job['finished'] = time.time()
+            return True
+
+    def jobs(self) -> List[Dict]:
+        """Status of every job the runner still remembers"""
+        with self._lock:
+            job_ids = list(self._jobs.keys())
+        return [s for s in (self.status(jid) for jid in job_ids) if s is not None]
+
+    def shutdown(self, cancel_running: bool = True):
+        """Stop accepting jobs; optionally stop the ones in progress"""
+        if cancel_running:
+            for job_id in list(self._jobs.keys()):
+                self.cancel(job_id)
+        self._executor.shutdown(wait=False, cancel_futures=True)
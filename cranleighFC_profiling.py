@@ -0,0 +1,234 @@
+"""
+Cranleigh FC allocator profiling
+Structured run reports: wall time per phase (load, dedup, slot generation,
+variable creation, constraint build, solve, extraction, reporting, each
+export) plus CP-SAT model and search statistics.
+
+Opt-in deep profiling: set CRANLEIGH_PROFILE_DIR (or pass --profile-dir to
+the CLI / service) and every @profiled phase writes cProfile stats and its
+top tracemalloc allocations to a run directory under it - no code edits.
+"""
+
+import cProfile
+import functools
+import io
+import itertools
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List
+
+import pandas as pd
+
+PROFILE_ENV = 'CRANLEIGH_PROFILE_DIR'
+PROFILE_TOP_FUNCTIONS = 40    # Functions listed in each text report
+PROFILE_TOP_ALLOCATIONS = 25  # tracemalloc lines listed in each text report
+
+def new_run_report() -> Dict:
+    """Empty run report - pass it to the allocator functions to fill in"""
+    return {'phases': {}, 'solver': {}}
+
+class PhaseClock:
+    """
+    Records consecutive phases into a run report: each lap() books the time
+    since the previous lap (or construction) under the given phase name.
+    With report=None every call is a no-op.
+    """
+
+    def __init__(self, report: Dict = None):
+        self.report = report
+        self.last = time.perf_counter()
+
+    def lap(self, phase: str):
+        now = time.perf_counter()
+        if self.report is not None:
+            phases = self.report.setdefault('phases', {})
+            phases[phase] = phases.get(phase, 0.0) + (now - self.last)
+        self.last = now
+
+def record_phase(report: Dict, phase: str, seconds: float):
+    """Add a separately measured phase (e.g. an export) to a run report"""
+    if report is not None:
+        phases = report.setdefault('phases', {})
+        phases[phase] = phases.get(phase, 0.0) + seconds
+
+def record_solver_statistics(report: Dict, solver, model, status):
+    """Capture CP-SAT model size and search statistics after a solve"""
+    if report is None:
+        return
+    proto = model.Proto()
+    feasible = solver.StatusName(status) in ('OPTIMAL', 'FEASIBLE')
+    report['solver'] = {
+        'status': solver.StatusName(status),
+        'variables': len(proto.variables),
+        'constraints': len(proto.constraints),
+        'branches': solver.NumBranches(),
+        'conflicts': solver.NumConflicts(),
+        'wall_time': solver.WallTime(),
+        'objective': solver.ObjectiveValue() if feasible else None,
+        'bound': solver.BestObjectiveBound() if feasible else None,
+        'workers': solver.parameters.num_search_workers
+    }
+
+def record_presolved_objective(report: Dict, objective: float):
+    """
+    Add the objective of parts solved without a search (small dates) to the
+    run's solver statistics - or record a search-free solve if there was none
+    """
+    if report is None:
+        return
+    stats = report.get('solver')
+    if not stats:
+        report['solver'] = {
+            'status': 'OPTIMAL',
+            'variables': 0,
+            'constraints': 0,
+            'branches': 0,
+            'conflicts': 0,
+            'wall_time': 0.0,
+            'objective': objective,
+            'bound': objective,
+            'workers': 0
+        }
+        return
+    for key in ('objective', 'bound'):
+        if stats.get(key) is not None:
+            stats[key] += objective
+
+def merge_solver_statistics(statistics: List[Dict]) -> Dict:
+    """Combine the solver statistics of independently solved subproblems"""
+    statistics = [stats for stats in statistics if stats]
+    if not statistics:
+        return {}
+    statuses = {stats['status'] for stats in statistics}
+    if statuses == {'OPTIMAL'}:
+        status = 'OPTIMAL'
+    elif statuses <= {'OPTIMAL', 'FEASIBLE'}:
+        status = 'FEASIBLE'
+    else:
+        status = sorted(statuses - {'OPTIMAL', 'FEASIBLE'})[0]
+    merged = {'status': status}
+    for key in ('variables', 'constraints', 'branches', 'conflicts', 'wall_time'):
+        merged[key] = sum(stats[key] for stats in statistics)
+    for key in ('objective', 'bound'):
+        values = [stats[key] for stats in statistics]
+        merged[key] = None if None in values else sum(values)
+    merged['workers'] = max(stats['workers'] for stats in statistics)
+    merged['subproblems'] = len(statistics)
+    return merged
+
+def phases_frame(report: Dict) -> pd.DataFrame:
+    """Phase timings as a DataFrame with each phase's share of the total"""
+    phases = (report or {}).get('phases', {})
+    df = pd.DataFrame({'phase': list(phases), 'seconds': list(phases.values())})
+    total = df['seconds'].sum()
+    df['share'] = df['seconds'] / total if total > 0 else 0.0
+    return df
+
+def rounded_report(report: Dict, digits: int = 4) -> Dict:
+    """JSON-friendly copy of a run report with rounded timings"""
+    report = report or {}
+    return {
+        'phases': {phase: round(seconds, digits) for phase, seconds in report.get('phases', {}).items()},
+        'solver': {key: round(value, digits) if isinstance(value, float) else value
+                   for key, value in report.get('solver', {}).items()}
+    }
+
+# =====================================
+# 🔬 Opt-in cProfile / tracemalloc Hooks
+# =====================================
+_profile_lock = threading.Lock()
+_profile_state = {'run_dir': None, 'base': None, 'tracers': 0}
+_profile_sequence = itertools.count(1)
+_profile_local = threading.local()
+
+def enable_profiling(directory: str):
+    """Turn profiling on for this process and any worker processes it starts"""
+    os.environ[PROFILE_ENV] = os.path.abspath(directory)
+
+def profile_run_dir() -> str:
+    """This process's run directory, created on first use (None = profiling off)"""
+    base = os.environ.get(PROFILE_ENV)
+    if not base:
+        return None
+    with _profile_lock:
+        if _profile_state['base'] != base:
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+            run_dir = os.path.join(base, f"run-{stamp}-{os.getpid()}")
+            os.makedirs(run_dir, exist_ok=True)
+            _profile_state.update(base=base, run_dir=run_dir)
+        return _profile_state['run_dir']
+
+def _start_tracing():
+    # tracemalloc is process-wide: reference count concurrent phases
+    with _profile_lock:
+        if _profile_state['tracers'] == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _profile_state['tracers'] += 1
+
+def _stop_tracing():
+    with _profile_lock:
+        _profile_state['tracers'] -= 1
+        if _profile_state['tracers'] == 0:
+            tracemalloc.stop()
+
+def _write_profile(run_dir: str, phase: str, profiler, before, after, peak: int, seconds: float):
+    stem = os.path.join(run_dir, f"{next(_profile_sequence):03d}_{phase}")
+    lines = [f"Phase: {phase}", f"Wall time: {seconds:.3f}s",
+             f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB", ""]
+
+    if profiler is not None:
+        profiler.dump_stats(stem + '.prof')
+        buffer = io.StringIO()
+        stats = pstats.Stats(profiler, stream=buffer)
+        stats.sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+        lines += ["=== cProfile (cumulative) ===", buffer.getvalue()]
+    else:
+        lines += ["=== cProfile skipped - another profiler was active ===", ""]
+
+    lines.append(f"=== Top {PROFILE_TOP_ALLOCATIONS} allocations (net growth by line) ===")
+    for stat in after.compare_to(before, 'lineno')[:PROFILE_TOP_ALLOCATIONS]:
+        lines.append(str(stat))
+
+    with open(stem + '.txt', 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+def profiled(phase: str):
+    """
+    Decorator: when CRANLEIGH_PROFILE_DIR is set, profile each call with
+    cProfile and tracemalloc and write <seq>_<phase>.prof/.txt to the run
+    directory. Otherwise (and for nested profiled calls) it is a plain call.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            run_dir = profile_run_dir()
+            if run_dir is None or getattr(_profile_local, 'active', False):
+                return fn(*args, **kwargs)
+
+            _profile_local.active = True
+            _start_tracing()
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                profiler = None
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - t0
+                if profiler is not None:
+                    profiler.disable()
+                peak = tracemalloc.get_traced_memory()[1]
+                after = tracemalloc.take_snapshot()
+                _stop_tracing()
+                _profile_local.active = False
+                _write_profile(run_dir, phase, profiler, before, after, peak, seconds)
+        return wrapper
+    return decorator
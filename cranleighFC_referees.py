@@ -0,0 +1,320 @@
+"""
+Cranleigh FC referee assignment
+A second stage after pitch allocation: given the allocation DataFrame (or
+its CSV export) and a pool of referees, assign at most one referee to each
+allocated fixture without touching the pitch allocation.
+
+config/referees.json:
+    {"travel_minutes": {"snoxhall": {"ccc": 10, "glebelands": 15},
+                        "ccc": {"glebelands": 15}},
+     "referees": {
+        "Referee A": {"qualifications": ["11v11", "9v9"], "max_games": 2,
+                      "max_travel_minutes": 15,
+                      "available": [{"from": "2025-09-01", "to": "2026-05-31",
+                                     "weekdays": ["Sat"], "start": "09:00", "end": "13:00"}],
+                      "unavailable": [{"from": "2025-12-20", "to": "2026-01-04"}]},
+        "Referee B": {"qualifications": ["U9", "U10", "7v7"]}}}
+
+Qualifications name formats and/or age groups. "available" entries (default:
+always) and "unavailable" entries take the availability calendar's from/to/
+weekdays/start/end form. A referee is busy from kickoff for the format's
+match_minutes, and two games at different venues also need the travel time
+between them - venue pairs with no travel time listed can't be combined,
+nor can hops longer than the referee's max_travel_minutes. max_games is per
+date (default 2).
+
+Dates never interact, so each date is one small CP-SAT model (the same
+per-date decomposition as the parallel pitch solve), optionally spread over
+a process pool. The objective covers as many fixtures as possible, older
+age groups first, then spreads games across referees.
+
+    python cranleighFC_referees.py cranleigh_home_fixtures_allocations.csv
+    python cranleighFC_referees.py allocations.csv --pool config/referees.json -o referees.csv
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date as Date
+from typing import Dict, List, Tuple
+
+import pandas as pd
+from ortools.sat.python import cp_model
+
+with contextlib.redirect_stdout(sys.stderr):
+    from CranleighFC_Pitch_Allocation_PROD import CONFIG
+    from cranleighFC_availability import WEEKDAYS, format_minutes
+    from cranleighFC_config import AllocatorConfig
+
+DEFAULT_POOL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'referees.json')
+DEFAULT_MAX_GAMES = 2           # Per referee per date
+DATE_TIMEOUT = 5                # Seconds per date model
+
+ASSIGNMENT_WEIGHT = 1000        # Per refereed fixture - dominates everything else
+AGE_PRIORITY_WEIGHT = 10        # x age priority - older age groups get referees first
+EXTRA_GAME_PENALTY = 5          # Per game beyond a referee's first on a date - spreads the load
+
+def _minutes(time: str) -> int:
+    hours, minutes = time.split(':')[:2]
+    return int(hours) * 60 + int(minutes)
+
+# =====================================
+# 📂 Referee Pool
+# =====================================
+def _check_entries(name: str, key: str, entries, errors: List[str]):
+    if not isinstance(entries, list):
+        errors.append(f"Referee '{name}': '{key}' must be a list")
+        return
+    for entry in entries:
+        try:
+            Date.fromisoformat(entry['from'])
+            if 'to' in entry:
+                Date.fromisoformat(entry['to'])
+            for time_key in ('start', 'end'):
+                if time_key in entry:
+                    _minutes(entry[time_key])
+        except (KeyError, ValueError, TypeError, AttributeError):
+            errors.append(f"Referee '{name}': bad '{key}' entry {entry} (from/to YYYY-MM-DD, start/end HH:MM)")
+            continue
+        errors.extend(f"Referee '{name}': unknown weekday '{day}'"
+                      for day in entry.get('weekdays', []) if day not in WEEKDAYS)
+
+def validate_referee_pool(document: Dict, config: AllocatorConfig = None) -> Dict:
+    """
+    Check a referee pool document against the allocator config (formats,
+    age groups, venues) and return it with travel times made symmetric.
+    """
+    config = CONFIG if config is None else config
+    errors = []
+    venues = {info['location'] for info in config.pitches.values()}
+    known = set(config.kickoff_times) | set(config.age_group_formats)
+
+    travel = {}
+    for origin, destinations in document.get('travel_minutes', {}).items():
+        for destination, minutes in destinations.items():
+            errors.extend(f"travel_minutes: unknown venue '{venue}'"
+                          for venue in (origin, destination) if venue not in venues)
+            if not isinstance(minutes, int) or minutes < 0:
+                errors.append(f"travel_minutes: {origin} -> {destination} must be a non-negative integer")
+            travel[(origin, destination)] = travel[(destination, origin)] = minutes
+
+    referees = document.get('referees', {})
+    if not referees:
+        errors.append("No referees in the pool")
+    for name, spec in referees.items():
+        qualifications = spec.get('qualifications', [])
+        if not qualifications:
+            errors.append(f"Referee '{name}' has no qualifications")
+        errors.extend(f"Referee '{name}': unknown format or age group '{q}'"
+                      for q in qualifications if q not in known)
+        for key in ('max_games', 'max_travel_minutes'):
+            if key in spec and (not isinstance(spec[key], int) or spec[key] < 0):
+                errors.append(f"Referee '{name}': {key} must be a non-negative integer")
+        for key in ('available', 'unavailable'):
+            _check_entries(name, key, spec.get(key, []), errors)
+
+    if errors:
+        print("⚠️ Referee pool errors found:")
+        for err in errors:
+            print(f"  - {err}")
+        raise ValueError("Fix referee pool errors before proceeding")
+    return {'travel': travel, 'referees': referees}
+
+def load_referee_pool(path: str = DEFAULT_POOL_FILE, config: AllocatorConfig = None) -> Dict:
+    with open(path, encoding='utf-8') as f:
+        return validate_referee_pool(json.load(f), config)
+
+def _entry_matches(entry: Dict, date: str, start: int, end: int, within: bool) -> bool:
+    """Does an availability entry cover (within=True) or overlap [start, end) on date?"""
+    if not entry['from'] <= date <= entry.get('to', entry['from']):   # No 'to': that day only
+        return False
+    if 'weekdays' in entry and WEEKDAYS[Date.fromisoformat(date).weekday()] not in entry['weekdays']:
+        return False
+    window_start = _minutes(entry['start']) if 'start' in entry else 0
+    window_end = _minutes(entry['end']) if 'end' in entry else 24 * 60
+    if within:
+        return window_start <= start and end <= window_end
+    return start < window_end and window_start < end
+
+def referee_available(spec: Dict, date: str, start: int, end: int) -> bool:
+    """Is a referee free for a game occupying [start, end) minutes on date?"""
+    if 'available' in spec and not any(_entry_matches(entry, date, start, end, True)
+                                       for entry in spec['available']):
+        return False
+    return not any(_entry_matches(entry, date, start, end, False) for entry in spec.get('unavailable', []))
+
+def _qualified(spec: Dict, game: Dict) -> bool:
+    return game['format'] in spec['qualifications'] or game['age_group'] in spec['qualifications']
+
+# =====================================
+# 🧮 Per-date Assignment
+# =====================================
+def _games(allocation: pd.DataFrame, config: AllocatorConfig) -> Dict[str, List[Dict]]:
+    """Allocated fixtures by date, each with its venue, format and busy minutes"""
+    games_by_date = {}
+    minutes = format_minutes(config)
+    for row in allocation.itertuples(index=False):
+        pitch = config.pitches[row.pitch]
+        start = _minutes(row.time)
+        games_by_date.setdefault(row.date, []).append({
+            'fixture_id': row.fixture_id,
+            'time': row.time,
+            'venue': pitch['location'],
+            'format': pitch['format'],
+            'age_group': row.age_group,
+            'start': start,
+            'end': start + minutes[pitch['format']]
+        })
+    return games_by_date
+
+def _compatible(first: Dict, second: Dict, travel: Dict, max_travel: int) -> bool:
+    """Can one referee take both games (in either order) on the same date?"""
+    if first['venue'] == second['venue']:
+        gap = 0
+    else:
+        gap = travel.get((first['venue'], second['venue']))
+        if gap is None or (max_travel is not None and gap > max_travel):
+            return False
+    return first['end'] + gap <= second['start'] or second['end'] + gap <= first['start']
+
+def solve_referee_date(date: str, games: List[Dict], pool: Dict, timeout: int = DATE_TIMEOUT,
+                       config: AllocatorConfig = None) -> Tuple[Dict[str, str], str]:
+    """
+    Assign referees to one date's games. Games at the same kickoff share one
+    at-most-one per referee; only games at different kickoffs need a
+    pairwise travel/overlap check. Returns ({fixture_id: referee}, status).
+    """
+    config = CONFIG if config is None else config
+    model = cp_model.CpModel()
+    by_game = {}      # game index -> [(referee, var)]
+    terms = []        # (weight, var)
+    extra_games = []
+
+    for name, spec in pool['referees'].items():
+        options = [i for i, game in enumerate(games)
+                   if _qualified(spec, game) and referee_available(spec, date, game['start'], game['end'])]
+        if not options:
+            continue
+        ref_vars = {i: model.NewBoolVar(f'{name}_{games[i]["fixture_id"]}') for i in options}
+        for i, var in ref_vars.items():
+            by_game.setdefault(i, []).append((name, var))
+            terms.append((ASSIGNMENT_WEIGHT
+                          + AGE_PRIORITY_WEIGHT * config.age_priority.get(games[i]['age_group'], 0), var))
+
+        by_kickoff = {}
+        for i in options:
+            by_kickoff.setdefault(games[i]['time'], []).append(ref_vars[i])
+        for kickoff_vars in by_kickoff.values():
+            if len(kickoff_vars) > 1:
+                model.AddAtMostOne(kickoff_vars)
+        max_travel = spec.get('max_travel_minutes')
+        for a, i in enumerate(options):
+            for j in options[a + 1:]:
+                if games[i]['time'] != games[j]['time'] and not _compatible(games[i], games[j],
+                                                                            pool['travel'], max_travel):
+                    model.AddBoolOr([ref_vars[i].Not(), ref_vars[j].Not()])
+
+        total = sum(ref_vars.values())
+        model.Add(total <= spec.get('max_games', DEFAULT_MAX_GAMES))
+        if len(options) > 1:
+            extra = model.NewIntVar(0, len(options), f'extra_{name}')
+            model.Add(extra >= total - 1)
+            extra_games.append(extra)
+
+    if not by_game:
+        return {}, 'NO_CANDIDATES'
+    for game_vars in by_game.values():
+        if len(game_vars) > 1:
+            model.AddAtMostOne([var for _, var in game_vars])
+    model.Maximize(cp_model.LinearExpr.WeightedSum([var for _, var in terms], [w for w, _ in terms])
+                   - EXTRA_GAME_PENALTY * sum(extra_games))
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = timeout
+    solver.parameters.num_search_workers = 1   # Tiny models - one worker per date
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return {}, solver.StatusName(status)
+    assigned = {games[i]['fixture_id']: name
+                for i, game_vars in by_game.items() for name, var in game_vars if solver.Value(var)}
+    return assigned, solver.StatusName(status)
+
+def _solve_dates(parts: List[Tuple[str, List[Dict]]], pool: Dict, timeout: int,
+                 config: AllocatorConfig) -> List[Tuple[str, Dict, str]]:
+    """Process pool task: a batch of dates"""
+    return [(date, *solve_referee_date(date, games, pool, timeout, config)) for date, games in parts]
+
+def assign_referees(allocation: pd.DataFrame, pool: Dict, timeout: int = DATE_TIMEOUT,
+                    max_processes: int = 1, config: AllocatorConfig = None) -> pd.DataFrame:
+    """
+    The allocation with a 'referee' column (None where no referee fits).
+    pool: as returned by load_referee_pool. Each date is solved on its own;
+    max_processes > 1 spreads the dates over a process pool.
+    """
+    config = CONFIG if config is None else config
+    if allocation is None or len(allocation) == 0:
+        return allocation
+    started = time.perf_counter()
+    parts = sorted(_games(allocation, config).items())
+    processes = max(1, min(max_processes or os.cpu_count() or 1, len(parts)))
+
+    if processes == 1:
+        outcomes = _solve_dates(parts, pool, timeout, config)
+    else:
+        # One batch per process - each date's model solves in milliseconds
+        batches = [parts[i::processes] for i in range(processes)]
+        with ProcessPoolExecutor(max_workers=processes,
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            outcomes = [outcome for batch in executor.map(_solve_dates, batches, [pool] * processes,
+                                                          [timeout] * processes, [config] * processes)
+                        for outcome in batch]
+
+    assigned = {}
+    for date, date_assigned, status in outcomes:
+        if status not in ('OPTIMAL', 'FEASIBLE', 'NO_CANDIDATES'):
+            print(f"  ⚠️ {date}: referee model {status}")
+        assigned.update(date_assigned)
+    result = allocation.copy()
+    result['referee'] = result['fixture_id'].map(assigned)
+    print(f"\n🧑‍⚖️ Referees assigned to {len(assigned)}/{len(result)} fixtures across "
+          f"{len(parts)} date(s) in {time.perf_counter() - started:.2f}s")
+    return result
+
+def referee_summary(assigned: pd.DataFrame) -> pd.DataFrame:
+    """Games and match days per referee, busiest first"""
+    refereed = assigned.dropna(subset=['referee'])
+    summary = refereed.groupby('referee').agg(games=('fixture_id', 'size'), dates=('date', 'nunique'))
+    return summary.sort_values(['games', 'dates'], ascending=False)
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Assign referees to an existing pitch allocation',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('allocation', help='Allocation file (CSV export)')
+    parser.add_argument('--pool', default=DEFAULT_POOL_FILE, help='Referee pool (JSON)')
+    parser.add_argument('-o', '--output', help='Output CSV (default: <allocation>_referees.csv)')
+    parser.add_argument('--timeout', type=int, default=DATE_TIMEOUT, help='CP-SAT time limit per date')
+    parser.add_argument('--processes', type=int, default=1, help='Processes to spread dates over')
+    args = parser.parse_args(argv)
+
+    pool = load_referee_pool(args.pool)
+    allocation = pd.read_csv(args.allocation, dtype={'fixture_id': str, 'date': str, 'time': str})
+    result = assign_referees(allocation, pool, timeout=args.timeout, max_processes=args.processes)
+    output = args.output or f"{os.path.splitext(args.allocation)[0]}_referees.csv"
+    result.to_csv(output, index=False)
+    print(referee_summary(result).to_string())
+    unassigned = result['referee'].isna().sum()
+    if unassigned:
+        print(f"\n⚠️ {unassigned} fixture(s) without a referee")
+    print(f"\n✅ Written to {output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Cranleigh FC allocator regression harness
+Solves a fixed set of recorded fixture files with a fixed seed and compares
+the objective and allocation metrics - allocated count, time matches,
+back-to-back main pitch use, Glebelands usage - plus wall time against the
+golden values in regression/golden.json. Wall times are recorded relative to
+a fixed calibration solve timed on the same machine, so golden times taken
+on a fast laptop still hold on a slow CI runner.
+
+Run before merging any change to the weights or the model encoding:
+    python cranleighFC_regression.py                 # check every case
+    python cranleighFC_regression.py --case busy     # one case
+    python cranleighFC_regression.py --update        # accept current results
+
+Exit status is 1 when any case loses objective or allocated fixtures, or
+exceeds its time tolerance. Multi-worker CP-SAT is not deterministic even
+with a fixed seed: equally optimal allocations can differ in time matches,
+back-to-back use and Glebelands usage, so those changes are reported, not
+failed.
+Set CRANLEIGH_REGRESSION_TIME_TOLERANCE / CRANLEIGH_REGRESSION_TIME_ALLOWANCE
+to loosen the time check on noisy machines.
+
+Golden updates belong in their own commit, so reviewers can see which change
+moved them.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+from ortools.sat.python import cp_model
+
+with contextlib.redirect_stdout(sys.stderr):
+    from CranleighFC_Pitch_Allocation_PROD import (
+        CONFIG,
+        load_and_validate_fixtures,
+        solve_allocation,
+        summarise_allocation
+    )
+    from cranleighFC_profiling import new_run_report
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_FILE = os.path.join(ROOT, 'regression', 'golden.json')
+
+# Recorded inputs - paths relative to the repository root
+CASES = {
+    'cranleigh': 'cranleigh_home_fixtures.csv',
+    'light': os.path.join('regression', 'synthetic_light.csv'),
+    'busy': os.path.join('regression', 'synthetic_busy.csv'),
+}
+
+SEED = 0
+SOLVER_WORKERS = 8
+TIMEOUT = 60
+
+# Wall time may grow by this fraction plus a fixed allowance (seconds) for machine noise
+TIME_TOLERANCE = float(os.environ.get('CRANLEIGH_REGRESSION_TIME_TOLERANCE', 0.5))
+TIME_ALLOWANCE = float(os.environ.get('CRANLEIGH_REGRESSION_TIME_ALLOWANCE', 1.0))
+
+# Calibration: a fixed single-worker CP-SAT assignment problem
+CALIBRATION_SIZE = 25
+CALIBRATION_REPEAT = 5
+
+# Gated metrics (higher is better) - the same for every optimal allocation
+HIGHER_IS_BETTER = ['objective', 'allocated']
+# Tie-breaks between equally optimal allocations - reported when they move
+REPORTED_METRICS = ['time_matches', 'back_to_back', 'glebelands_usage']
+
+def calibration_seconds(repeat: int = CALIBRATION_REPEAT) -> float:
+    """Best time of a fixed solve that doesn't touch the allocator - how fast
+    this machine is right now"""
+    best = None
+    for _ in range(repeat):
+        rng = random.Random(SEED)
+        t0 = time.perf_counter()
+        model = cp_model.CpModel()
+        x = {(i, j): model.NewBoolVar(f'x_{i}_{j}')
+             for i in range(CALIBRATION_SIZE) for j in range(CALIBRATION_SIZE)}
+        for i in range(CALIBRATION_SIZE):
+            model.AddExactlyOne(x[i, j] for j in range(CALIBRATION_SIZE))
+            model.AddExactlyOne(x[j, i] for j in range(CALIBRATION_SIZE))
+        model.Minimize(sum(rng.randint(1, 100) * var for var in x.values()))
+        solver = cp_model.CpSolver()
+        solver.parameters.num_workers = 1
+        solver.parameters.random_seed = SEED
+        solver.Solve(model)
+        seconds = time.perf_counter() - t0
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+def run_case(name: str, repeat: int = 1, calibration: float = None) -> Dict:
+    """Solve one recorded case; wall time is the best of `repeat` runs
+    calibration: calibration_seconds() on this machine, for relative_time"""
+    path = os.path.join(ROOT, CASES[name])
+    best = None
+    for _ in range(repeat):
+        report = new_run_report()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            t0 = time.perf_counter()
+            fixtures, slots_by_date, _ = load_and_validate_fixtures(path, report=report)
+            result = solve_allocation(fixtures, slots_by_date, timeout=TIMEOUT,
+                                      num_workers=SOLVER_WORKERS, random_seed=SEED, report=report)
+            wall_time = time.perf_counter() - t0
+        if best is None or wall_time < best['wall_time']:
+            summary = summarise_allocation(result, fixtures)
+            best = {
+                'objective': report['solver'].get('objective'),
+                'status': report['solver'].get('status'),
+                'allocated': summary['allocated'],
+                'time_matches': summary['time_matches'],
+                'back_to_back': summary['back_to_back'],
+                'glebelands_usage': summary['glebelands_usage'],
+                'wall_time': round(wall_time, 3),
+                'relative_time': round(wall_time / calibration, 2) if calibration else None,
+                'config': CONFIG.short_fingerprint
+            }
+    return best
+
+def compare(measured: Dict, golden: Dict, calibration: float = None) -> List[str]:
+    """Regressions of one case against its golden record (empty = pass)
+    calibration: this machine's calibration_seconds() - the golden
+    relative_time is scaled by it; without one, golden wall_time is used"""
+    failures = []
+    for metric in HIGHER_IS_BETTER:
+        if (measured[metric] or 0) < golden[metric]:
+            failures.append(f"{metric} dropped {golden[metric]} -> {measured[metric]}")
+    expected = golden['wall_time']
+    if calibration and golden.get('relative_time'):
+        expected = golden['relative_time'] * calibration
+    limit = expected * (1 + TIME_TOLERANCE) + TIME_ALLOWANCE
+    if measured['wall_time'] > limit:
+        failures.append(f"wall time {measured['wall_time']:.2f}s exceeds {limit:.2f}s "
+                        f"(expected {expected:.2f}s on this machine)")
+    return failures
+
+def drift(measured: Dict, golden: Dict) -> List[str]:
+    """Tie-break metrics that differ from the golden record (informational)"""
+    return [f"{metric} {golden[metric]} -> {measured[metric]}"
+            for metric in REPORTED_METRICS if measured[metric] != golden[metric]]
+
+def load_golden() -> Dict:
+    if not os.path.exists(GOLDEN_FILE):
+        return {}
+    with open(GOLDEN_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+def save_golden(golden: Dict):
+    with open(GOLDEN_FILE, 'w', encoding='utf-8') as f:
+        json.dump(golden, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Check allocation quality and speed against golden results',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--case', nargs='+', choices=list(CASES), default=list(CASES),
+                        help='Cases to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Solves per case; the fastest wall time is used')
+    parser.add_argument('--update', action='store_true',
+                        help='Record the current results as the new golden values')
+    args = parser.parse_args(argv)
+
+    golden = load_golden()
+    failed = False
+    calibration = calibration_seconds()
+    print(f"⏱️ Calibration solve: {calibration:.3f}s")
+
+    print(f"{'case':<12}{'objective':>14}{'alloc':>8}{'time':>7}{'b2b':>6}{'glebe':>7}"
+          f"{'wall':>9}  result")
+    for name in args.case:
+        measured = run_case(name, args.repeat, calibration)
+        if args.update:
+            golden[name] = measured
+            verdict = 'updated'
+        elif name not in golden:
+            verdict = 'NO GOLDEN - run with --update'
+            failed = True
+        else:
+            failures = compare(measured, golden[name], calibration)
+            verdict = 'ok' if not failures else 'FAIL: ' + '; '.join(failures)
+            changed = drift(measured, golden[name])
+            if changed:
+                verdict += f" (tie-breaks: {', '.join(changed)})"
+            if golden[name].get('config') != measured['config']:
+                # Weights/rules changed since recording - review, then --update
+                verdict += f" (config {golden[name].get('config')} -> {measured['config']})"
+            failed = failed or bool(failures)
+        print(f"{name:<12}{measured['objective'] or 0:>14,.0f}{measured['allocated']:>8}"
+              f"{measured['time_matches']:>7}{measured['back_to_back']:>6}"
+              f"{measured['glebelands_usage']:>7}{measured['wall_time']:>8.2f}s  {verdict}",
+              flush=True)
+
+    if args.update:
+        save_golden(golden)
+        print(f"✅ Golden results written to {os.path.relpath(GOLDEN_FILE, ROOT)}")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""
+Cranleigh FC what-if scenarios
+Committee questions ("what if we lose P2 for reseeding?", "what if
+Glebelands is unavailable in January?") answered by solving the same
+fixtures under several config deltas side by side. Each scenario changes
+the base configuration's pitches, venues, objective weights and/or
+availability:
+
+    {"scenarios": [
+        {"name": "P2 reseeded", "pitches": {"P2 11v11": null}},
+        {"name": "No Glebelands in January",
+         "availability": {"closures": [{"venue": "glebelands", "from": "2026-01-01",
+                                        "to": "2026-01-31", "reason": "Unavailable"}]}},
+        {"name": "Second 9v9 at CCC", "pitches": {"CCC5 9v9": {"venue": "ccc", "format": "9v9"}}},
+        {"name": "Softer back-to-back", "weights": {"back_to_back_penalty": 20}},
+        {"name": "Snoxhall changing rooms",
+         "venues": {"snoxhall": {"resources": {"changing_rooms": {"capacity": 8,
+                                                                  "demand": {"11v11": 2, "9v9": 2}}}}}}
+    ]}
+
+"pitches" maps a pitch to null (remove it), to changed fields, or - with
+"venue" - to a new pitch. "venues" changes venue fields other than its
+pitches (e.g. site "resources"). Availability closures/windows are added to the
+base calendar. The fixtures are loaded once and handed to each pool
+process when it starts, so every scenario solves from the same data.
+
+    python cranleighFC_scenarios.py config/scenarios.json
+    python cranleighFC_scenarios.py config/scenarios.json --input fixtures.csv --processes 4
+"""
+
+import argparse
+import contextlib
+import copy
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+import pandas as pd
+
+with contextlib.redirect_stdout(sys.stderr):
+    from CranleighFC_Pitch_Allocation_PROD import (
+        CONFIG,
+        generate_slots,
+        load_and_validate_fixtures,
+        solve_allocation,
+        summarise_allocation
+    )
+    from cranleighFC_availability import build_calendar
+    from cranleighFC_config import AllocatorConfig, compile_config
+    from cranleighFC_profiling import new_run_report
+
+BASE_SCENARIO = 'Base'
+DELTA_KEYS = ('name', 'description', 'pitches', 'venues', 'weights', 'availability')
+COMPARED_METRICS = ['allocated', 'time_matches', 'back_to_back', 'glebelands_usage']
+
+# =====================================
+# 🔧 Config Deltas
+# =====================================
+def apply_delta(document: Dict, delta: Dict, errors: List[str]) -> Dict:
+    """A copy of a merged config document with one scenario's pitch, venue and weight changes"""
+    name = delta.get('name', '?')
+    document = copy.deepcopy(document)
+    errors.extend(f"Scenario '{name}': unknown key '{key}'" for key in delta if key not in DELTA_KEYS)
+
+    venue_of = {pitch: venue_id for venue_id, venue in document['venues'].items() for pitch in venue['pitches']}
+    for pitch, change in delta.get('pitches', {}).items():
+        if change is None:
+            if pitch not in venue_of:
+                errors.append(f"Scenario '{name}': can't remove unknown pitch '{pitch}'")
+                continue
+            del document['venues'][venue_of[pitch]]['pitches'][pitch]
+        elif 'venue' in change:
+            venue_id = change['venue']
+            if venue_id not in document['venues']:
+                errors.append(f"Scenario '{name}': unknown venue '{venue_id}' for pitch '{pitch}'")
+                continue
+            if pitch in venue_of:
+                del document['venues'][venue_of[pitch]]['pitches'][pitch]   # Moved to another venue
+            info = {key: value for key, value in change.items() if key != 'venue'}
+            document['venues'][venue_id]['pitches'][pitch] = info
+        elif pitch in venue_of:
+            document['venues'][venue_of[pitch]]['pitches'][pitch].update(change)
+        else:
+            errors.append(f"Scenario '{name}': new pitch '{pitch}' needs a 'venue'")
+
+    for venue_id, change in delta.get('venues', {}).items():
+        if venue_id not in document['venues']:
+            errors.append(f"Scenario '{name}': unknown venue '{venue_id}'")
+        elif 'pitches' in change:
+            errors.append(f"Scenario '{name}': change venue '{venue_id}' pitches under 'pitches'")
+        else:
+            document['venues'][venue_id].update(change)
+
+    unknown = [weight for weight in delta.get('weights', {}) if weight not in document['weights']]
+    errors.extend(f"Scenario '{name}': unknown weight '{weight}'" for weight in unknown)
+    document['weights'].update(delta.get('weights', {}))
+    return document
+
+def merge_availability(base: Dict, delta: Dict) -> Dict:
+    """Base availability document plus a scenario's closures and windows"""
+    base, delta = base or {}, delta or {}
+    return {kind: list(base.get(kind, [])) + list(delta.get(kind, [])) for kind in ('closures', 'windows')}
+
+def load_scenarios(path: str) -> List[Dict]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get('scenarios', [])
+
+def prepare_scenarios(scenarios: List[Dict], base_config: AllocatorConfig = None,
+                      base_availability: Dict = None) -> List[Dict]:
+    """
+    Validate every scenario up front (config deltas compile, calendars build)
+    so a typo fails before any solve. Returns [{name, document, availability}],
+    base first.
+    """
+    base_config = CONFIG if base_config is None else base_config
+    base_document = json.loads(base_config.source)
+    errors = []
+    prepared = [{'name': BASE_SCENARIO, 'document': base_document,
+                 'availability': merge_availability(base_availability, None)}]
+    names = {BASE_SCENARIO}
+    for i, delta in enumerate(scenarios):
+        name = delta.get('name') or f"Scenario {i + 1}"
+        if name in names:
+            errors.append(f"Scenario '{name}': duplicate name")
+        names.add(name)
+        document = apply_delta(base_document, dict(delta, name=name), errors)
+        availability = merge_availability(base_availability, delta.get('availability'))
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                config = compile_config(document)
+                build_calendar(availability, config)
+        except ValueError as e:
+            errors.append(f"Scenario '{name}': {e} (details above)")
+        prepared.append({'name': name, 'document': document, 'availability': availability})
+
+    if errors:
+        print("⚠️ Scenario errors found:")
+        for err in errors:
+            print(f"  - {err}")
+        raise ValueError("Fix scenario errors before proceeding")
+    return prepared
+
+# =====================================
+# 🧮 Solving
+# =====================================
+_shared = {}   # Per process: the fixture data every scenario solves from
+
+def _init_worker(fixtures: Dict, slot_dates: List[str]):
+    _shared['fixtures'] = fixtures
+    _shared['slot_dates'] = slot_dates
+
+def _solve_scenario(scenario: Dict, timeout: int, num_workers: int, random_seed: int) -> Dict:
+    """Process pool task: one scenario's allocation metrics"""
+    fixtures = _shared['fixtures']
+    report = new_run_report()
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        config = compile_config(scenario['document'])
+        calendar = build_calendar(scenario['availability'], config)
+        slots_by_date = generate_slots(_shared['slot_dates'], config)
+        result = solve_allocation(fixtures, slots_by_date, timeout=timeout, num_workers=num_workers,
+                                  random_seed=random_seed, report=report, config=config,
+                                  verbose=False,
+                                  calendar=calendar if any(scenario['availability'].values()) else None)
+    return dict(
+        {'scenario': scenario['name']},
+        **summarise_allocation(result, fixtures, config),
+        objective=report['solver'].get('objective'),
+        status=report['solver'].get('status'),
+        seconds=round(time.perf_counter() - started, 2)
+    )
+
+def run_scenarios(fixtures: Dict, slot_dates: List[str], scenarios: List[Dict],
+                  base_config: AllocatorConfig = None, base_availability: Dict = None,
+                  timeout: int = 30, num_workers: int = 8, max_processes: int = None,
+                  random_seed: int = None) -> pd.DataFrame:
+    """
+    Solve the base configuration and every scenario in a process pool and
+    compare them: one row per scenario with allocated, time matches,
+    back-to-back and Glebelands usage, plus each metric's change from Base.
+    fixtures / slot_dates: as loaded once by load_and_validate_fixtures
+    num_workers CP-SAT workers are shared between the concurrent processes.
+    """
+    prepared = prepare_scenarios(scenarios, base_config, base_availability)
+    processes = max(1, min(max_processes or os.cpu_count() or 1, len(prepared)))
+    workers_each = max(1, num_workers // processes)
+    print(f'\n🔀 Solving {len(prepared)} scenario(s) on {processes} process(es), '
+          f'{workers_each} worker(s) each...')
+
+    if processes == 1:
+        _init_worker(fixtures, slot_dates)
+        rows = [_solve_scenario(scenario, timeout, workers_each, random_seed) for scenario in prepared]
+    else:
+        # spawn: safe alongside the app's and service's worker threads
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(fixtures, slot_dates)) as pool:
+            rows = list(pool.map(_solve_scenario, prepared, [timeout] * len(prepared),
+                                 [workers_each] * len(prepared), [random_seed] * len(prepared)))
+
+    table = pd.DataFrame(rows).set_index('scenario')
+    for metric in COMPARED_METRICS:
+        table[f'{metric}_change'] = table[metric] - table.at[BASE_SCENARIO, metric]
+    return table
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Compare allocations under what-if config scenarios',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('scenarios', help='Scenario file (JSON)')
+    parser.add_argument('--input', default='cranleigh_home_fixtures.csv', help='Fixture file (CSV)')
+    parser.add_argument('--availability', help='Base availability calendar (JSON) for every scenario')
+    parser.add_argument('--timeout', type=int, default=30, help='CP-SAT time limit per scenario')
+    parser.add_argument('--solver-workers', type=int, default=8, help='CP-SAT workers shared by all processes')
+    parser.add_argument('--processes', type=int, default=None, help='Scenario processes (default: CPU count)')
+    parser.add_argument('--seed', type=int, default=None, help='CP-SAT random seed')
+    parser.add_argument('--csv', help='Also write the comparison table to this CSV file')
+    args = parser.parse_args(argv)
+
+    base_availability = None
+    if args.availability:
+        with open(args.availability, encoding='utf-8') as f:
+            base_availability = json.load(f)
+    with contextlib.redirect_stdout(sys.stderr):
+        fixtures, slots_by_date, _ = load_and_validate_fixtures(args.input)
+    table = run_scenarios(fixtures, sorted(slots_by_date), load_scenarios(args.scenarios),
+                          base_availability=base_availability, timeout=args.timeout,
+                          num_workers=args.solver_workers, max_processes=args.processes,
+                          random_seed=args.seed)
+
+    columns = ['fixtures', 'allocated', 'time_matches', 'back_to_back', 'glebelands_usage',
+               'allocated_change', 'time_matches_change', 'back_to_back_change',
+               'glebelands_usage_change', 'status', 'seconds']
+    print(table[columns].to_string())
+    if args.csv:
+        table.to_csv(args.csv)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
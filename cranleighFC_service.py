@@ -0,0 +1,316 @@
+"""
+Cranleigh FC allocation service
+A small local HTTP API around load_and_validate_fixtures/solve_allocation so
+other club systems can request allocations without going through Streamlit.
+
+    POST   /jobs                      fixture payload -> 202 {"job_id": ...}
+    GET    /jobs                      all known jobs
+    GET    /jobs/<id>                 job status
+    GET    /jobs/<id>/result          allocations + unallocated fixtures
+    GET    /jobs/<id>/export/<fmt>    csv | xlsx | html
+    DELETE /jobs/<id>                 cancel (stops a running solve too)
+    GET    /health
+
+Payloads are JSON - {"fixtures": [row, ...]} using the FA Full-Time CSV
+column names, or {"csv": "<csv text>"} - or a raw text/csv body. Optional
+"timeout" (seconds). Identical payloads share one job via an input hash.
+
+Run with:  python cranleighFC_service.py --port 8765
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Tuple
+
+import pandas as pd
+
+from CranleighFC_Pitch_Allocation_PROD import CONFIG
+from cranleighFC_exports import EXPORT_FORMATS, allocation_hash, export_allocation, export_timings
+from cranleighFC_jobs import DONE, JobRunner, solve_fixture_file
+from cranleighFC_profiling import enable_profiling, rounded_report
+
+REQUIRED_COLUMNS = ['match_date', 'match_time', 'home_team_clean']
+OPTIONAL_COLUMNS = ['fixture_id', 'league', 'competition', 'prefix', 'away_team',
+                    'status', 'result', 'venue']
+
+DEFAULT_TIMEOUT = 30
+MAX_TIMEOUT = 300
+MAX_PAYLOAD_BYTES = 5 * 1024 * 1024
+
+class PayloadError(ValueError):
+    """Raised for malformed fixture payloads (HTTP 400)"""
+
+# =====================================
+# 📥 Payload Handling
+# =====================================
+def read_fixtures(read: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    """Run a pandas reader, reporting unreadable input as a PayloadError"""
+    try:
+        return read()
+    except pd.errors.EmptyDataError:
+        raise PayloadError("No fixtures in payload")
+    # ParserError is a ValueError too
+    except (ValueError, UnicodeDecodeError) as e:
+        raise PayloadError(f"Unreadable fixtures: {e}")
+
+def payload_to_csv(body: bytes, content_type: str) -> Tuple[str, int]:
+    """Normalise a request body to canonical fixture CSV text and a timeout"""
+    timeout = DEFAULT_TIMEOUT
+
+    if content_type.startswith('text/csv'):
+        fixtures_df = read_fixtures(lambda: pd.read_csv(io.BytesIO(body)))
+    else:
+        try:
+            payload = json.loads(body.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise PayloadError(f"Invalid JSON: {e}")
+        if not isinstance(payload, dict):
+            raise PayloadError("JSON payload must be an object")
+
+        timeout = payload.get('timeout', DEFAULT_TIMEOUT)
+        if not isinstance(timeout, (int, float)) or not 1 <= timeout <= MAX_TIMEOUT:
+            raise PayloadError(f"timeout must be between 1 and {MAX_TIMEOUT} seconds")
+
+        if 'csv' in payload:
+            fixtures_df = read_fixtures(lambda: pd.read_csv(io.StringIO(str(payload['csv']))))
+        elif isinstance(payload.get('fixtures'), list):
+            fixtures_df = read_fixtures(lambda: pd.DataFrame(payload['fixtures']))
+        else:
+            raise PayloadError("Payload needs a 'fixtures' list or a 'csv' string")
+
+    missing = [c for c in REQUIRED_COLUMNS if c not in fixtures_df.columns]
+    if missing:
+        raise PayloadError("Missing columns: " + ", ".join(missing))
+    if fixtures_df.empty:
+        raise PayloadError("No fixtures in payload")
+
+    for col in OPTIONAL_COLUMNS:
+        if col not in fixtures_df.columns:
+            fixtures_df[col] = None
+
+    columns = REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+    columns += sorted(c for c in fixtures_df.columns if c not in columns)
+    return fixtures_df[columns].to_csv(index=False), int(timeout)
+
+def input_hash(csv_text: str, timeout: int) -> str:
+    """Hash identifying identical solve requests under the current config"""
+    return hashlib.sha256(f"{CONFIG.fingerprint}\n{timeout}\n{csv_text}".encode('utf-8')).hexdigest()
+
+def solve_fixture_payload(csv_text: str, timeout: int, num_workers: int = 8, stop_event=None):
+    """Process-pool entry point: solve fixture CSV text"""
+    return solve_fixture_file(io.StringIO(csv_text), timeout=timeout, num_workers=num_workers,
+                              stop_event=stop_event)
+
+# =====================================
+# ⚙️ Allocation Service
+# =====================================
+class AllocationService:
+    """Queues solves on a process pool and keeps their results"""
+
+    def __init__(self, workers: int = 2, solver_workers: int = 8):
+        self.solver_workers = solver_workers
+        # spawn: forking a threaded HTTP server is unsafe
+        context = multiprocessing.get_context('spawn')
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        # Manager events reach into the pool, so DELETE stops a running solve
+        self._manager = context.Manager()
+        # One runner thread per process slot tracks status and de-duplicates
+        self.runner = JobRunner(max_workers=workers)
+
+    def _solve_in_pool(self, csv_text: str, timeout: int, stop_event: threading.Event = None):
+        stop = self._manager.Event()
+        finished = threading.Event()
+        if stop_event is not None:
+            def forward_cancel():
+                while not finished.is_set():
+                    if stop_event.wait(0.1):
+                        stop.set()
+                        return
+            threading.Thread(target=forward_cancel, daemon=True).start()
+        try:
+            return self._pool.submit(solve_fixture_payload, csv_text, timeout,
+                                     self.solver_workers, stop).result()
+        finally:
+            finished.set()
+
+    def submit(self, csv_text: str, timeout: int) -> Tuple[str, str]:
+        key = input_hash(csv_text, timeout)
+        job_id = self.runner.submit(self._solve_in_pool, csv_text, timeout,
+                                    key=key, label=key[:12])
+        return job_id, key
+
+    def result(self, job_id: str) -> Dict:
+        result, fixtures, removed_duplicates, report = self.runner.result(job_id)
+        allocated = set(result['fixture_id']) if result is not None else set()
+        if result is not None:
+            # Exports are timed by the export cache, leaving the job's report as solved
+            report = dict(report, phases=dict(report.get('phases', {}),
+                                              **export_timings(allocation_hash(result))))
+        return {
+            'job_id': job_id,
+            'allocated': len(allocated),
+            'total': len(fixtures),
+            'allocations': json.loads(result.to_json(orient='records')) if result is not None else [],
+            'unallocated': sorted(set(fixtures) - allocated),
+            'removed_duplicates': json.loads(removed_duplicates.to_json(orient='records')),
+            'run_report': rounded_report(report)
+        }
+
+    def export(self, job_id: str, fmt: str) -> bytes:
+        result, fixtures, _, _ = self.runner.result(job_id)
+        if result is None:
+            raise LookupError("No allocation to export")
+        return export_allocation(result, fixtures, [fmt])[fmt]
+
+    def shutdown(self):
+        self.runner.shutdown()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
+
+# =====================================
+# 🌐 HTTP Layer
+# =====================================
+class AllocationRequestHandler(BaseHTTPRequestHandler):
+    service: AllocationService = None
+    quiet = False
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def _send(self, code: int, body, content_type: str = 'application/json', headers: Dict = None):
+        data = json.dumps(body).encode('utf-8') if content_type == 'application/json' else body
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _job_status(self, job_id: str):
+        status = self.service.runner.status(job_id)
+        if status is None:
+            self._send(404, {'error': f"Unknown job '{job_id}'"})
+        return status
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0].rstrip('/')
+
+        if path == '/health':
+            return self._send(200, {'status': 'ok'})
+        if path == '/jobs':
+            return self._send(200, {'jobs': self.service.runner.jobs()})
+
+        match = re.fullmatch(r'/jobs/([\w-]+)(?:/(result|export)(?:/(\w+))?)?', path)
+        if not match:
+            return self._send(404, {'error': 'Not found'})
+        job_id, action, fmt = match.groups()
+
+        status = self._job_status(job_id)
+        if status is None:
+            return
+        if action is None:
+            return self._send(200, status)
+        if status['state'] != DONE:
+            return self._send(409, {'error': f"Job is {status['state']}", 'status': status})
+
+        if action == 'result':
+            return self._send(200, self.service.result(job_id))
+
+        if fmt not in EXPORT_FORMATS:
+            return self._send(404, {'error': f"Unknown export format '{fmt}'",
+                                    'formats': list(EXPORT_FORMATS)})
+        try:
+            data = self.service.export(job_id, fmt)
+        except LookupError as e:
+            return self._send(409, {'error': str(e)})
+        spec = EXPORT_FORMATS[fmt]
+        self._send(200, data, spec['mime'], {
+            'Content-Disposition': f'attachment; filename="pitch_allocations_{job_id}.{spec["extension"]}"'
+        })
+
+    def do_POST(self):
+        if self.path.split('?', 1)[0].rstrip('/') != '/jobs':
+            return self._send(404, {'error': 'Not found'})
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return self._send(400, {'error': 'Invalid Content-Length'})
+        if length > MAX_PAYLOAD_BYTES:
+            return self._send(413, {'error': 'Payload too large'})
+        body = self.rfile.read(length)
+
+        try:
+            csv_text, timeout = payload_to_csv(body, self.headers.get('Content-Type', ''))
+        except PayloadError as e:
+            return self._send(400, {'error': str(e)})
+
+        job_id, key = self.service.submit(csv_text, timeout)
+        self._send(202, dict(self.service.runner.status(job_id), job_id=job_id, input_hash=key),
+                   headers={'Location': f'/jobs/{job_id}'})
+
+    def do_DELETE(self):
+        match = re.fullmatch(r'/jobs/([\w-]+)', self.path.rstrip('/'))
+        if not match:
+            return self._send(404, {'error': 'Not found'})
+        if self._job_status(match.group(1)) is None:
+            return
+        cancelled = self.service.runner.cancel(match.group(1))
+        self._send(200, {'cancelled': cancelled, 'status': self.service.runner.status(match.group(1))})
+
+def create_server(host: str = '127.0.0.1', port: int = 8765, workers: int = 2,
+                  solver_workers: int = 8, quiet: bool = False) -> ThreadingHTTPServer:
+    """
+    Build (but do not start) the HTTP server. Port 0 picks a free port -
+    handy for running an in-process client against server.server_address.
+    """
+    handler = type('BoundAllocationRequestHandler', (AllocationRequestHandler,), {
+        'service': AllocationService(workers=workers, solver_workers=solver_workers),
+        'quiet': quiet
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def serve_in_background(server: ThreadingHTTPServer) -> threading.Thread:
+    """Run server.serve_forever on a daemon thread"""
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+# =====================================
+# 🚀 Main Execution
+# =====================================
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cranleigh FC pitch allocation service')
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address (default: localhost only)')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=2, help='Concurrent solve processes')
+    parser.add_argument('--solver-workers', type=int, default=8, help='CP-SAT workers per solve')
+    parser.add_argument('--profile-dir', help='Write cProfile/tracemalloc reports per phase here')
+    args = parser.parse_args()
+
+    if args.profile_dir:
+        # Set before the solve pool starts so its processes inherit it
+        enable_profiling(args.profile_dir)
+
+    server = create_server(args.host, args.port, args.workers, args.solver_workers)
+    print(f"🌐 Allocation service listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️ Shutting down")
+    finally:
+        server.RequestHandlerClass.service.shutdown()
+        server.server_close()
@@ -0,0 +1,239 @@
+"""
+Cranleigh FC allocation history store
+A local SQLite database of every allocation run: the run's metadata and
+metrics, the fixtures it was given and the slots it allocated. Runs are
+written in one bulk transaction; queries such as a team's slots this
+season or pitch usage per month are index lookups, not re-solves.
+
+    runs         run_id, created_at, source, engine, config, allocation_hash,
+                 status, fixtures, allocated, objective, metrics (JSON)
+    fixtures     run_id, fixture_id, team, date, age_group, format_req,
+                 preferred_time, priority, is_cup
+    allocations  run_id, fixture_id, team, date, time, pitch, age_group,
+                 priority, matched_pref_time, is_cup
+
+The database defaults to allocations.sqlite3 next to this file
+(override with CRANLEIGH_STORE or the path argument).
+"""
+
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import date as Date, datetime, timedelta
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+STORE_ENV = 'CRANLEIGH_STORE'
+DEFAULT_STORE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'allocations.sqlite3')
+SEASON_START_MONTH = 8   # Seasons run August to July
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    source TEXT,
+    engine TEXT,
+    config TEXT,
+    allocation_hash TEXT,
+    status TEXT,
+    fixtures INTEGER,
+    allocated INTEGER,
+    objective REAL,
+    metrics TEXT
+);
+CREATE TABLE IF NOT EXISTS fixtures (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    fixture_id TEXT NOT NULL,
+    team TEXT NOT NULL,
+    date TEXT NOT NULL,
+    age_group TEXT,
+    format_req TEXT,
+    preferred_time TEXT,
+    priority INTEGER,
+    is_cup INTEGER,
+    PRIMARY KEY (run_id, fixture_id)
+);
+CREATE TABLE IF NOT EXISTS allocations (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    fixture_id TEXT NOT NULL,
+    team TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    pitch TEXT NOT NULL,
+    age_group TEXT,
+    priority INTEGER,
+    matched_pref_time INTEGER,
+    is_cup INTEGER,
+    PRIMARY KEY (run_id, fixture_id)
+);
+CREATE INDEX IF NOT EXISTS idx_allocations_date ON allocations (date);
+CREATE INDEX IF NOT EXISTS idx_allocations_team ON allocations (team, date);
+CREATE INDEX IF NOT EXISTS idx_allocations_pitch_date ON allocations (pitch, date);
+CREATE INDEX IF NOT EXISTS idx_fixtures_team ON fixtures (team, date);
+CREATE INDEX IF NOT EXISTS idx_runs_hash ON runs (allocation_hash, source);
+"""
+
+def season_bounds(day: Date = None) -> Tuple[str, str]:
+    """First and last YYYY-MM-DD dates of the season containing day (default today)"""
+    day = day or Date.today()
+    start_year = day.year if day.month >= SEASON_START_MONTH else day.year - 1
+    start = Date(start_year, SEASON_START_MONTH, 1)
+    end = Date(start_year + 1, SEASON_START_MONTH, 1) - timedelta(days=1)
+    return start.isoformat(), end.isoformat()
+
+class AllocationStore:
+    """
+    SQLite-backed run history. Each call opens its own connection, so one
+    store can be shared by threads (app sessions) and processes (CLI jobs);
+    WAL mode lets readers carry on while a run is being written.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.environ.get(STORE_ENV) or DEFAULT_STORE_FILE
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:  # One transaction - committed on success, rolled back on error
+                yield conn
+        finally:
+            conn.close()
+
+    # =====================================
+    # ✍️ Writing Runs
+    # =====================================
+    def save_run(self, result: pd.DataFrame, fixtures: Dict, source: str = None,
+                 engine: str = 'exact', config: str = None, metrics: Dict = None,
+                 report: Dict = None, allocation_hash: str = None) -> int:
+        """
+        Store one run - metadata, every fixture and every allocated slot - in
+        a single transaction and return its run_id. A run with the same
+        allocation_hash and source is stored once (its run_id is returned).
+        """
+        solver = (report or {}).get('solver', {})
+        with self._connect() as conn:
+            if allocation_hash is not None:
+                row = conn.execute(
+                    "SELECT run_id FROM runs WHERE allocation_hash = ? AND source IS ? "
+                    "ORDER BY run_id DESC LIMIT 1", (allocation_hash, source)
+                ).fetchone()
+                if row is not None:
+                    return row[0]
+
+            allocated = 0 if result is None else len(result)
+            cursor = conn.execute(
+                "INSERT INTO runs (created_at, source, engine, config, allocation_hash, status, "
+                "fixtures, allocated, objective, metrics) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (datetime.now().isoformat(timespec='seconds'), source, engine, config, allocation_hash,
+                 solver.get('status'), len(fixtures), allocated, solver.get('objective'),
+                 json.dumps(metrics) if metrics is not None else None)
+            )
+            run_id = cursor.lastrowid
+
+            conn.executemany(
+                "INSERT INTO fixtures VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, fixture_id, f['team_name'], f['fixture_date'], f['age_group'],
+                  f['format_req'], f['preferred_time'], int(f['priority']), int(bool(f.get('is_cup'))))
+                 for fixture_id, f in fixtures.items()]
+            )
+            if allocated:
+                rows = result[['fixture_id', 'team', 'date', 'time', 'pitch', 'age_group',
+                               'priority', 'matched_pref_time', 'is_cup']]
+                conn.executemany(
+                    "INSERT INTO allocations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(run_id, fixture_id, team, date, time, pitch, age_group, int(priority),
+                      int(bool(matched)), int(bool(is_cup)))
+                     for fixture_id, team, date, time, pitch, age_group, priority, matched, is_cup
+                     in rows.itertuples(index=False, name=None)]
+                )
+        return run_id
+
+    def delete_run(self, run_id: int):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    # =====================================
+    # 🔎 Queries
+    # =====================================
+    def _frame(self, sql: str, params: Tuple = ()) -> pd.DataFrame:
+        with self._connect() as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def latest_run_id(self, source: str = None) -> int:
+        """Most recent run (for a source, if given), or None"""
+        with self._connect() as conn:
+            if source is None:
+                row = conn.execute("SELECT MAX(run_id) FROM runs").fetchone()
+            else:
+                row = conn.execute("SELECT MAX(run_id) FROM runs WHERE source = ?", (source,)).fetchone()
+        return row[0]
+
+    def runs(self, limit: int = 50) -> pd.DataFrame:
+        """Most recent runs first"""
+        return self._frame(
+            "SELECT run_id, created_at, source, engine, config, status, fixtures, allocated, objective "
+            "FROM runs ORDER BY run_id DESC LIMIT ?", (limit,)
+        )
+
+    def date_range(self, run_id: int = None) -> Tuple[str, str]:
+        """First and last allocated dates in a run (default latest), or (None, None)"""
+        run_id = self.latest_run_id() if run_id is None else run_id
+        with self._connect() as conn:
+            return conn.execute("SELECT MIN(date), MAX(date) FROM allocations WHERE run_id = ?",
+                                (run_id,)).fetchone()
+
+    def teams(self, run_id: int = None) -> List[str]:
+        """Teams with at least one allocated slot in a run (default latest)"""
+        run_id = self.latest_run_id() if run_id is None else run_id
+        with self._connect() as conn:
+            rows = conn.execute("SELECT DISTINCT team FROM allocations WHERE run_id = ? ORDER BY team",
+                                (run_id,)).fetchall()
+        return [team for team, in rows]
+
+    def run_allocation(self, run_id: int) -> pd.DataFrame:
+        """A stored run's allocation in the allocator's DataFrame layout"""
+        df = self._frame(
+            "SELECT fixture_id, team, date, time, pitch, age_group, priority, matched_pref_time, is_cup "
+            "FROM allocations WHERE run_id = ? ORDER BY date, time, pitch", (run_id,)
+        )
+        return df.astype({'matched_pref_time': bool, 'is_cup': bool})
+
+    def team_slots(self, team: str, start_date: str = None, end_date: str = None,
+                   run_id: int = None) -> pd.DataFrame:
+        """A team's allocated slots in a run (default latest) between two
+        dates (default this season)"""
+        if start_date is None and end_date is None:
+            start_date, end_date = season_bounds()
+        run_id = self.latest_run_id() if run_id is None else run_id
+        return self._frame(
+            "SELECT date, time, pitch, age_group, is_cup, matched_pref_time FROM allocations "
+            "WHERE team = ? AND run_id = ? AND date BETWEEN ? AND ? ORDER BY date, time",
+            (team, run_id, start_date or '0000-00-00', end_date or '9999-12-31')
+        )
+
+    def pitch_usage_by_month(self, run_id: int = None, start_date: str = None,
+                             end_date: str = None) -> pd.DataFrame:
+        """Fixtures per pitch per YYYY-MM month in a run (default latest)"""
+        run_id = self.latest_run_id() if run_id is None else run_id
+        return self._frame(
+            "SELECT pitch, substr(date, 1, 7) AS month, COUNT(*) AS fixtures FROM allocations "
+            "WHERE run_id = ? AND date BETWEEN ? AND ? GROUP BY pitch, month ORDER BY month, pitch",
+            (run_id, start_date or '0000-00-00', end_date or '9999-12-31')
+        )
+
+    def date_allocations(self, date: str, run_id: int = None) -> pd.DataFrame:
+        """Every allocated slot on a date in a run (default latest)"""
+        run_id = self.latest_run_id() if run_id is None else run_id
+        return self._frame(
+            "SELECT team, time, pitch, age_group FROM allocations WHERE run_id = ? AND date = ? "
+            "ORDER BY time, pitch", (run_id, date)
+        )
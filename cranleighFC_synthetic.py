@@ -0,0 +1,135 @@
+"""
+Cranleigh FC synthetic fixture generator
+Produces FA Full-Time style fixture CSVs that follow the real team/age
+distribution in valid_teams, for 1-10 seasons and 1-20 clubs, at demand
+levels from light to oversubscribed. Used by the benchmark suite.
+
+Run with:  python cranleighFC_synthetic.py --seasons 2 --clubs 3 --demand busy -o synthetic.csv
+"""
+
+import argparse
+import random
+from datetime import date, timedelta
+from typing import Dict, Tuple
+
+import pandas as pd
+
+from CranleighFC_Pitch_Allocation_PROD import valid_teams
+
+# Probability that a team is at home on any given weekend
+DEMAND_LEVELS = {
+    'light': 0.2,
+    'normal': 0.45,
+    'busy': 0.7,
+    'oversubscribed': 1.0
+}
+
+# Neighbouring clubs used when generating more than one club
+CLUB_NAMES = [
+    'Cranleigh', 'Ewhurst', 'Bramley', 'Shamley Green', 'Alfold', 'Dunsfold',
+    'Wonersh', 'Rudgwick', 'Bucks Green', 'Ellens Green', 'Loxwood', 'Chiddingfold',
+    'Godalming', 'Shalford', 'Peaslake', 'Gomshall', 'Slinfold', 'Billingshurst',
+    'Smallfield', 'Capel'
+]
+
+# Kickoff times as published on FA Full-Time (00:00 = time TBC)
+YOUTH_TIMES = (['09:30:00', '10:00:00', '08:00:00', '10:30:00', '11:00:00', '00:00:00'],
+               [40, 15, 15, 8, 10, 12])
+SENIOR_TIMES = (['14:00:00', '00:00:00', '13:30:00'], [80, 15, 5])
+
+LEAGUES = {
+    'youth': 'South Surrey Youth Football League',
+    'Seniors': 'The MJM Sports Surrey Premier County Football League',
+    'Womens': 'Surrey County Womens & Girls League'
+}
+
+MAX_SEASONS = 10
+MAX_CLUBS = 20
+
+def club_teams(clubs: int = 1) -> Dict[str, str]:
+    """Team -> age group for the first N clubs, mirroring Cranleigh's teams"""
+    if not 1 <= clubs <= MAX_CLUBS:
+        raise ValueError(f"clubs must be between 1 and {MAX_CLUBS}")
+    teams = {}
+    for club in CLUB_NAMES[:clubs]:
+        for team, age in valid_teams.items():
+            teams[club + team[len('Cranleigh'):]] = age
+    return teams
+
+def season_weekends(season: int):
+    """(saturday, sunday) pairs from early September to the end of April"""
+    start = date(2025 + season, 9, 6)
+    start += timedelta(days=(5 - start.weekday()) % 7)
+    end = date(2026 + season, 4, 30)
+    saturday = start
+    while saturday <= end:
+        yield saturday, saturday + timedelta(days=1)
+        saturday += timedelta(days=7)
+
+def generate_fixtures(seasons: int = 1, clubs: int = 1, demand: str = 'normal',
+                      cup_rate: float = 0.08, duplicate_rate: float = 0.02,
+                      seed: int = 0) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """
+    Generate a synthetic home fixture list.
+    Returns the fixtures DataFrame (FA Full-Time CSV columns) and the
+    team -> age group mapping needed to validate it.
+    """
+    if not 1 <= seasons <= MAX_SEASONS:
+        raise ValueError(f"seasons must be between 1 and {MAX_SEASONS}")
+    if demand not in DEMAND_LEVELS:
+        raise ValueError(f"demand must be one of: {', '.join(DEMAND_LEVELS)}")
+
+    rng = random.Random(seed)
+    teams = club_teams(clubs)
+    home_probability = DEMAND_LEVELS[demand]
+
+    # Each team plays on a fixed day: roughly 60% Saturday, 40% Sunday
+    match_day = {team: 1 if rng.random() < 0.4 else 0 for team in teams}
+
+    rows = []
+    for season in range(seasons):
+        for weekend in season_weekends(season):
+            for team, age in teams.items():
+                if rng.random() >= home_probability:
+                    continue
+                is_senior = age in ['Seniors', 'Womens']
+                times, weights = SENIOR_TIMES if is_senior else YOUTH_TIMES
+                fixture_date = weekend[match_day[team]].isoformat()
+                league = LEAGUES.get(age, LEAGUES['youth'])
+
+                entries = 2 if rng.random() < duplicate_rate else 1
+                for entry in range(entries):
+                    # A duplicate is a cup tie clashing with the league game
+                    is_cup = entry == 1 or rng.random() < cup_rate
+                    rows.append({
+                        'fixture_id': len(rows) + 1,
+                        'league': league,
+                        'competition': f"{league} Cup" if is_cup else league,
+                        'match_date': fixture_date,
+                        'match_time': rng.choices(times, weights)[0],
+                        'prefix': 'Cup:' if is_cup else None,
+                        'home_team_clean': team,
+                        'away_team': f"Opponent {rng.randint(1, 400)}",
+                        'status': 'scheduled',
+                        'result': None,
+                        'venue': None
+                    })
+
+    fixtures_df = pd.DataFrame(rows, columns=[
+        'fixture_id', 'league', 'competition', 'match_date', 'match_time', 'prefix',
+        'home_team_clean', 'away_team', 'status', 'result', 'venue'
+    ])
+    return fixtures_df, teams
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic fixture CSV')
+    parser.add_argument('--seasons', type=int, default=1)
+    parser.add_argument('--clubs', type=int, default=1)
+    parser.add_argument('--demand', choices=list(DEMAND_LEVELS), default='normal')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default='synthetic_fixtures.csv')
+    args = parser.parse_args()
+
+    fixtures_df, teams = generate_fixtures(args.seasons, args.clubs, args.demand, seed=args.seed)
+    fixtures_df.to_csv(args.output, index=False)
+    print(f"✅ Wrote {len(fixtures_df)} fixtures for {len(teams)} teams to {args.output}")
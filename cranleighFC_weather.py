@@ -0,0 +1,444 @@
+"""
+Cranleigh FC weather
+Open-Meteo forecasts through WeatherService (pooled session, timeouts and
+an on-disk stale-while-revalidate cache, so a slow API never blocks a page),
+hourly lookups per kickoff, and the weather re-planning mode: forecast risk becomes availability calendar
+closures (grass pitches on days heavy rain, snow or frost is likely) or
+penalties (rain likely - prefer the 3G pitches), and only the dates whose
+allocation is affected are re-solved, so a matchday morning re-plan takes
+seconds rather than a full-season solve.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, List, Tuple
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from CranleighFC_Pitch_Allocation_PROD import CONFIG, replan_allocation
+from cranleighFC_availability import AvailabilityCalendar
+from cranleighFC_config import AllocatorConfig
+
+# =====================================
+# 🌤️ Forecast
+# =====================================
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+WEATHER_URL_ENV = 'CRANLEIGH_WEATHER_URL'      # Override the API (e.g. a local stand-in server)
+WEATHER_CACHE_ENV = 'CRANLEIGH_WEATHER_CACHE'  # Override the on-disk cache directory
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'cranleighfc', 'weather')
+DEFAULT_LATITUDE = 51.14209    # Cranleigh, England
+DEFAULT_LONGITUDE = -0.48374
+HOURLY_FIELDS = "temperature_2m,precipitation,precipitation_probability,weather_code,wind_speed_10m"
+DAILY_FIELDS = ("weather_code,temperature_2m_max,temperature_2m_min,precipitation_sum,"
+                "precipitation_probability_max,wind_speed_10m_max")
+
+REQUEST_TIMEOUT = (3.05, 10)   # (connect, read) seconds
+FRESH_SECONDS = 3600           # Cached forecasts younger than this are served as is
+STALE_SECONDS = 24 * 3600      # Older ones are served while a background refresh runs
+FIRST_FETCH_WAIT = 2.0         # Seconds a caller waits for a forecast that isn't cached yet
+
+def forecast_url() -> str:
+    return os.environ.get(WEATHER_URL_ENV) or OPEN_METEO_URL
+
+def build_session(pool_size: int = 4, retries: int = 2) -> requests.Session:
+    """HTTP session with pooled keep-alive connections and retries on
+    transient server errors"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size,
+        max_retries=Retry(total=retries, backoff_factor=0.5,
+                          status_forcelist=[429, 500, 502, 503, 504], allowed_methods=['GET'])
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def fetch_forecast(latitude: float = DEFAULT_LATITUDE, longitude: float = DEFAULT_LONGITUDE,
+                   days: int = 7, session: requests.Session = None, url: str = None,
+                   timeout=REQUEST_TIMEOUT) -> Dict:
+    """Fetch the Open-Meteo forecast (raises requests exceptions on failure)"""
+    params = {
+        "latitude": latitude,
+        "longitude": longitude,
+        "hourly": HOURLY_FIELDS,
+        "daily": DAILY_FIELDS,
+        "timezone": "Europe/London",
+        "forecast_days": days
+    }
+    response = (session or requests).get(url or forecast_url(), params=params, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+class WeatherService:
+    """
+    Forecasts per (latitude, longitude, days) behind a pooled session and a
+    JSON file cache that survives restarts. Fresh entries are served as is;
+    stale ones are served immediately while one background thread per
+    location revalidates them. With nothing cached a caller waits at most
+    `wait` seconds and gets None if the API is slow - the fetch carries on
+    and the next call picks it up. A failed refresh keeps the old forecast.
+    """
+
+    def __init__(self, cache_dir: str = None, url: str = None,
+                 fresh_seconds: int = FRESH_SECONDS, stale_seconds: int = STALE_SECONDS,
+                 wait: float = FIRST_FETCH_WAIT):
+        self.cache_dir = cache_dir or os.environ.get(WEATHER_CACHE_ENV) or DEFAULT_CACHE_DIR
+        self.url = url
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.wait = wait
+        self.session = build_session()
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}            # key -> {'fetched_at', 'data'}
+        self._errors: Dict[str, str] = {}              # key -> last refresh error
+        self._invalidated = set()                      # keys to revalidate even if fresh
+        self._refreshing: Dict[str, threading.Thread] = {}
+        self._hourly: Dict[str, Tuple[float, pd.DataFrame]] = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def _key(latitude: float, longitude: float, days: int) -> str:
+        return f"{latitude:.4f}_{longitude:.4f}_{days}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"forecast_{key}.json")
+
+    def _entry(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            try:
+                with open(self._path(key), encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                return None
+            with self._lock:
+                entry = self._entries.setdefault(key, entry)
+        return entry
+
+    def _store(self, key: str, data: Dict):
+        entry = {'fetched_at': time.time(), 'data': data}
+        # Write then rename so a crash never leaves a half-written cache file
+        tmp = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp, self._path(key))
+        with self._lock:
+            self._entries[key] = entry
+            self._errors.pop(key, None)
+            self._invalidated.discard(key)
+
+    def _refresh(self, key: str, latitude: float, longitude: float, days: int):
+        try:
+            self._store(key, fetch_forecast(latitude, longitude, days,
+                                            session=self.session, url=self.url))
+        except Exception as e:
+            with self._lock:
+                self._errors[key] = str(e)
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def _start_refresh(self, key: str, latitude: float, longitude: float, days: int) -> threading.Thread:
+        with self._lock:
+            thread = self._refreshing.get(key)
+            if thread is None:
+                thread = threading.Thread(target=self._refresh, args=(key, latitude, longitude, days),
+                                          name=f'weather-{key}', daemon=True)
+                self._refreshing[key] = thread
+                thread.start()
+            return thread
+
+    def forecast(self, latitude: float = DEFAULT_LATITUDE, longitude: float = DEFAULT_LONGITUDE,
+                 days: int = 7, wait: float = None) -> Dict:
+        """The forecast for a location, or None if none is available yet"""
+        key = self._key(latitude, longitude, days)
+        entry = self._entry(key)
+        age = time.time() - entry['fetched_at'] if entry else None
+        if age is not None and age < self.fresh_seconds and key not in self._invalidated:
+            return entry['data']
+
+        thread = self._start_refresh(key, latitude, longitude, days)
+        if age is not None and age < self.stale_seconds:
+            return entry['data']
+
+        thread.join(self.wait if wait is None else wait)
+        entry = self._entry(key)
+        if entry and time.time() - entry['fetched_at'] < self.stale_seconds:
+            return entry['data']
+        return None
+
+    def status(self, latitude: float = DEFAULT_LATITUDE, longitude: float = DEFAULT_LONGITUDE,
+               days: int = 7) -> Dict:
+        """{'age': seconds or None, 'refreshing': bool, 'error': last refresh error or None}"""
+        key = self._key(latitude, longitude, days)
+        entry = self._entry(key)
+        with self._lock:
+            return {
+                'age': time.time() - entry['fetched_at'] if entry else None,
+                'refreshing': key in self._refreshing,
+                'error': self._errors.get(key)
+            }
+
+    def invalidate(self, latitude: float = DEFAULT_LATITUDE, longitude: float = DEFAULT_LONGITUDE,
+                   days: int = 7):
+        """Revalidate one location's forecast now - it is still served until
+        the refresh lands; other locations and caches are untouched"""
+        key = self._key(latitude, longitude, days)
+        with self._lock:
+            self._invalidated.add(key)
+        self._start_refresh(key, latitude, longitude, days)
+
+    def hourly(self, latitude: float = DEFAULT_LATITUDE, longitude: float = DEFAULT_LONGITUDE,
+               days: int = 7) -> pd.DataFrame:
+        """Hourly forecast indexed by local time (built once per fetched forecast)"""
+        key = self._key(latitude, longitude, days)
+        forecast = self.forecast(latitude, longitude, days)
+        entry = self._entry(key)
+        stamp = entry['fetched_at'] if entry else None
+        with self._lock:
+            cached = self._hourly.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        frame = hourly_frame(forecast)
+        with self._lock:
+            self._hourly[key] = (stamp, frame)
+        return frame
+
+def hourly_frame(forecast: Dict) -> pd.DataFrame:
+    """Hourly forecast as a DataFrame with a sorted DatetimeIndex"""
+    hourly = dict((forecast or {}).get('hourly', {}))
+    times = pd.to_datetime(hourly.pop('time', []))
+    return pd.DataFrame(hourly, index=pd.DatetimeIndex(times, name='time')).sort_index()
+
+def kickoff_weather(hourly: pd.DataFrame, kickoffs) -> pd.DataFrame:
+    """
+    Hourly forecast row nearest each kickoff timestamp (within an hour),
+    one row per kickoff in order - rows are NaN where the forecast doesn't
+    reach. A single index lookup, not a scan per kickoff.
+    """
+    kickoffs = pd.DatetimeIndex(pd.to_datetime(kickoffs))
+    if hourly.empty:
+        return pd.DataFrame(index=kickoffs, columns=hourly.columns, dtype=float)
+    positions = hourly.index.get_indexer(kickoffs, method='nearest', tolerance=pd.Timedelta(hours=1))
+    rows = hourly.iloc[positions.clip(min=0)].set_axis(kickoffs)
+    return rows.where(pd.Series(positions >= 0, index=kickoffs), axis=0)
+
+def daily_forecast(forecast: Dict) -> Dict[str, Dict]:
+    """Daily forecast keyed by YYYY-MM-DD date"""
+    daily = (forecast or {}).get('daily', {})
+    return {
+        date: {
+            'code': daily['weather_code'][i],
+            'temp_max': daily['temperature_2m_max'][i],
+            'temp_min': daily['temperature_2m_min'][i],
+            'precip_sum': daily['precipitation_sum'][i],
+            'precip_prob': daily['precipitation_probability_max'][i],
+            'wind': daily['wind_speed_10m_max'][i]
+        }
+        for i, date in enumerate(daily.get('time', []))
+    }
+
+WEATHER_CODES = {
+    0: ("Clear sky", "☀️"),
+    1: ("Mainly clear", "🌤️"),
+    2: ("Partly cloudy", "⛅"),
+    3: ("Overcast", "☁️"),
+    45: ("Foggy", "🌫️"),
+    48: ("Foggy", "🌫️"),
+    51: ("Light drizzle", "🌦️"),
+    53: ("Moderate drizzle", "🌦️"),
+    55: ("Heavy drizzle", "🌧️"),
+    61: ("Light rain", "🌧️"),
+    63: ("Moderate rain", "🌧️"),
+    65: ("Heavy rain", "⛈️"),
+    71: ("Light snow", "🌨️"),
+    73: ("Moderate snow", "🌨️"),
+    75: ("Heavy snow", "❄️"),
+    80: ("Light showers", "🌦️"),
+    81: ("Moderate showers", "🌧️"),
+    82: ("Heavy showers", "⛈️"),
+    95: ("Thunderstorm", "⛈️"),
+}
+
+# Playing condition thresholds
+RAIN_PROBABILITY_LIMIT = 70   # %
+WIND_LIMIT = 35               # km/h
+FREEZING_TEMP = 2             # °C
+SNOW_CODES = [71, 73, 75]
+THUNDERSTORM_CODES = [95]
+
+def get_weather_code_description(code):
+    """Convert weather code to description"""
+    return WEATHER_CODES.get(code, ("Unknown", "🌡️"))
+
+def assess_playing_conditions(temp, precip_prob, wind_speed, weather_code):
+    """Assess if conditions are suitable for football"""
+    issues = []
+
+    if precip_prob > RAIN_PROBABILITY_LIMIT:
+        issues.append("High rain probability")
+    if wind_speed > WIND_LIMIT:
+        issues.append("High winds")
+    if temp < FREEZING_TEMP:
+        issues.append("Near freezing")
+    if weather_code in SNOW_CODES:
+        issues.append("Snow expected")
+    if weather_code in THUNDERSTORM_CODES:
+        issues.append("Thunderstorm risk")
+
+    if not issues:
+        return "✅ Good", "weather-good"
+    elif len(issues) == 1:
+        return f"⚠️ Caution: {issues[0]}", "weather-card"
+    else:
+        return f"❌ Poor: {', '.join(issues)}", "weather-severe"
+
+def assess_playing_conditions_frame(temp: pd.Series, precip_prob: pd.Series,
+                                    wind_speed: pd.Series, weather_code: pd.Series) -> pd.Series:
+    """assess_playing_conditions for whole columns at once (condition labels)"""
+    flags = [
+        ("High rain probability", precip_prob > RAIN_PROBABILITY_LIMIT),
+        ("High winds", wind_speed > WIND_LIMIT),
+        ("Near freezing", temp < FREEZING_TEMP),
+        ("Snow expected", weather_code.isin(SNOW_CODES)),
+        ("Thunderstorm risk", weather_code.isin(THUNDERSTORM_CODES)),
+    ]
+    issues = pd.Series('', index=temp.index)
+    count = pd.Series(0, index=temp.index)
+    for label, flag in flags:
+        issues = issues.where(~flag, issues + ', ' + label)
+        count += flag.astype(int)
+    issues = issues.str.lstrip(', ')
+    condition = ("❌ Poor: " + issues).where(count > 1, "⚠️ Caution: " + issues)
+    return condition.where(count > 0, "✅ Good")
+
+def daily_frame(forecast: Dict) -> pd.DataFrame:
+    """Daily forecast as one row per YYYY-MM-DD date"""
+    days = daily_forecast(forecast)
+    frame = pd.DataFrame.from_dict(days, orient='index',
+                                   columns=['code', 'temp_max', 'temp_min', 'precip_sum',
+                                            'precip_prob', 'wind'])
+    return frame.rename_axis('date').reset_index()
+
+def fixture_weather(fixtures_df: pd.DataFrame, forecast: Dict, today, days: int = 7,
+                    hourly: pd.DataFrame = None) -> Tuple[int, pd.DataFrame]:
+    """
+    Fixtures from the FA Full-Time CSV in the next `days` days joined to the
+    daily forecast in one merge, plus the hourly forecast at each kickoff and
+    the playing conditions assessed column-wise.
+    Returns (upcoming fixture count, table for display - forecast days only).
+    """
+    dates = pd.to_datetime(fixtures_df['match_date'], errors='coerce')
+    window = (dates.dt.date >= today) & (dates.dt.date <= today + timedelta(days=days))
+    upcoming = pd.DataFrame({
+        'team': fixtures_df.loc[window, 'home_team_clean'],
+        'date': dates[window].dt.strftime('%Y-%m-%d'),
+        'kickoff': fixtures_df.loc[window, 'match_time'].astype(str).str[:5]
+    })
+
+    columns = ['team', 'day', 'kickoff', 'weather', 'temp_min', 'temp_max',
+               'precip_prob', 'wind', 'kickoff_temp', 'kickoff_rain', 'condition']
+    table = upcoming.merge(daily_frame(forecast), on='date', how='inner')
+    if table.empty:
+        return len(upcoming), table.reindex(columns=columns)
+
+    hourly = hourly_frame(forecast) if hourly is None else hourly
+    at_kickoff = kickoff_weather(hourly, pd.to_datetime(table['date'] + ' ' + table['kickoff'],
+                                                        errors='coerce'))
+    described = table['code'].map(get_weather_code_description)
+    table = table.assign(
+        day=pd.to_datetime(table['date']).dt.strftime('%A, %d %B'),
+        weather=described.str[1] + ' ' + described.str[0],
+        kickoff_temp=at_kickoff.get('temperature_2m', pd.Series(index=at_kickoff.index)).to_numpy(),
+        kickoff_rain=at_kickoff.get('precipitation_probability',
+                                    pd.Series(index=at_kickoff.index)).to_numpy(),
+        condition=assess_playing_conditions_frame(table['temp_min'], table['precip_prob'],
+                                                  table['wind'], table['code'])
+    )
+    return len(upcoming), table[columns]
+
+# =====================================
+# 🌧️ Forecast Risk -> Closures / Penalties
+# =====================================
+WEATHER_RULES = {
+    'close_precip_mm': 10.0,         # Daily rain that waterlogs grass...
+    'close_precip_prob': 70,         # ...when at least this likely (%)
+    'close_codes': [65, 73, 75, 82], # Heavy rain, snow, violent showers
+    'frost_temp': -2.0,              # Overnight low that leaves grass pitches frozen
+    'penalise_precip_prob': 60,      # Rain likely - prefer the 3G pitches
+    'wet_penalty': CONFIG.weights['overflow_penalty'] * 2,  # Outweighs the 3G overflow penalty
+}
+
+def forecast_risks(forecast: Dict, rules: Dict = None) -> List[Dict]:
+    """Per forecast day: {'date', 'action' ('close' | 'penalise' | None), 'reason'}"""
+    rules = WEATHER_RULES if rules is None else rules
+    risks = []
+    for date, w in sorted(daily_forecast(forecast).items()):
+        action, reason = None, None
+        precip_prob = w['precip_prob'] or 0
+        if w['code'] in rules['close_codes']:
+            action, reason = 'close', get_weather_code_description(w['code'])[0]
+        elif (w['precip_sum'] or 0) >= rules['close_precip_mm'] and precip_prob >= rules['close_precip_prob']:
+            action, reason = 'close', f"{w['precip_sum']:.0f}mm rain forecast ({precip_prob}%)"
+        elif w['temp_min'] is not None and w['temp_min'] < rules['frost_temp']:
+            action, reason = 'close', f"Frost ({w['temp_min']:.0f}°C)"
+        elif precip_prob >= rules['penalise_precip_prob']:
+            action, reason = 'penalise', f"Rain likely ({precip_prob}%)"
+        risks.append({'date': date, 'action': action, 'reason': reason})
+    return risks
+
+def weather_calendar(forecast: Dict, config: AllocatorConfig = None,
+                     base: AvailabilityCalendar = None,
+                     rules: Dict = None) -> Tuple[AvailabilityCalendar, List[Dict]]:
+    """
+    Availability calendar with the forecast's risks applied to grass pitches,
+    layered on a copy of base (e.g. the --availability file).
+    Returns the calendar and the per-day risks.
+    """
+    config = CONFIG if config is None else config
+    rules = WEATHER_RULES if rules is None else rules
+    calendar = base.copy() if base is not None else AvailabilityCalendar(config)
+    grass = [pitch for pitch, info in config.pitches.items() if info['surface'] == 'grass']
+    risks = forecast_risks(forecast, rules)
+    for risk in risks:
+        if risk['action'] == 'close':
+            calendar.close(grass, risk['date'], reason=f"Weather: {risk['reason']}")
+        elif risk['action'] == 'penalise':
+            calendar.penalise(grass, risk['date'], rules['wet_penalty'], f"Weather: {risk['reason']}")
+    return calendar, risks
+
+def replan_for_weather(fixtures: Dict, slots_by_date: Dict, previous: pd.DataFrame,
+                       forecast: Dict, base: AvailabilityCalendar = None,
+                       config: AllocatorConfig = None, rules: Dict = None,
+                       timeout: int = 10, num_workers: int = 8, max_processes: int = None,
+                       report: Dict = None) -> Tuple[pd.DataFrame, List[str], List[Dict]]:
+    """
+    Re-plan an allocation for the forecast: only forecast dates whose
+    allocation uses a closed or penalised grass pitch are re-solved.
+    Returns (allocation, re-solved dates, per-day risks).
+    """
+    calendar, risks = weather_calendar(forecast, config, base, rules)
+    result, dates = replan_allocation(fixtures, slots_by_date, previous, calendar,
+                                      timeout=timeout, num_workers=num_workers,
+                                      max_processes=max_processes, report=report,
+                                      config=config)
+    return result, dates, risks
+
+def allocation_changes(previous: pd.DataFrame, result: pd.DataFrame) -> pd.DataFrame:
+    """Fixtures whose time or pitch differs between two allocations
+    (a missing time/pitch means the fixture is no longer allocated)"""
+    columns = ['fixture_id', 'team', 'date', 'time', 'pitch']
+    empty = pd.DataFrame(columns=columns)
+    before = (previous if previous is not None else empty)[columns]
+    after = (result if result is not None else empty)[columns]
+    merged = before.merge(after, on=['fixture_id', 'team', 'date'], how='outer',
+                          suffixes=('_before', '_after'))
+    changed = (merged['time_before'] != merged['time_after']) | (merged['pitch_before'] != merged['pitch_after'])
+    return merged[changed].drop(columns='fixture_id').reset_index(drop=True)
@@ -0,0 +1,76 @@
+"""
+Small hand-built allocation cases for the solver feature tests: a config
+document derived from the shipped one, and fixtures built the way
+load_and_validate_fixtures builds them
+"""
+
+import contextlib
+import json
+import os
+import sys
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+with contextlib.redirect_stdout(sys.stderr):
+    from CranleighFC_Pitch_Allocation_PROD import CONFIG, build_fixtures, generate_slots, solve_allocation
+    from cranleighFC_config import AllocatorConfig, compile_config
+
+DATE = '2025-12-06'
+CLUB = 'Cranleigh'
+
+def base_document() -> Dict:
+    """A copy of the shipped config's merged document"""
+    return json.loads(CONFIG.source)
+
+def only_venue(document: Dict, venue: str) -> Dict:
+    """The document cut down to one venue, which every club then plays at"""
+    document['venues'] = {venue: document['venues'][venue]}
+    for club in document['clubs'].values():
+        club['venues'] = [v for v in club['venues'] if v == venue]
+    return document
+
+def youth_teams(config: AllocatorConfig, fmt: str, count: int) -> List[str]:
+    """The first `count` non-senior teams playing `fmt`"""
+    return [team for team, age in config.teams.items()
+            if config.age_group_formats[age] == fmt and age not in config.senior_age_groups][:count]
+
+def compile_document(document: Dict) -> AllocatorConfig:
+    with contextlib.redirect_stdout(sys.stderr):
+        return compile_config(document)
+
+def with_links(links: Dict[str, List[str]], document: Dict = None) -> AllocatorConfig:
+    """The shipped config plus {person: [team, ...]} links"""
+    document = document or base_document()
+    document['clubs'][CLUB]['links'] = links
+    return compile_document(document)
+
+def make_fixtures(teams: List[Tuple[str, str]], config: AllocatorConfig = None,
+                  date: str = DATE) -> Dict:
+    """Fixtures for (team, preferred time) pairs on one date"""
+    table = pd.DataFrame({
+        'team_name': [team for team, _ in teams],
+        'date': date,
+        'time': [time for _, time in teams],
+        'is_cup': False
+    })
+    with contextlib.redirect_stdout(sys.stderr):
+        return build_fixtures(table, None, config)
+
+def slots_for(fixtures: Dict, config: AllocatorConfig = None) -> Dict:
+    return generate_slots(sorted({f['fixture_date'] for f in fixtures.values()}), config)
+
+def solve(fixtures: Dict, config: AllocatorConfig = None, **options) -> pd.DataFrame:
+    """A quiet single-worker solve with a fixed seed"""
+    options = dict(dict(timeout=20, num_workers=1, random_seed=0, verbose=False), **options)
+    with contextlib.redirect_stdout(sys.stderr):
+        return solve_allocation(fixtures, slots_for(fixtures, config), config=config, **options)
+
+def placements(result: pd.DataFrame) -> Dict[str, Tuple[str, str]]:
+    """fixture_id -> (time, pitch)"""
+    if result is None or result.empty:
+        return {}
+    return {row.fixture_id: (row.time, row.pitch) for row in result.itertuples()}
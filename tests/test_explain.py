@@ -0,0 +1,37 @@
+"""
+Cranleigh FC unallocated-fixture explanation tests
+
+Run with:  python -m pytest tests/test_explain.py
+"""
+
+import unittest
+
+import pandas as pd
+
+from solver_cases import make_fixtures, slots_for, with_links
+
+from cranleighFC_explain import CAPACITY, MISSED, explain_unallocated
+
+LEOPARDS = 'Cranleigh U11 Leopards'
+JAGUARS = 'Cranleigh U11 Jaguars'
+CRUSHERS = 'Cranleigh U11 Crushers'   # Same age group, no links
+
+class LinkedExplanationTest(unittest.TestCase):
+
+    def test_linked_and_unlinked_sides_get_their_own_explanations(self):
+        config = with_links({'Coach Smith': [LEOPARDS, JAGUARS]})
+        fixtures = make_fixtures([(LEOPARDS, '09:30'), (JAGUARS, '09:30'), (CRUSHERS, '09:30')], config)
+        jaguars = next(fid for fid, f in fixtures.items() if f['team_name'] == JAGUARS)
+        # Only Jaguars placed: a 9v9 at 09:30 overlaps both 9v9 kickoffs for Leopards
+        result = pd.DataFrame([{'fixture_id': jaguars, 'time': '09:30', 'pitch': 'P4 9v9'}])
+
+        explanations = {e['team']: e for e in
+                        explain_unallocated(fixtures, slots_for(fixtures, config), result, config=config)}
+
+        self.assertEqual(explanations[LEOPARDS]['category'], CAPACITY)
+        self.assertIn(f"Linked with {JAGUARS} (Coach Smith)", explanations[LEOPARDS]['summary'])
+        self.assertEqual(explanations[CRUSHERS]['category'], MISSED)
+        self.assertNotIn('Linked', explanations[CRUSHERS]['summary'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Cranleigh FC background job runner tests
+
+Run with:  python -m pytest tests/test_jobs.py
+"""
+
+import contextlib
+import os
+import sys
+import threading
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+with contextlib.redirect_stdout(sys.stderr):
+    from cranleighFC_jobs import CANCELLED, DONE, RUNNING, JobRunner
+
+def slow_job(release: threading.Event, stop_event: threading.Event = None):
+    """Runs until released, finishing late even when asked to stop"""
+    release.wait(10)
+    return 'stopped' if stop_event.is_set() else 'finished'
+
+class JobRunnerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.runner = JobRunner(max_workers=2)
+        self.release = threading.Event()
+        self.addCleanup(self.runner.shutdown)
+        self.addCleanup(self.release.set)
+
+    def wait_for(self, job_id: str, state: str, timeout: float = 10):
+        deadline = time.time() + timeout
+        while self.runner.status(job_id)['state'] != state:
+            self.assertLess(time.time(), deadline, f"{job_id} never reached {state}")
+            time.sleep(0.01)
+
+    def test_identical_submissions_share_a_job(self):
+        first = self.runner.submit(slow_job, self.release, key='k', subscriber='a')
+        second = self.runner.submit(slow_job, self.release, key='k', subscriber='b')
+        self.assertEqual(first, second)
+        self.assertEqual(self.runner.status(first)['subscribers'], 2)
+
+    def test_job_runs_on_until_its_last_subscriber_cancels(self):
+        job_id = self.runner.submit(slow_job, self.release, key='k', subscriber='a')
+        self.runner.submit(slow_job, self.release, key='k', subscriber='b')
+        self.wait_for(job_id, RUNNING)
+
+        self.assertTrue(self.runner.cancel(job_id, subscriber='a'))
+        self.release.set()
+        self.assertEqual(self.runner.result(job_id, timeout=10), 'finished')
+        self.assertEqual(self.runner.status(job_id)['state'], DONE)
+
+    def test_resubmit_after_cancel_starts_a_new_job(self):
+        job_id = self.runner.submit(slow_job, self.release, key='k', subscriber='a')
+        self.wait_for(job_id, RUNNING)
+        self.assertTrue(self.runner.cancel(job_id, subscriber='a'))
+        # Still running until the solver returns, but already stopping
+        self.assertEqual(self.runner.status(job_id)['state'], RUNNING)
+
+        again = self.runner.submit(slow_job, self.release, key='k', subscriber='a')
+        self.assertNotEqual(again, job_id)
+        self.release.set()
+        self.assertEqual(self.runner.result(job_id, timeout=10), 'stopped')
+        self.assertEqual(self.runner.status(job_id)['state'], CANCELLED)
+        self.assertEqual(self.runner.result(again, timeout=10), 'finished')
+        self.assertEqual(self.runner.status(again)['state'], DONE)
+
+if __name__ == '__main__':
+    unittest.main()
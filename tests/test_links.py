@@ -0,0 +1,42 @@
+"""
+Cranleigh FC linked team tests
+
+Run with:  python -m pytest tests/test_links.py
+"""
+
+import unittest
+from itertools import combinations
+
+from solver_cases import make_fixtures, placements, solve, with_links, youth_teams
+
+from CranleighFC_Pitch_Allocation_PROD import kickoff_span
+
+EAGLES = 'Cranleigh U9 Eagles'       # 7v7 - 90 minutes, so 09:30 ends at 11:00
+RAPTORS = 'Cranleigh U9 Raptors'     # 7v7
+LEOPARDS = 'Cranleigh U11 Leopards'  # 9v9 - 105 minutes, so 09:30 runs past 11:00
+LINKS = {'Coach Smith': [EAGLES, RAPTORS], 'The Browns': [EAGLES, LEOPARDS]}
+
+class LinkedTeamTest(unittest.TestCase):
+
+    def test_linked_teams_never_overlap(self):
+        config = with_links(LINKS)
+        linked = [EAGLES, RAPTORS, LEOPARDS]
+        fillers = [team for fmt in ('7v7', '9v9', '11v11') for team in youth_teams(config, fmt, 6)
+                   if team not in linked]
+        cases = {'searched': linked + fillers, 'enumerated': linked}
+        for name, teams in cases.items():
+            with self.subTest(name):
+                fixtures = make_fixtures([(team, '09:30') for team in teams], config)
+                placed = {fixtures[fixture_id]['team_name']: kickoff_span(time, config.pitches[pitch]['format'], config)
+                          for fixture_id, (time, pitch) in placements(solve(fixtures, config)).items()}
+                for person, people_teams in LINKS.items():
+                    for a, b in combinations([team for team in people_teams if team in placed], 2):
+                        (a_start, a_end), (b_start, b_end) = placed[a], placed[b]
+                        self.assertFalse(a_start < b_end and b_start < a_end,
+                                         f"{a} and {b} ({person}) overlap: {placed[a]} / {placed[b]}")
+                # All three fit with the Eagles first: their 7v7 ends as the others kick off
+                self.assertEqual(set(linked) - set(placed), set())
+                self.assertEqual(placed[EAGLES][0], kickoff_span('09:30', '7v7', config)[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+"""
+Cranleigh FC portfolio solve tests
+
+Run with:  python -m pytest tests/test_portfolio.py
+"""
+
+import contextlib
+import sys
+import unittest
+
+from solver_cases import CONFIG, make_fixtures, slots_for, solve, youth_teams
+
+from CranleighFC_Pitch_Allocation_PROD import solve_allocation_portfolio
+from cranleighFC_profiling import new_run_report
+
+class PortfolioTest(unittest.TestCase):
+
+    def test_portfolio_matches_single_solve(self):
+        teams = [team for fmt in ('5v5', '7v7', '9v9', '11v11') for team in youth_teams(CONFIG, fmt, 6)]
+        fixtures = make_fixtures([(team, '09:30') for team in teams])
+        single = new_run_report()
+        expected = solve(fixtures, report=single)
+        self.assertEqual(single['solver']['status'], 'OPTIMAL')
+
+        # In-process runs, then the spawn process pool
+        for processes in (1, 2):
+            with self.subTest(processes=processes):
+                report = new_run_report()
+                with contextlib.redirect_stdout(sys.stderr):
+                    result = solve_allocation_portfolio(fixtures, slots_for(fixtures), timeout=20, num_workers=1,
+                                                        runs=2, max_processes=processes, random_seed=0,
+                                                        report=report)
+                self.assertEqual(report['solver']['status'], 'OPTIMAL')
+                self.assertEqual(report['solver']['objective'], single['solver']['objective'])
+                self.assertEqual(len(result), len(expected))
+
+if __name__ == '__main__':
+    unittest.main()
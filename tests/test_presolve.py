@@ -0,0 +1,59 @@
+"""
+Cranleigh FC pre-solve tests: capacity bounds and small-date enumeration
+
+Run with:  python -m pytest tests/test_presolve.py
+"""
+
+import unittest
+from unittest import mock
+
+from solver_cases import (CONFIG, base_document, compile_document, make_fixtures, only_venue, slots_for, solve,
+                          with_links, youth_teams)
+
+import CranleighFC_Pitch_Allocation_PROD as allocator
+from cranleighFC_profiling import new_run_report
+
+EAGLES = 'Cranleigh U9 Eagles'
+RAPTORS = 'Cranleigh U9 Raptors'
+LEOPARDS = 'Cranleigh U11 Leopards'
+
+class SmallDateTest(unittest.TestCase):
+
+    def test_enumeration_matches_search(self):
+        linked = with_links({'Coach Smith': [EAGLES, RAPTORS, LEOPARDS]})
+        cases = {
+            'contested': (CONFIG, youth_teams(CONFIG, '9v9', 3)),
+            'linked': (linked, [EAGLES, RAPTORS, LEOPARDS])
+        }
+        for name, (config, teams) in cases.items():
+            with self.subTest(name):
+                fixtures = make_fixtures([(team, '09:30') for team in teams], config)
+                self.assertLessEqual(len(fixtures), allocator.TRIVIAL_DATE_FIXTURES)
+                enumerated = new_run_report()
+                result = solve(fixtures, config, report=enumerated)
+                # No model variables - the date never reached CP-SAT
+                self.assertEqual(enumerated['solver']['variables'], 0)
+                self.assertEqual(enumerated['solver']['status'], 'OPTIMAL')
+
+                searched = new_run_report()
+                with mock.patch.object(allocator, 'TRIVIAL_DATE_FIXTURES', 0):
+                    expected = solve(fixtures, config, report=searched)
+                self.assertGreater(searched['solver']['variables'], 0)
+                self.assertEqual(searched['solver']['status'], 'OPTIMAL')
+                self.assertEqual(enumerated['solver']['objective'], searched['solver']['objective'])
+                self.assertEqual(len(result), len(expected))
+
+class CapacityBoundsTest(unittest.TestCase):
+
+    def test_overflow_is_what_the_solver_cannot_place(self):
+        # Snoxhall alone: two 9v9 pitches, two games each
+        config = compile_document(only_venue(base_document(), 'snoxhall'))
+        fixtures = make_fixtures([(team, '09:30') for team in youth_teams(config, '9v9', 6)], config)
+        bounds = allocator.capacity_bounds(fixtures, slots_for(fixtures, config), config)
+
+        self.assertEqual(bounds[['format', 'fixtures', 'capacity', 'overflow']].to_dict('records'),
+                         [{'format': '9v9', 'fixtures': 6, 'capacity': 4, 'overflow': 2}])
+        self.assertEqual(len(solve(fixtures, config)), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+"""
+Cranleigh FC site resource tests
+
+Run with:  python -m pytest tests/test_resources.py
+"""
+
+import unittest
+
+from solver_cases import base_document, compile_document, make_fixtures, only_venue, placements, solve, youth_teams
+
+from CranleighFC_Pitch_Allocation_PROD import kickoff_span
+
+ROOMS = 4     # Changing rooms - two 9v9 or 11v11 matches at once
+DEMAND = {'11v11': 2, '9v9': 2}
+
+def changing_rooms_config():
+    """Snoxhall alone, with four changing rooms"""
+    document = only_venue(base_document(), 'snoxhall')
+    document['venues']['snoxhall']['resources'] = {'changing_rooms': {'capacity': ROOMS, 'demand': DEMAND}}
+    return compile_document(document)
+
+def minutes(time):
+    hours, mins = time.split(':')
+    return int(hours) * 60 + int(mins)
+
+class ResourceCapTest(unittest.TestCase):
+
+    def test_changing_rooms_cap_games_in_progress(self):
+        config = changing_rooms_config()
+        cases = {
+            'searched': youth_teams(config, '9v9', 4) + youth_teams(config, '11v11', 3) + youth_teams(config, '7v7', 2),
+            'enumerated': youth_teams(config, '9v9', 3)
+        }
+        kickoffs = sorted({time for times in config.kickoff_times.values() for time in times})
+        for name, teams in cases.items():
+            with self.subTest(name):
+                fixtures = make_fixtures([(team, '09:30') for team in teams], config)
+                spans = [(kickoff_span(time, config.pitches[pitch]['format'], config), config.pitches[pitch]['format'])
+                         for time, pitch in placements(solve(fixtures, config)).values()]
+                # A match holds its rooms at every kickoff until it ends
+                in_use = {time: sum(DEMAND.get(fmt, 0) for (start, end), fmt in spans
+                                    if start <= minutes(time) < end)
+                          for time in kickoffs}
+                for time, rooms in in_use.items():
+                    self.assertLessEqual(rooms, ROOMS, f"{time}: {rooms} changing rooms in use")
+                self.assertEqual(max(in_use.values()), ROOMS, 'the case should fill the changing rooms')
+                self.assertLess(len(spans), len(fixtures))
+
+if __name__ == '__main__':
+    unittest.main()
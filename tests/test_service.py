@@ -0,0 +1,171 @@
+"""
+Cranleigh FC allocation service tests
+Start the HTTP API on a free port in-process and drive it with urllib
+
+Run with:  python -m pytest tests/test_service.py
+"""
+
+import contextlib
+import json
+import os
+import sys
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+with contextlib.redirect_stdout(sys.stderr):
+    from cranleighFC_service import MAX_PAYLOAD_BYTES, create_server, serve_in_background
+
+FIXTURES_CSV = os.path.join(ROOT, 'cranleigh_home_fixtures.csv')
+BUSY_CSV = os.path.join(ROOT, 'regression', 'synthetic_busy.csv')
+
+def read_text(path: str) -> str:
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+class AllocationServiceTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = create_server(port=0, workers=1, solver_workers=2, quiet=True)
+        serve_in_background(cls.server)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.RequestHandlerClass.service.shutdown()
+        cls.server.server_close()
+
+    def request(self, method: str, path: str, body: bytes = None, headers: dict = None):
+        """(status, headers, body bytes) - HTTP errors are returned, not raised"""
+        req = urllib.request.Request(self.base_url + path, data=body, method=method,
+                                     headers=headers or {})
+        try:
+            with urllib.request.urlopen(req, timeout=60) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+    def request_json(self, method: str, path: str, body: bytes = None, headers: dict = None):
+        status, _, data = self.request(method, path, body, headers)
+        return status, json.loads(data)
+
+    def post_json(self, payload: dict):
+        return self.request_json('POST', '/jobs', json.dumps(payload).encode('utf-8'),
+                                 {'Content-Type': 'application/json'})
+
+    def wait_for(self, job_id: str, timeout: float = 120) -> dict:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            _, status = self.request_json('GET', f'/jobs/{job_id}')
+            if status['state'] in ('done', 'failed', 'cancelled'):
+                return status
+            time.sleep(0.25)
+        self.fail(f"{job_id} still {status['state']} after {timeout}s")
+
+    def test_health(self):
+        self.assertEqual(self.request_json('GET', '/health'), (200, {'status': 'ok'}))
+
+    def test_solve_result_and_exports(self):
+        status, job = self.request_json('POST', '/jobs', read_text(FIXTURES_CSV).encode('utf-8'),
+                                        {'Content-Type': 'text/csv'})
+        self.assertEqual(status, 202)
+        job_id = job['job_id']
+        self.assertEqual(self.wait_for(job_id)['state'], 'done')
+
+        status, result = self.request_json('GET', f'/jobs/{job_id}/result')
+        self.assertEqual(status, 200)
+        self.assertGreater(result['allocated'], 0)
+        self.assertEqual(result['allocated'] + len(result['unallocated']), result['total'])
+        self.assertEqual(len(result['allocations']), result['allocated'])
+
+        status, headers, data = self.request('GET', f'/jobs/{job_id}/export/csv')
+        self.assertEqual(status, 200)
+        self.assertTrue(headers['Content-Type'].startswith('text/csv'))
+        self.assertIn(f'pitch_allocations_{job_id}.csv', headers['Content-Disposition'])
+        self.assertIn('fixture_id', data.decode('utf-8').splitlines()[0])
+
+        status, error = self.request_json('GET', f'/jobs/{job_id}/export/pdf')
+        self.assertEqual(status, 404)
+        self.assertIn('csv', error['formats'])
+
+        # Identical payloads share the finished job
+        status, again = self.post_json({'csv': read_text(FIXTURES_CSV)})
+        self.assertEqual(status, 202)
+        self.assertEqual(again['job_id'], job_id)
+        self.assertEqual(again['input_hash'], job['input_hash'])
+
+        # Finished jobs can't be cancelled
+        status, body = self.request_json('DELETE', f'/jobs/{job_id}')
+        self.assertEqual(status, 200)
+        self.assertFalse(body['cancelled'])
+        self.assertEqual(body['status']['state'], 'done')
+
+    def test_delete_stops_running_solve(self):
+        status, job = self.post_json({'csv': read_text(BUSY_CSV), 'timeout': 120})
+        self.assertEqual(status, 202)
+        job_id = job['job_id']
+
+        deadline = time.time() + 60
+        while self.request_json('GET', f'/jobs/{job_id}')[1]['state'] == 'queued':
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.1)
+
+        # The result isn't ready while the solve is in progress
+        status, body = self.request_json('GET', f'/jobs/{job_id}/result')
+        self.assertEqual(status, 409)
+
+        cancelled_at = time.time()
+        status, body = self.request_json('DELETE', f'/jobs/{job_id}')
+        self.assertEqual(status, 200)
+        self.assertTrue(body['cancelled'])
+
+        # The pool solve stops well before its 120s timeout
+        self.assertEqual(self.wait_for(job_id, timeout=60)['state'], 'cancelled')
+        self.assertLess(time.time() - cancelled_at, 60)
+
+    def test_unknown_jobs_and_routes(self):
+        self.assertEqual(self.request_json('GET', '/jobs/job-999')[0], 404)
+        self.assertEqual(self.request_json('GET', '/jobs/job-999/result')[0], 404)
+        self.assertEqual(self.request_json('DELETE', '/jobs/job-999')[0], 404)
+        self.assertEqual(self.request_json('GET', '/nowhere')[0], 404)
+        self.assertEqual(self.request_json('POST', '/nowhere', b'{}')[0], 404)
+
+    def test_bad_payloads(self):
+        bad = [
+            (b'', {'Content-Type': 'text/csv'}),
+            (b'\xff\xfe\x00bad', {'Content-Type': 'text/csv'}),
+            (b'not json', {'Content-Type': 'application/json'}),
+            (b'[1, 2]', {'Content-Type': 'application/json'}),
+            (json.dumps({'csv': ''}).encode('utf-8'), {'Content-Type': 'application/json'}),
+            (json.dumps({'fixtures': []}).encode('utf-8'), {'Content-Type': 'application/json'}),
+            (json.dumps({'fixtures': [{'match_date': '2025-12-06'}]}).encode('utf-8'),
+             {'Content-Type': 'application/json'}),
+            (json.dumps({'csv': 'a,b\n1,2', 'timeout': 9999}).encode('utf-8'),
+             {'Content-Type': 'application/json'}),
+            (json.dumps({'something': 'else'}).encode('utf-8'), {'Content-Type': 'application/json'}),
+        ]
+        for body, headers in bad:
+            with self.subTest(body=body[:30]):
+                status, error = self.request_json('POST', '/jobs', body, headers)
+                self.assertEqual(status, 400)
+                self.assertIn('error', error)
+
+    def test_bad_content_length(self):
+        for length in ('abc', '-5'):
+            with self.subTest(length=length):
+                status, error = self.request_json('POST', '/jobs', headers={'Content-Length': length})
+                self.assertEqual(status, 400)
+
+    def test_payload_too_large(self):
+        status, error = self.request_json('POST', '/jobs', b'{}',
+                                          {'Content-Length': str(MAX_PAYLOAD_BYTES + 1)})
+        self.assertEqual(status, 413)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+"""
+Cranleigh FC split pitch layout tests
+
+Run with:  python -m pytest tests/test_split_pitches.py
+"""
+
+import unittest
+
+from solver_cases import base_document, compile_document, make_fixtures, only_venue, placements, solve, youth_teams
+
+P1 = 'P1 11v11 (Bruce McKenzie)'
+SPLITS = {'9v9': ['P1A 9v9', 'P1B 9v9'], '7v7': ['P1A 7v7', 'P1B 7v7', 'P1C 7v7']}
+
+def split_p1_config():
+    """Snoxhall P1 alone, markable as two 9v9s or three 7v7s"""
+    document = only_venue(base_document(), 'snoxhall')
+    snoxhall = document['venues']['snoxhall']
+    snoxhall['pitches'] = {P1: dict(snoxhall['pitches'][P1], splits=SPLITS)}
+    return compile_document(document)
+
+class SplitPitchTest(unittest.TestCase):
+
+    def test_parent_is_whole_or_one_layout_at_each_kickoff(self):
+        config = split_p1_config()
+        cases = {
+            'searched': youth_teams(config, '7v7', 4) + youth_teams(config, '9v9', 3) + youth_teams(config, '11v11', 2),
+            'enumerated': youth_teams(config, '7v7', 2) + youth_teams(config, '11v11', 1)
+        }
+        for name, teams in cases.items():
+            with self.subTest(name):
+                fixtures = make_fixtures([(team, '09:30') for team in teams], config)
+                layouts = {}   # kickoff -> layouts of P1 in use (None = whole)
+                for time, pitch in placements(solve(fixtures, config)).values():
+                    layouts.setdefault(time, set()).add(config.split_parent.get(pitch, (P1, None))[1])
+                self.assertTrue(any(layout is not None for used in layouts.values() for layout in used),
+                                'the case should need a split layout')
+                for time, used in layouts.items():
+                    self.assertEqual(len(used), 1, f"{time}: P1 used as {used}")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+"""
+Cranleigh FC weather service tests
+A local http.server stands in for Open-Meteo (via CRANLEIGH_WEATHER_URL) and
+each test gets its own cache directory
+
+Run with:  python -m pytest tests/test_weather.py
+"""
+
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+with contextlib.redirect_stdout(sys.stderr):
+    from cranleighFC_weather import (
+        WEATHER_URL_ENV,
+        WeatherService,
+        build_session,
+        fetch_forecast
+    )
+
+HOME = (51.14209, -0.48374)
+AWAY = (51.2362, -0.5704)
+
+def forecast_document(version: int, latitude: float) -> dict:
+    """A minimal Open-Meteo style forecast; version counts requests served"""
+    return {
+        'version': version,
+        'latitude': latitude,
+        'daily': {'time': ['2025-12-06'], 'weather_code': [61], 'temperature_2m_max': [9.0],
+                  'temperature_2m_min': [3.0], 'precipitation_sum': [4.2],
+                  'precipitation_probability_max': [80], 'wind_speed_10m_max': [20.0]},
+        'hourly': {'time': ['2025-12-06T09:00', '2025-12-06T10:00'], 'temperature_2m': [4.0, 5.0],
+                   'precipitation_probability': [70, 80]}
+    }
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers forecast requests; tests set the delay and any failures first"""
+    delay = 0.0
+    statuses = []    # Status codes to answer with, in order, before succeeding
+    requests = []    # Query of each request received
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        with self.lock:
+            self.requests.append(query)
+            version = len(self.requests)
+            status = self.statuses.pop(0) if self.statuses else 200
+        time.sleep(self.delay)
+        body = (forecast_document(version, float(query['latitude'][0])) if status == 200
+                else {'error': True, 'reason': 'stand-in failure'})
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+class WeatherServiceTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.previous_url = os.environ.get(WEATHER_URL_ENV)
+        os.environ[WEATHER_URL_ENV] = f"http://127.0.0.1:{cls.server.server_address[1]}/v1/forecast"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        if cls.previous_url is None:
+            os.environ.pop(WEATHER_URL_ENV, None)
+        else:
+            os.environ[WEATHER_URL_ENV] = cls.previous_url
+
+    def setUp(self):
+        StandInHandler.delay = 0.0
+        StandInHandler.statuses = []
+        StandInHandler.requests = []
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = cache_dir.name
+
+    def service(self, **kwargs) -> WeatherService:
+        service = WeatherService(cache_dir=self.cache_dir, **dict({'wait': 5.0}, **kwargs))
+        # Let background refreshes finish before the next test resets the stand-in
+        for location in (HOME, AWAY):
+            self.addCleanup(self.wait_for_refresh, service, location)
+        return service
+
+    def requests_for(self, location) -> int:
+        return sum(float(query['latitude'][0]) == location[0] for query in StandInHandler.requests)
+
+    def wait_for_refresh(self, service: WeatherService, location=HOME, timeout: float = 10):
+        deadline = time.time() + timeout
+        while service.status(*location)['refreshing']:
+            self.assertLess(time.time(), deadline, "refresh still running")
+            time.sleep(0.05)
+
+    def test_fresh_forecast_is_served_from_cache(self):
+        service = self.service()
+        first = service.forecast(*HOME)
+        self.assertEqual(first['version'], 1)
+        self.assertEqual(service.forecast(*HOME), first)
+        self.assertEqual(len(StandInHandler.requests), 1)
+
+        # A new service (e.g. after a restart) reads the file cache
+        self.assertEqual(self.service().forecast(*HOME), first)
+        self.assertEqual(len(StandInHandler.requests), 1)
+
+    def test_stale_forecast_is_served_while_revalidating(self):
+        service = self.service(fresh_seconds=0)
+        self.assertEqual(service.forecast(*HOME)['version'], 1)
+
+        StandInHandler.delay = 1.0
+        started = time.perf_counter()
+        stale = service.forecast(*HOME)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(stale['version'], 1)
+        self.assertTrue(service.status(*HOME)['refreshing'])
+
+        self.wait_for_refresh(service)
+        self.assertEqual(service.forecast(*HOME)['version'], 2)
+
+    def test_slow_api_returns_none_within_wait(self):
+        StandInHandler.delay = 1.5
+        service = self.service(wait=0.2)
+        started = time.perf_counter()
+        self.assertIsNone(service.forecast(*HOME))
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertTrue(service.status(*HOME)['refreshing'])
+
+        # The fetch carries on in the background; the next call picks it up
+        self.wait_for_refresh(service)
+        self.assertEqual(service.forecast(*HOME)['version'], 1)
+
+    def test_failed_refresh_keeps_old_forecast(self):
+        service = self.service(fresh_seconds=0)
+        self.assertEqual(service.forecast(*HOME)['version'], 1)
+
+        StandInHandler.statuses = [500] * 10
+        self.assertEqual(service.forecast(*HOME)['version'], 1)
+        self.wait_for_refresh(service)
+
+        status = service.status(*HOME)
+        self.assertIsNotNone(status['error'])
+        self.assertEqual(service.forecast(*HOME)['version'], 1)
+
+    def test_invalidate_refreshes_one_location_only(self):
+        service = self.service()
+        home = service.forecast(*HOME)
+        away = service.forecast(*AWAY)
+        self.assertEqual((self.requests_for(HOME), self.requests_for(AWAY)), (1, 1))
+
+        StandInHandler.delay = 0.5
+        service.invalidate(*HOME)
+        # Still served until the refresh lands
+        self.assertEqual(service.forecast(*HOME), home)
+        self.wait_for_refresh(service, HOME)
+
+        self.assertNotEqual(service.forecast(*HOME), home)
+        self.assertEqual(service.forecast(*AWAY), away)
+        self.assertEqual((self.requests_for(HOME), self.requests_for(AWAY)), (2, 1))
+
+    def test_hourly_frame_is_built_once_per_fetch(self):
+        service = self.service()
+        hourly = service.hourly(*HOME)
+        self.assertEqual(list(hourly['temperature_2m']), [4.0, 5.0])
+        self.assertIs(service.hourly(*HOME), hourly)
+
+        service.invalidate(*HOME)
+        self.wait_for_refresh(service)
+        self.assertIsNot(service.hourly(*HOME), hourly)
+
+    def test_rate_limits_and_server_errors_are_retried(self):
+        for statuses in ([429], [503], [429, 502]):
+            with self.subTest(statuses=statuses):
+                StandInHandler.statuses = list(statuses)
+                StandInHandler.requests = []
+                forecast = fetch_forecast(*HOME, session=build_session())
+                self.assertEqual(forecast['version'], len(statuses) + 1)
+
+    def test_retries_give_up(self):
+        StandInHandler.statuses = [503] * 10
+        with self.assertRaises(Exception):
+            fetch_forecast(*HOME, session=build_session(retries=1))
+        self.assertEqual(len(StandInHandler.requests), 2)
+
+if __name__ == '__main__':
+    unittest.main()